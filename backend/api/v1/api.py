@@ -3,6 +3,7 @@ from flask_restx import Api
 from api.v1.health import ns as health_ns
 from api.v1.endpoints.auth import ns as auth_ns
 from api.v1.endpoints.users import ns as users_ns
+from api.v1.endpoints.profiles import ns as profiles_ns
 from api.v1.models import create_user_info_model
 
 # 创建主路由蓝图
@@ -34,6 +35,7 @@ user_info_model = create_user_info_model(api)
 api.add_namespace(health_ns, path='/health')
 api.add_namespace(auth_ns, path='/auth')
 api.add_namespace(users_ns, path='/users')
+api.add_namespace(profiles_ns, path='/profiles')
 
 # 错误处理
 @api_router.errorhandler(Exception)
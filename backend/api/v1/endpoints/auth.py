@@ -1,22 +1,34 @@
 from datetime import datetime, timedelta
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, g
 from flask_login import login_user, logout_user, login_required, current_user
 from flask_restx import Namespace, Resource, fields
+from sqlalchemy.exc import IntegrityError
 from utils.auth import (
     create_access_token,
     create_refresh_token,
     token_required
 )
 from models.user import User
-from config.database import AsyncSessionLocal
-import asyncio
+from config.database import get_session
+from utils.loop import async_route, run_sync
+from utils.hashing import HashingQueueFullError, hashing_executor
+from utils.conditional import (
+    is_not_modified,
+    make_etag,
+    not_modified,
+    validator_headers,
+)
+from utils.query_analyzer import query_budget
+from utils.ratelimit import login_limiter, register_limiter
+from utils.serialization import isoformat_utc
 
 # 创建命名空间
 ns = Namespace('auth', description='认证相关接口')
 
 # 定义请求/响应模型
 login_model = ns.model('LoginRequest', {
-    'username': fields.String(required=True, description='用户名'),
+    'username': fields.String(description='用户名或邮箱（不区分大小写）'),
+    'email': fields.String(description='邮箱（未提供 username 时使用）'),
     'password': fields.String(required=True, description='密码')
 })
 
@@ -26,6 +38,16 @@ register_model = ns.model('RegisterRequest', {
     'password': fields.String(required=True, description='密码')
 })
 
+user_info_model = ns.model('UserInfo', {
+    'id': fields.Integer(required=True, description='用户ID'),
+    'username': fields.String(required=True, description='用户名'),
+    'email': fields.String(required=True, description='邮箱'),
+    'is_active': fields.Boolean(required=True, description='是否激活'),
+    'is_superuser': fields.Boolean(required=True, description='是否超级用户'),
+    'created_at': fields.DateTime(description='创建时间'),
+    'updated_at': fields.DateTime(description='更新时间')
+})
+
 token_model = ns.model('TokenResponse', {
     'access_token': fields.String(required=True, description='访问令牌'),
     'token_type': fields.String(required=True, description='令牌类型'),
@@ -42,70 +64,84 @@ class Login(Resource):
             responses={
                 200: ('成功', token_model),
                 401: '用户名或密码错误',
-                500: '服务器内部错误'
+                429: '请求过于频繁',
+                500: '服务器内部错误',
+                503: '服务器繁忙'
             })
     @ns.expect(login_model)
+    @query_budget(1)
+    @login_limiter.limit
     @ns.marshal_with(token_model)
     def post(self):
         """用户登录"""
         try:
             data = request.get_json()
-            current_app.logger.debug(f"收到登录请求：{data}")
             
             if not data:
                 current_app.logger.warning("无效的请求数据")
                 return {'message': '无效的请求数据'}, 400
                 
-            username = data.get('username')
+            # username 字段也可以填写邮箱
+            username = data.get('username') or data.get('email')
             password = data.get('password')
             
             if not username or not password:
                 current_app.logger.warning("用户名或密码为空")
                 return {'message': '用户名和密码不能为空'}, 400
             
-            # 使用 asyncio.run 运行异步代码
+            # 在共享事件循环中运行异步代码，复用连接池
             async def login_async():
-                async with AsyncSessionLocal() as session:
-                    current_app.logger.debug(f"查询用户：{username}")
-                    user = await User.get_by_username(session, username)
+                session = get_session()
+                current_app.logger.debug(f"查询用户：{username}")
+                # 一次查询按用户名或邮箱查找，只加载认证所需的列
+                user = await User.get_credentials(session, username)
+
+                if not user:
+                    current_app.logger.warning(f"用户不存在：{username}")
+                    return {'message': '用户名或密码错误'}, 401
                     
-                    if not user:
-                        current_app.logger.warning(f"用户不存在：{username}")
+                current_app.logger.debug(f"验证密码：{username}")
+                try:
+                    verified = await hashing_executor.verify(
+                        user.hashed_password, password
+                    )
+                    if not verified:
+                        current_app.logger.warning(f"密码错误：{username}")
                         return {'message': '用户名或密码错误'}, 401
-                        
-                    current_app.logger.debug(f"验证密码：{username}")
-                    try:
-                        if not user.verify_password(password):
-                            current_app.logger.warning(f"密码错误：{username}")
-                            return {'message': '用户名或密码错误'}, 401
-                    except Exception as e:
-                        current_app.logger.error(f"密码验证失败：{str(e)}")
-                        return {'message': '服务器内部错误'}, 500
-                        
-                    if not user.is_active:
-                        current_app.logger.warning(f"账户未激活：{username}")
-                        return {'message': '账户未激活'}, 403
+                except HashingQueueFullError:
+                    current_app.logger.warning("密码哈希队列已满，拒绝登录请求")
+                    return (
+                        {'message': '服务器繁忙，请稍后重试'},
+                        503,
+                        {'Retry-After': '1'},
+                    )
+                except Exception as e:
+                    current_app.logger.error(f"密码验证失败：{str(e)}")
+                    return {'message': '服务器内部错误'}, 500
                     
-                    # 创建访问令牌
-                    try:
-                        current_app.logger.debug(f"创建访问令牌：{username}")
-                        access_token = create_access_token(user_id=user.id)
-                        current_app.logger.info(f"用户 {username} 登录成功")
-                        
-                        response = {
-                            'access_token': access_token,
-                            'token_type': 'bearer',
-                            'expires_in': 3600  # 1小时过期
-                        }
-                        current_app.logger.debug(f"返回响应：{response}")
-                        return response
-                        
-                    except Exception as e:
-                        current_app.logger.error(f"创建令牌失败：{str(e)}")
-                        return {'message': '服务器内部错误'}, 500
+                if not user.is_active:
+                    current_app.logger.warning(f"账户未激活：{username}")
+                    return {'message': '账户未激活'}, 403
+
+                # 创建访问令牌
+                try:
+                    current_app.logger.debug(f"创建访问令牌：{username}")
+                    access_token = create_access_token(user_id=user.id)
+                    current_app.logger.info(f"用户 {username} 登录成功")
+
+                    response = {
+                        'access_token': access_token,
+                        'token_type': 'bearer',
+                        'expires_in': 3600  # 1小时过期
+                    }
+                    return response
+
+                except Exception as e:
+                    current_app.logger.error(f"创建令牌失败：{str(e)}")
+                    return {'message': '服务器内部错误'}, 500
             
             # 运行异步函数
-            return asyncio.run(login_async())
+            return run_sync(login_async())
                     
         except Exception as e:
             current_app.logger.error(f"登录过程发生错误：{str(e)}")
@@ -117,36 +153,54 @@ class Register(Resource):
             description='用户注册',
             responses={
                 201: '注册成功',
-                400: '用户名或邮箱已存在',
-                500: '服务器内部错误'
+                400: '用户名或邮箱已存在，或注册信息无效（用户名不能包含 @）',
+                429: '请求过于频繁',
+                500: '服务器内部错误',
+                503: '服务器繁忙'
             })
     @ns.expect(register_model)
+    @query_budget(1)
+    @register_limiter.limit
+    @async_route
     async def post(self):
         """用户注册"""
         data = request.get_json()
         username = data.get('username')
         email = data.get('email')
         password = data.get('password')
-        
-        async with AsyncSessionLocal() as session:
-            if await User.get_by_username(session, username):
-                return {'message': '用户名已存在'}, 400
-            if await User.get_by_email(session, email):
-                return {'message': '邮箱已存在'}, 400
-            
-            user = User(
+        try:
+            User.check_username(username)
+        except ValueError as e:
+            return {'message': str(e)}, 400
+
+        try:
+            hashed_password = await hashing_executor.hash(password)
+        except HashingQueueFullError:
+            return {'message': '服务器繁忙，请稍后重试'}, 503, {'Retry-After': '1'}
+
+        # 不预先查询用户名和邮箱，直接插入，由唯一索引判断冲突
+        session = get_session()
+        try:
+            await User.create(
+                session,
                 username=username,
                 email=email,
-                is_active=True,
-                is_superuser=False
+                hashed_password=hashed_password
             )
-            user.set_password(password)
-            
-            session.add(user)
             await session.commit()
-            await session.refresh(user)
-            
-            return {'message': '注册成功'}, 201
+        except IntegrityError as e:
+            await session.rollback()
+            column = User.conflicting_column(e)
+            if column == 'email':
+                return {'message': '邮箱已存在'}, 400
+            if column == 'username':
+                return {'message': '用户名已存在'}, 400
+            # 非唯一约束的完整性错误（如缺少必填列）不能报告为重复
+            current_app.logger.warning(f"注册失败，数据不满足约束：{e.orig}")
+            return {'message': '注册信息无效'}, 400
+        User.adjust_cached_count(1)
+
+        return {'message': '注册成功'}, 201
 
 @ns.route('/logout')
 class Logout(Resource):
@@ -166,28 +220,35 @@ class Logout(Resource):
 @ns.route('/me')
 class CurrentUser(Resource):
     @ns.doc('get_current_user',
-            description='获取当前用户信息',
+            description='获取当前用户信息'
+                        '（支持 If-None-Match / If-Modified-Since 条件请求）',
             security='apikey',
             responses={
-                200: ('成功', 'UserInfo'),
+                200: ('成功', user_info_model),
+                304: '未修改',
                 401: '未认证',
                 500: '服务器内部错误'
             })
-    @ns.marshal_with('UserInfo')
+    @query_budget(1)
     @token_required
     async def get(self):
         """获取当前用户信息"""
-        async with AsyncSessionLocal() as session:
-            user = await User.get_by_id(session, current_user.id)
-            return {
-                'id': user.id,
-                'username': user.username,
-                'email': user.email,
-                'is_active': user.is_active,
-                'is_superuser': user.is_superuser,
-                'created_at': user.created_at,
-                'updated_at': user.updated_at
-            }
+        # token_required 已加载当前用户（可能来自认证用户缓存），
+        # 条件请求无需再查询数据库
+        user = g.user
+        etag = make_etag('user', user.id, user.updated_at)
+        if is_not_modified(etag, user.updated_at):
+            return not_modified(etag, user.updated_at)
+
+        return {
+            'id': user.id,
+            'username': user.username,
+            'email': user.email,
+            'is_active': user.is_active,
+            'is_superuser': user.is_superuser,
+            'created_at': isoformat_utc(user.created_at),
+            'updated_at': isoformat_utc(user.updated_at)
+        }, 200, validator_headers(etag, user.updated_at)
 
 @bp.route('/refresh', methods=['POST'])
 @login_required
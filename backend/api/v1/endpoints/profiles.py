@@ -0,0 +1,68 @@
+from flask import send_file
+from flask_restx import Namespace, Resource, fields
+
+from utils.auth import admin_required, token_required
+from utils.profiling import profiler
+
+# 创建命名空间
+ns = Namespace('profiles', description='请求性能分析结果（仅管理员）')
+
+# 定义响应模型
+capture_model = ns.model('ProfileCapture', {
+    'name': fields.String(required=True, description='文件名'),
+    'size': fields.Integer(required=True, description='文件大小（字节）'),
+    'created_at': fields.String(required=True, description='生成时间')
+})
+
+capture_list_model = ns.model('ProfileCaptureList', {
+    'enabled': fields.Boolean(required=True, description='是否启用性能分析'),
+    'captures': fields.List(
+        fields.Nested(capture_model), description='捕获列表（最新的在前）'
+    )
+})
+
+@ns.route('')
+class ProfileList(Resource):
+    @ns.doc('list_profiles',
+            description='列出已保存的性能分析结果。'
+                        '请求时加上 X-Profile: 1（或 pstats / collapsed）'
+                        '即可分析该请求，'
+                        '响应头 X-Profile-Id 为文件名',
+            security='apikey',
+            responses={
+                200: ('成功', capture_list_model),
+                401: '未认证',
+                403: '无权限'
+            })
+    @token_required
+    @admin_required
+    async def get(self):
+        """列出性能分析结果"""
+        return {'enabled': profiler.enabled, 'captures': profiler.list()}
+
+@ns.route('/<string:name>')
+class ProfileDownload(Resource):
+    @ns.doc('download_profile',
+            description='下载性能分析结果：.prof 为 cProfile/pstats 格式，'
+                        '.folded 为火焰图折叠栈格式',
+            security='apikey',
+            responses={
+                200: '成功',
+                401: '未认证',
+                403: '无权限',
+                404: '文件不存在'
+            })
+    @token_required
+    @admin_required
+    async def get(self, name):
+        """下载性能分析结果"""
+        path = profiler.path(name)
+        if path is None:
+            return {'message': '文件不存在'}, 404
+        if name.endswith('.folded'):
+            mimetype = 'text/plain'
+        else:
+            mimetype = 'application/octet-stream'
+        return send_file(
+            path, mimetype=mimetype, as_attachment=True, download_name=name
+        )
@@ -1,8 +1,25 @@
-from flask import Blueprint, request, jsonify
+import csv
+import io
+import json
+from typing import Any, Dict, Iterator, List, Sequence
+
+from flask import Response, current_app, g, request
 from flask_restx import Namespace, Resource, fields
-from utils.auth import token_required, admin_required
+from sqlalchemy.exc import IntegrityError
+
+from config.database import ReadSessionLocal, get_session
+from config.settings import settings
 from models.user import User
-from config.database import AsyncSessionLocal
+from utils.auth import admin_required, invalidate_principal, token_required
+from utils.conditional import (
+    is_not_modified,
+    make_etag,
+    not_modified,
+    validator_headers,
+)
+from utils.loop import run_sync
+from utils.query_analyzer import query_budget
+from utils.serialization import RowEncoder, dumps
 
 # 创建命名空间
 ns = Namespace('users', description='用户管理相关接口')
@@ -18,101 +35,456 @@ user_model = ns.model('User', {
     'updated_at': fields.DateTime(required=True, description='更新时间')
 })
 
+# 更新请求：只校验可修改的列（类型和长度与数据库列一致），其余字段忽略
+user_update_model = ns.model('UserUpdate', {
+    'username': fields.String(
+        min_length=1, max_length=50, description='用户名'
+    ),
+    'email': fields.String(min_length=1, max_length=100, description='邮箱'),
+    'is_active': fields.Boolean(description='是否激活'),
+    'is_superuser': fields.Boolean(description='是否超级用户')
+})
+
 user_list_model = ns.model('UserList', {
     'users': fields.List(fields.Nested(user_model)),
     'total': fields.Integer(required=True, description='总用户数'),
-    'page': fields.Integer(required=True, description='当前页码'),
-    'per_page': fields.Integer(required=True, description='每页数量')
+    'total_mode': fields.String(description='总数的计数模式：exact/estimated/cached'),
+    'page': fields.Integer(description='当前页码（游标分页时为空）'),
+    'per_page': fields.Integer(required=True, description='每页数量'),
+    'next_cursor': fields.String(description='下一页游标，没有下一页时为空')
 })
 
+# 列表快速路径：只选 PUBLIC_COLUMNS，按行直接编码为 JSON
+user_row_encoder = RowEncoder(User.PUBLIC_COLUMNS)
+
 @ns.route('')
 class UserList(Resource):
     @ns.doc('get_users',
-            description='获取用户列表',
+            description='获取用户列表：默认使用游标分页，'
+                        '传入 page 时使用页码分页（深度受限）',
             security='apikey',
+            params={
+                'cursor': '上一页返回的 next_cursor',
+                'order_by': '排序方式：created_at、-created_at、id、-id',
+                'page': '页码（兼容旧客户端）',
+                'per_page': '每页数量',
+                'count': '总数计数模式：exact（精确，需全表扫描）、'
+                         'estimated、cached（默认）'
+            },
             responses={
                 200: ('成功', user_list_model),
+                304: '未修改',
+                400: '分页参数无效',
                 401: '未认证',
                 403: '无权限',
                 500: '服务器内部错误'
             })
-    @ns.marshal_with(user_list_model)
     @token_required
     @admin_required
     async def get(self):
-        """获取用户列表"""
-        page = request.args.get('page', 1, type=int)
+        """获取用户列表
+
+        不构建 ORM 对象，也不经过 marshal_with：只查询公开列，
+        直接把行编码为 JSON 字节串，结构与 user_list_model 一致。
+
+        ETag 由查询参数、用户总数和 max(updated_at) 生成，条件请求命中时
+        不再查询当前页。删除用户只通过总数体现，cached 计数模式下
+        其他 worker 的删除最多在计数缓存过期后反映到 ETag 上。
+        """
+        page = request.args.get('page', type=int)
         per_page = request.args.get('per_page', 10, type=int)
+        cursor = request.args.get('cursor')
+        order_by = request.args.get('order_by', 'created_at')
+        count_mode = request.args.get('count', settings.USERS_COUNT_MODE)
         
-        async with AsyncSessionLocal() as session:
-            # 获取总用户数
-            total = await User.count(session)
-            
-            # 获取分页用户列表
-            users = await User.get_paginated(session, page=page, per_page=per_page)
-            
-            return {
-                'users': [user.to_dict() for user in users],
-                'total': total,
-                'page': page,
-                'per_page': per_page
-            }
+        if count_mode not in User.COUNT_MODES:
+            return {'message': f'不支持的计数模式：{count_mode}'}, 400
+        if per_page < 1 or per_page > settings.USERS_MAX_PER_PAGE:
+            max_per_page = settings.USERS_MAX_PER_PAGE
+            return {'message': f'per_page 必须在 1 到 {max_per_page} 之间'}, 400
+
+        session = get_session()
+        # 获取总用户数（默认使用缓存计数，精确计数需显式指定 count=exact）
+        total, total_mode = await User.count(session, mode=count_mode)
+
+        last_modified = await User.last_modified(session)
+        etag = make_etag('users', request.query_string.decode(), total, last_modified)
+        if is_not_modified(etag, last_modified):
+            return not_modified(etag, last_modified)
+
+        if page is not None and cursor is None:
+            # 页码分页：OFFSET 随深度线性变慢，限制最大偏移
+            if page < 1 or (page - 1) * per_page > settings.USERS_MAX_OFFSET:
+                return {'message': '页码超出范围，请使用 cursor 分页'}, 400
+            rows = await User.get_paginated(
+                session, page=page, per_page=per_page, columns_only=True
+            )
+            next_cursor = None
+        else:
+            # 游标分页
+            try:
+                rows, next_cursor = await User.get_page_after(
+                    session,
+                    cursor=cursor,
+                    limit=per_page,
+                    order_by=order_by,
+                    columns_only=True
+                )
+            except ValueError as e:
+                return {'message': str(e)}, 400
+
+        body = dumps({
+            'users': user_row_encoder.to_dicts(rows),
+            'total': total,
+            'total_mode': total_mode,
+            'page': page,
+            'per_page': per_page,
+            'next_cursor': next_cursor
+        })
+        return Response(
+            body,
+            mimetype='application/json',
+            headers=validator_headers(etag, last_modified)
+        )
+
+# 导出格式：格式 -> (MIME 类型, 文件扩展名)
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv', 'csv'),
+}
+
+def encode_export_batch(export_format: str, rows: Sequence[Sequence]) -> str:
+    """把一批用户行编码为 NDJSON 或 CSV 文本"""
+    if export_format == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow(User.row_to_dict(row).values())
+        return buffer.getvalue()
+    return ''.join(
+        json.dumps(User.row_to_dict(row), ensure_ascii=False) + '\n' for row in rows
+    )
+
+def iter_export(export_format: str) -> Iterator[str]:
+    """逐批生成导出内容
+
+    响应体在视图返回、请求级会话释放之后才被迭代，因此使用独立的只读会话（优先读副本）；
+    每一批都提交到共享事件循环读取，客户端中途断开时也会关闭游标并归还连接。
+    """
+    session = ReadSessionLocal()
+    batches = User.stream_public_rows(session, settings.USERS_EXPORT_BATCH_SIZE)
+
+    async def close() -> None:
+        try:
+            await batches.aclose()
+        finally:
+            await session.close()
+
+    try:
+        if export_format == 'csv':
+            buffer = io.StringIO()
+            csv.writer(buffer).writerow(User.PUBLIC_COLUMNS)
+            yield buffer.getvalue()
+        while True:
+            try:
+                rows = run_sync(batches.__anext__())
+            except StopAsyncIteration:
+                break
+            yield encode_export_batch(export_format, rows)
+    finally:
+        run_sync(close())
+
+@ns.route('/export')
+class UserExport(Resource):
+    @ns.doc('export_users',
+            description='流式导出全部用户（分块传输，内存占用与用户数无关）',
+            security='apikey',
+            params={'format': '导出格式：ndjson（默认）或 csv'},
+            responses={
+                200: '成功',
+                400: '不支持的导出格式',
+                401: '未认证',
+                403: '无权限',
+                500: '服务器内部错误'
+            })
+    @token_required
+    @admin_required
+    async def get(self):
+        """流式导出用户"""
+        export_format = request.args.get('format', 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            return {'message': f'不支持的导出格式：{export_format}'}, 400
+
+        mimetype, extension = EXPORT_FORMATS[export_format]
+        return Response(
+            iter_export(export_format),
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename=users.{extension}'}
+        )
+
+batch_operation_model = ns.model('UserBatchOperation', {
+    'op': fields.String(required=True, description='操作：update 或 delete'),
+    'id': fields.Integer(description='用户ID（operations 中使用）'),
+    'values': fields.Raw(description='update 要修改的列：is_active、is_superuser')
+})
+
+batch_request_model = ns.model('UserBatchRequest', {
+    'operations': fields.List(
+        fields.Nested(batch_operation_model), description='逐个用户的操作列表'
+    ),
+    'filter': fields.Raw(
+        description='按条件批量操作：is_active、is_superuser、'
+                    'created_before、created_after'
+    ),
+    'op': fields.String(description='filter 模式下的操作：update 或 delete'),
+    'values': fields.Raw(description='filter 模式下 update 要修改的列')
+})
+
+batch_result_model = ns.model('UserBatchResult', {
+    'id': fields.Integer(description='用户ID'),
+    'op': fields.String(description='操作'),
+    'status': fields.String(description='结果：updated、deleted、not_found、invalid'),
+    'message': fields.String(description='invalid 时的原因')
+})
+
+batch_response_model = ns.model('UserBatchResponse', {
+    'results': fields.List(fields.Nested(batch_result_model)),
+    'updated': fields.Integer(description='更新的用户数'),
+    'deleted': fields.Integer(description='删除的用户数'),
+    'not_found': fields.Integer(description='不存在的用户数'),
+    'invalid': fields.Integer(description='无效的操作数')
+})
+
+BATCH_OPS = ('update', 'delete')
+
+def validate_batch_values(values: Any) -> Dict[str, Any]:
+    """校验批量 update 要修改的列
+
+    Raises:
+        ValueError: 列为空、不允许批量修改或取值不是布尔值
+    """
+    if not isinstance(values, dict) or not values:
+        raise ValueError('update 操作需要 values')
+    for key, value in values.items():
+        if key not in User.BATCH_UPDATE_COLUMNS:
+            raise ValueError(f'不允许批量修改的列：{key}')
+        if not isinstance(value, bool):
+            raise ValueError(f'{key} 必须是布尔值')
+    return values
+
+async def run_batch(session, operations: List[Dict[str, Any]]) -> Dict[int, str]:
+    """按操作类型和修改内容分组，每组执行一条集合语句
+
+    Args:
+        session: 数据库会话
+        operations: 已校验的操作，每项包含 id、op 和 values
+
+    Returns:
+        Dict[int, str]: 用户 ID -> updated/deleted，未出现的 ID 表示用户不存在
+    """
+    groups: Dict[Any, List[int]] = {}
+    for item in operations:
+        key = (item['op'], tuple(sorted(item['values'].items())))
+        groups.setdefault(key, []).append(item['id'])
+
+    done: Dict[int, str] = {}
+    for (op, values), ids in groups.items():
+        if op == 'update':
+            changed = await User.batch_update(session, ids, dict(values))
+            done.update((user_id, 'updated') for user_id in changed)
+        else:
+            removed = await User.batch_delete(session, ids)
+            done.update((user_id, 'deleted') for user_id in removed)
+    return done
+
+@ns.route('/batch')
+class UserBatch(Resource):
+    @ns.doc('batch_users',
+            description='批量更新或删除用户：传入 operations 逐个指定，'
+                        '或传入 filter + op 按条件操作。'
+                        '所有修改在同一事务中以集合语句执行，'
+                        '单次最多影响 USERS_BATCH_MAX_SIZE 个用户',
+            security='apikey',
+            responses={
+                200: ('成功', batch_response_model),
+                400: '请求参数无效或超出批量上限',
+                401: '未认证',
+                403: '无权限',
+                500: '服务器内部错误'
+            })
+    @ns.expect(batch_request_model)
+    @token_required
+    @admin_required
+    async def post(self):
+        """批量操作用户"""
+        data = request.get_json(silent=True) or {}
+        max_size = settings.USERS_BATCH_MAX_SIZE
+        session = get_session()
+
+        results: List[Dict[str, Any]] = []
+        operations: List[Dict[str, Any]] = []
+        if 'filter' in data:
+            # 按条件：先取出匹配的 ID（超出上限时拒绝），再按 ID 执行
+            op = data.get('op')
+            if op not in BATCH_OPS:
+                return {'message': 'op 必须是 update 或 delete'}, 400
+            try:
+                values = {}
+                if op == 'update':
+                    values = validate_batch_values(data.get('values'))
+                clauses = User.batch_filter_clauses(data['filter'])
+            except ValueError as e:
+                return {'message': str(e)}, 400
+            # 不对当前管理员自身执行批量操作
+            ids = await User.select_ids(
+                session, clauses, limit=max_size + 1, exclude_id=g.user.id
+            )
+            if len(ids) > max_size:
+                return {
+                    'message': f'匹配的用户超过批量上限 {max_size}，请缩小过滤条件'
+                }, 400
+            operations = [
+                {'id': user_id, 'op': op, 'values': values} for user_id in ids
+            ]
+            results = [{'id': user_id, 'op': op} for user_id in ids]
+        else:
+            items = data.get('operations')
+            if not isinstance(items, list) or not items:
+                return {'message': '需要 operations 列表或 filter'}, 400
+            if len(items) > max_size:
+                return {'message': f'操作数超过批量上限 {max_size}'}, 400
+            seen = set()
+            for item in items:
+                item = item if isinstance(item, dict) else {}
+                user_id, op = item.get('id'), item.get('op')
+                try:
+                    if not isinstance(user_id, int) or isinstance(user_id, bool):
+                        raise ValueError('id 必须是整数')
+                    if op not in BATCH_OPS:
+                        raise ValueError('op 必须是 update 或 delete')
+                    if user_id in seen:
+                        raise ValueError('同一用户在批量中只能出现一次')
+                    if user_id == g.user.id:
+                        raise ValueError('不能对当前用户执行批量操作')
+                    values = {}
+                    if op == 'update':
+                        values = validate_batch_values(item.get('values'))
+                except ValueError as e:
+                    results.append({
+                        'id': user_id,
+                        'op': op,
+                        'status': 'invalid',
+                        'message': str(e)
+                    })
+                    continue
+                seen.add(user_id)
+                operations.append({'id': user_id, 'op': op, 'values': values})
+                results.append({'id': user_id, 'op': op})
+
+        done = await run_batch(session, operations)
+        await session.commit()
+        statuses = ('updated', 'deleted', 'not_found', 'invalid')
+        summary = {status: 0 for status in statuses}
+        for result in results:
+            result.setdefault('status', done.get(result['id'], 'not_found'))
+            summary[result['status']] += 1
+
+        # 提交之后再失效认证缓存和计数缓存
+        for user_id in done:
+            invalidate_principal(user_id)
+        if summary['deleted']:
+            User.adjust_cached_count(-summary['deleted'])
+        return {'results': results, **summary}
 
 @ns.route('/<int:user_id>')
 @ns.param('user_id', '用户ID')
 class UserDetail(Resource):
     @ns.doc('get_user',
-            description='获取用户详情',
+            description='获取用户详情'
+                        '（支持 If-None-Match / If-Modified-Since 条件请求）',
             security='apikey',
             responses={
                 200: ('成功', user_model),
+                304: '未修改',
                 401: '未认证',
                 403: '无权限',
                 404: '用户不存在',
                 500: '服务器内部错误'
             })
-    @ns.marshal_with(user_model)
+    @query_budget(3)
     @token_required
     @admin_required
     async def get(self, user_id):
         """获取用户详情"""
-        async with AsyncSessionLocal() as session:
-            user = await User.get_by_id(session, user_id)
-            if not user:
+        session = get_session()
+        if request.if_none_match or request.if_modified_since:
+            # 条件请求先只查询 updated_at，未修改时不加载整行
+            updated_at = await User.get_updated_at(session, user_id)
+            if updated_at is None:
                 return {'message': '用户不存在'}, 404
-            return user.to_dict()
+            etag = make_etag('user', user_id, updated_at)
+            if is_not_modified(etag, updated_at):
+                return not_modified(etag, updated_at)
+
+        user = await User.get_by_id(session, user_id)
+        if not user:
+            return {'message': '用户不存在'}, 404
+        etag = make_etag('user', user.id, user.updated_at)
+        return user.to_dict(), 200, validator_headers(etag, user.updated_at)
 
     @ns.doc('update_user',
-            description='更新用户信息',
+            description='更新用户信息（只修改请求中出现的可修改列）',
             security='apikey',
             responses={
                 200: ('成功', user_model),
+                400: '没有可更新的字段或字段无效',
                 401: '未认证',
                 403: '无权限',
                 404: '用户不存在',
+                409: '用户名或邮箱已存在',
                 500: '服务器内部错误'
             })
-    @ns.expect(user_model)
-    @ns.marshal_with(user_model)
+    @ns.expect(user_update_model)
     @token_required
     @admin_required
     async def put(self, user_id):
-        """更新用户信息"""
+        """更新用户信息
+
+        字段类型和长度由 user_update_model 校验（API 开启了 validate），
+        未通过时返回 400。响应与获取用户详情一致，不经过 marshal。
+        """
         data = request.get_json()
+        if not isinstance(data, dict):
+            return {'message': '请求体必须是 JSON 对象'}, 400
+        # 只更新白名单中的列，其余字段（id、时间戳、hashed_password 等）忽略
+        changes = {
+            key: value for key, value in data.items()
+            if key in User.WRITABLE_COLUMNS
+        }
+        if not changes:
+            return {'message': '没有可更新的字段'}, 400
         
-        async with AsyncSessionLocal() as session:
-            user = await User.get_by_id(session, user_id)
-            if not user:
-                return {'message': '用户不存在'}, 404
-            
-            # 更新用户信息
-            for key, value in data.items():
-                if hasattr(user, key):
-                    setattr(user, key, value)
-            
-            await session.commit()
-            await session.refresh(user)
-            return user.to_dict()
+        session = get_session()
+        try:
+            user = await User.update_fields(session, user_id, changes)
+        except ValueError as e:
+            return {'message': str(e)}, 400
+        except IntegrityError as e:
+            await session.rollback()
+            column = User.conflicting_column(e)
+            if column == 'email':
+                return {'message': '邮箱已存在'}, 409
+            if column == 'username':
+                return {'message': '用户名已存在'}, 409
+            # 非唯一约束的完整性错误不是冲突
+            current_app.logger.warning(f"更新用户失败，数据不满足约束：{e.orig}")
+            return {'message': '用户信息无效'}, 400
+        if user is None:
+            return {'message': '用户不存在'}, 404
+
+        await session.commit()
+        invalidate_principal(user_id)
+        return user
 
     @ns.doc('delete_user',
             description='删除用户',
@@ -128,11 +500,13 @@ class UserDetail(Resource):
     @admin_required
     async def delete(self, user_id):
         """删除用户"""
-        async with AsyncSessionLocal() as session:
-            user = await User.get_by_id(session, user_id)
-            if not user:
-                return {'message': '用户不存在'}, 404
-            
-            await session.delete(user)
-            await session.commit()
-            return '', 204 
\ No newline at end of file
+        session = get_session()
+        user = await User.get_by_id(session, user_id)
+        if not user:
+            return {'message': '用户不存在'}, 404
+
+        await session.delete(user)
+        await session.commit()
+        invalidate_principal(user_id)
+        User.adjust_cached_count(-1)
+        return '', 204 
\ No newline at end of file
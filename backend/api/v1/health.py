@@ -1,5 +1,9 @@
 from flask_restx import Namespace, Resource, fields
 from flask import jsonify
+from utils.loop import async_route
+from config.database import engines, replicas
+from utils.auth import admin_required, principal_cache, token_cache, token_required
+from utils.ratelimit import login_limiter, rate_limit_store, register_limiter
 
 # 创建命名空间
 ns = Namespace('health', description='健康检查相关接口')
@@ -20,10 +24,89 @@ class HealthCheck(Resource):
                 500: '服务器内部错误'
             })
     @ns.marshal_with(health_model)
+    @async_route
     async def get(self):
         """获取服务健康状态"""
         return {
             'status': 'healthy',
             'message': '服务运行正常',
             'version': '1.0.0'
-        } 
\ No newline at end of file
+        } 
+
+@ns.route('/pool')
+class PoolStats(Resource):
+    @ns.doc('get_pool_stats',
+            description='获取数据库连接池实时统计（仅管理员）',
+            security='apikey',
+            responses={
+                200: '成功',
+                401: '未认证',
+                403: '无权限',
+                500: '服务器内部错误'
+            })
+    @token_required
+    @admin_required
+    async def get(self):
+        """获取数据库连接池实时统计"""
+        return {'pools': engines.stats()}
+
+
+@ns.route('/replicas')
+class ReplicaStats(Resource):
+    @ns.doc('get_replica_stats',
+            description='获取只读副本的复制延迟和可用性（仅管理员）',
+            security='apikey',
+            responses={
+                200: '成功',
+                401: '未认证',
+                403: '无权限',
+                500: '服务器内部错误'
+            })
+    @token_required
+    @admin_required
+    async def get(self):
+        """获取只读副本状态"""
+        return replicas.stats()
+
+
+@ns.route('/cache')
+class CacheStats(Resource):
+    @ns.doc('get_cache_stats',
+            description='获取进程内缓存命中统计（仅管理员）',
+            security='apikey',
+            responses={
+                200: '成功',
+                401: '未认证',
+                403: '无权限',
+                500: '服务器内部错误'
+            })
+    @token_required
+    @admin_required
+    async def get(self):
+        """获取进程内缓存命中统计"""
+        return {
+            'principal': principal_cache.stats(),
+            'token': token_cache.stats()
+        }
+
+
+@ns.route('/ratelimit')
+class RateLimitStats(Resource):
+    @ns.doc('get_rate_limit_stats',
+            description='获取登录/注册限流的拒绝次数（仅管理员）',
+            security='apikey',
+            responses={
+                200: '成功',
+                401: '未认证',
+                403: '无权限',
+                500: '服务器内部错误'
+            })
+    @token_required
+    @admin_required
+    async def get(self):
+        """获取限流统计（当前 worker）"""
+        return {
+            'buckets': len(rate_limit_store),
+            'login': login_limiter.stats(),
+            'register': register_limiter.stats()
+        }
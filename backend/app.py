@@ -1,35 +1,26 @@
 from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from flask_cors import CORS
-from functools import wraps
-import asyncio
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
+from werkzeug.middleware.proxy_fix import ProxyFix
 
 from config.settings import settings
-from config.database import init_db, Base, AsyncSessionLocal
+from config.database import init_db, engines, get_session, close_session
+from utils.compression import Compressor
+from utils.metrics import init_metrics
+from utils.profiling import profiler
+from utils.query_analyzer import query_analyzer
+from utils.loop import async_route, run_sync
 
 # 初始化扩展
-db = SQLAlchemy()
 login_manager = LoginManager()
 login_manager.login_view = 'auth.login'
+compressor = Compressor()
 
-# 创建异步引擎
-async_engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=settings.IS_DEVELOPMENT,
-    pool_pre_ping=True,
-    pool_size=5,
-    max_overflow=10
-)
+class AsyncFlask(Flask):
+    """在共享事件循环中执行异步视图、错误处理和清理函数的 Flask"""
 
-def async_route(f):
-    """异步路由装饰器"""
-    @wraps(f)
-    def wrapper(*args, **kwargs):
-        return asyncio.run(f(*args, **kwargs))
-    return wrapper
+    def async_to_sync(self, func):
+        return async_route(func)
 
 async def init_app_async():
     """异步初始化应用"""
@@ -44,38 +35,37 @@ def create_app(config_object=None):
     Returns:
         Flask: Flask 应用实例
     """
-    app = Flask(__name__)
+    app = AsyncFlask(__name__)
     
     # 配置应用
     app.config.from_object(config_object or settings)
     
-    # 配置 SQLAlchemy（使用同步 URL）
-    app.config["SQLALCHEMY_DATABASE_URI"] = settings.SYNC_DATABASE_URL
-    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-    app.config["SQLALCHEMY_ECHO"] = settings.IS_DEVELOPMENT
-    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
-        "pool_pre_ping": True,
-        "pool_size": 5,
-        "max_overflow": 10,
-    }
+    # 反向代理之后按 X-Forwarded-For 识别客户端 IP（限流依赖真实 IP）
+    if settings.PROXY_FIX_X_FOR > 0:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=settings.PROXY_FIX_X_FOR)
+
+    # 所有模块共享 config.database 中的引擎注册表
+    app.extensions["db_engines"] = engines
+
+    # 请求指标最先注册，记录的耗时包含其他 after_request 钩子
+    if settings.METRICS_ENABLED:
+        init_metrics(app)
     
     # 初始化扩展
-    db.init_app(app)
-    with app.app_context():
-        Base.metadata.bind = db.engine
-    
     login_manager.init_app(app)
     CORS(app, 
          resources={r"/api/*": {"origins": settings.CORS_ORIGINS}},
          supports_credentials=settings.CORS_CREDENTIALS)
+    compressor.init_app(app)
+    query_analyzer.init_app(app)
+    profiler.init_app(app)
     
 
     @login_manager.user_loader
     @async_route
     async def load_user(user_id):
         from models.user import User
-        async with AsyncSessionLocal() as session:
-            return await User.get_by_id(session, int(user_id))
+        return await User.get_by_id(get_session(), int(user_id))
     
     # 注册蓝图
     from api.v1.api import api_router
@@ -98,6 +88,9 @@ def create_app(config_object=None):
         """健康检查接口"""
         return {"status": "healthy", "message": "服务运行正常"}
 
+    # 请求结束时提交或回滚并释放请求级数据库会话
+    app.teardown_request(close_session)
+
     # 关闭时执行
     @app.teardown_appcontext
     async def shutdown(exception=None):
@@ -106,7 +99,7 @@ def create_app(config_object=None):
         app.logger.info("应用正在关闭")
     
     # 初始化数据库
-    asyncio.run(init_app_async())
+    run_sync(init_app_async())
     app.logger.info("数据库连接池已初始化")
     
     return app 
\ No newline at end of file
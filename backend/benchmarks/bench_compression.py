@@ -0,0 +1,119 @@
+"""响应压缩基准测试
+
+对用户列表响应体（默认 10,000 行，由 ``user_row_encoder`` 编码）和
+Swagger 文档分别用几档 gzip 级别和 brotli 质量压缩，比较 CPU 耗时与压缩后字节数：
+
+- 整体压缩：与非流式响应相同，一次压缩整个响应体；
+- 流式压缩：与导出接口相同，按 ``--chunk-size`` 分块、每块后 flush。
+
+耗时为多次运行中进程 CPU 时间的最小值。brotli 未安装时只测试 gzip。
+不需要数据库。
+
+用法（在 backend 目录下执行）::
+
+    python -m benchmarks.bench_compression --rows 10000 --repeat 5
+"""
+import argparse
+import time
+from typing import Callable, List, Tuple
+
+from api.v1.endpoints.users import user_row_encoder
+from benchmarks.bench_serialization import envelope, make_rows
+from utils import compression, serialization
+
+GZIP_LEVELS = (1, 6, 9)
+BROTLI_QUALITIES = (1, 4, 11)
+
+
+def user_list_body(rows: int) -> bytes:
+    data = make_rows(rows)
+    return serialization.dumps(envelope(user_row_encoder.to_dicts(data), rows))
+
+
+def swagger_body() -> bytes:
+    from app import create_app
+
+    app = create_app()
+    with app.test_client() as client:
+        response = client.get(
+            "/api/v1/swagger.json", headers={"Accept-Encoding": "identity"}
+        )
+        return response.data
+
+
+def compress_whole(factory: Callable, body: bytes, chunk_size: int) -> bytes:
+    stream = factory()
+    return stream.compress(body) + stream.finish()
+
+
+def compress_chunked(factory: Callable, body: bytes, chunk_size: int) -> bytes:
+    stream = factory()
+    parts = [
+        stream.compress(body[i:i + chunk_size], flush=True)
+        for i in range(0, len(body), chunk_size)
+    ]
+    parts.append(stream.finish())
+    return b"".join(parts)
+
+
+def codecs() -> List[Tuple[str, Callable]]:
+    result = [
+        (f"gzip -{level}", lambda level=level: compression.GzipStream(level))
+        for level in GZIP_LEVELS
+    ]
+    if compression.brotli is not None:
+        result += [
+            (
+                f"br q{quality}",
+                lambda quality=quality: compression.BrotliStream(quality),
+            )
+            for quality in BROTLI_QUALITIES
+        ]
+    return result
+
+
+def measure(name: str, body: bytes, repeat: int, chunk_size: int) -> None:
+    print(f"\n{name}：{len(body) / 1024:.1f}KiB")
+    print(
+        f"{'编码':<10} {'方式':<6} {'CPU':>10} {'MiB/s':>8} "
+        f"{'输出':>11} {'压缩比':>7}"
+    )
+    for label, factory in codecs():
+        for mode, func in (("整体", compress_whole), ("流式", compress_chunked)):
+            timings = []
+            for _ in range(repeat):
+                start = time.process_time()
+                out = func(factory, body, chunk_size)
+                timings.append(time.process_time() - start)
+            best = max(min(timings), 1e-9)
+            throughput = len(body) / best / 1024 / 1024
+            print(
+                f"{label:<10} {mode:<6} {best * 1000:>8.2f}ms {throughput:>8.1f} "
+                f"{len(out) / 1024:>9.1f}KiB {len(body) / len(out):>6.1f}x"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="响应压缩基准测试")
+    parser.add_argument("--rows", type=int, default=10000, help="用户列表行数")
+    parser.add_argument("--repeat", type=int, default=5, help="重复次数")
+    parser.add_argument(
+        "--chunk-size", type=int, default=64 * 1024, help="流式压缩的块大小（字节）"
+    )
+    parser.add_argument("--no-swagger", action="store_true", help="不测试 Swagger 文档")
+    args = parser.parse_args()
+
+    if compression.brotli is None:
+        print("未安装 brotli，只测试 gzip")
+    measure(
+        f"用户列表（{args.rows} 行）",
+        user_list_body(args.rows),
+        args.repeat,
+        args.chunk_size,
+    )
+    if not args.no_swagger:
+        measure("swagger.json", swagger_body(), args.repeat, args.chunk_size)
+
+
+if __name__ == "__main__":
+    main()
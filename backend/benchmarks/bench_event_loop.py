@@ -0,0 +1,85 @@
+"""事件循环运行方式基准测试
+
+对比两种把协程交给同步 Flask 视图执行的方式：
+
+- ``asyncio.run``：旧行为，每个请求新建并销毁一个事件循环，
+  连接池无法复用，每次都要重新握手（用 NullPool 模拟）；
+- ``runner``：共享的长期事件循环（utils.loop），连接池跨请求复用。
+
+用法（在 backend 目录下执行）::
+
+    python -m benchmarks.bench_event_loop --requests 2000 --threads 8
+    python -m benchmarks.bench_event_loop --db
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from config.settings import settings
+from utils.loop import LoopRunner
+
+
+def make_handler(engine: Optional[AsyncEngine]) -> Callable:
+    """构造模拟请求处理的协程函数"""
+    async def handler():
+        if engine is None:
+            await asyncio.sleep(0)
+            return 1
+        async with engine.connect() as conn:
+            result = await conn.execute(text("SELECT 1"))
+            return result.scalar()
+    return handler
+
+
+def measure(name: str, call: Callable, requests: int, threads: int) -> float:
+    """多线程执行 call 并返回每秒请求数"""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for _ in pool.map(lambda _: call(), range(requests)):
+            pass
+    elapsed = time.perf_counter() - start
+    rps = requests / elapsed
+    print(f"{name:<12} {requests:>8} 次  {elapsed:>8.3f}s  {rps:>10.1f} req/s")
+    return rps
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="事件循环运行方式基准测试")
+    parser.add_argument("--requests", type=int, default=2000, help="请求总数")
+    parser.add_argument("--threads", type=int, default=8, help="并发线程数")
+    parser.add_argument("--db", action="store_true", help="每个请求执行一次 SELECT 1")
+    parser.add_argument("--url", default=settings.DATABASE_URL, help="数据库 URL")
+    args = parser.parse_args()
+
+    legacy_engine = pooled_engine = None
+    if args.db:
+        legacy_engine = create_async_engine(args.url, poolclass=NullPool)
+        pooled_engine = create_async_engine(
+            args.url, pool_size=args.threads, max_overflow=0
+        )
+
+    legacy = make_handler(legacy_engine)
+    legacy_rps = measure(
+        "asyncio.run", lambda: asyncio.run(legacy()), args.requests, args.threads
+    )
+
+    runner = LoopRunner(name="bench-loop-runner")
+    pooled = make_handler(pooled_engine)
+    runner_rps = measure(
+        "runner", lambda: runner.run(pooled()), args.requests, args.threads
+    )
+    if pooled_engine is not None:
+        runner.run(pooled_engine.dispose())
+    runner.stop()
+
+    print(f"加速比：{runner_rps / legacy_rps:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
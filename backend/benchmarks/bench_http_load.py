@@ -0,0 +1,575 @@
+"""HTTP 端到端压测与回归比较
+
+启动一个 Hypercorn 服务（``cli.py run``，每个 worker 加载 ``create_app()``），
+用 asyncio 负载生成器（每个虚拟用户一个 keep-alive 连接）驱动以下场景：
+
+- ``login``：``POST /api/v1/auth/login``；
+- ``me``：``GET /api/v1/auth/me``；
+- ``list@<行数>``：管理员 ``GET /api/v1/users``，在 ``--sizes`` 指定的
+  每种表大小下各测一次；
+- ``update``：管理员 ``PUT /api/v1/users/<id>``（轮流切换一批测试用户的 is_active）；
+- ``register``：``POST /api/v1/auth/register``（每次使用新的用户名）。
+
+每个场景先预热 ``--warmup`` 秒（不计入结果），再运行 ``--duration`` 秒，
+结果以 JSON 输出：请求数、错误数（状态码不符合预期或连接错误）、吞吐量以及
+p50/p95/p99/最大延迟（毫秒）。
+
+数据库默认使用 ``POSTGRES_*`` 配置；``--sqlite`` 使用临时 SQLite 文件做冒烟测试
+（需要 aiosqlite）。测试用户以 ``bench_`` 开头，结束后删除。
+启动的服务关闭了登录限流；使用 ``--url`` 压测已有服务时需要自行关闭
+（``RATE_LIMIT_ENABLED=false``），并确保数据库与本进程的配置一致。
+
+``compare`` 子命令把结果与基线（默认 ``benchmarks/baselines/http_load.json``，
+由 ``run --sqlite`` 的默认参数生成）比较：任一场景吞吐量下降或 p95/p99 延迟
+上升超过 ``--threshold`` 时以非零状态退出，可用于 CI 中与保存的基线比较。
+基线与机器和数据库相关，需要用相同的参数在同一台机器上生成后再比较。
+
+用法（在 backend 目录下执行）::
+
+    python -m benchmarks.bench_http_load run --sqlite --output current.json
+    python -m benchmarks.bench_http_load compare current.json --threshold 0.1
+    python -m benchmarks.bench_http_load run --workers 4 --concurrency 64 \
+        --sizes 1000,100000 --output current.json
+    python -m benchmarks.bench_http_load compare current.json --baseline pg.json
+    python -m benchmarks.bench_http_load run --sqlite \
+        --output benchmarks/baselines/http_load.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+PREFIX = "bench_"
+PASSWORD = "bench-password"
+UPDATE_TARGETS = 50
+DEFAULT_BASELINE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "baselines", "http_load.json"
+)
+# 请求：(方法, 路径, 是否带管理员令牌/用户令牌/不带, 请求体, 期望的状态码)
+Request = Tuple[str, str, Optional[str], Optional[dict], int]
+
+
+class Connection:
+    """最小的 HTTP/1.1 keep-alive 客户端连接
+
+    只实现压测需要的部分：JSON 请求体、Content-Length 和分块传输的响应。
+    """
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    async def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except OSError:
+                pass
+        self._reader = self._writer = None
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        headers: Dict[str, str],
+        body: Optional[bytes] = None,
+    ) -> Tuple[int, bytes]:
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(
+                self.host, self.port
+            )
+        lines = [
+            f"{method} {path} HTTP/1.1",
+            f"Host: {self.host}:{self.port}",
+            "Accept-Encoding: gzip",
+        ]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        if body is not None:
+            lines += ["Content-Type: application/json", f"Content-Length: {len(body)}"]
+        self._writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + (body or b""))
+        await self._writer.drain()
+
+        status_line = await self._reader.readline()
+        if not status_line:
+            raise ConnectionError("连接已关闭")
+        status = int(status_line.split()[1])
+        response_headers: Dict[str, str] = {}
+        while True:
+            line = await self._reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            response_headers[name.strip().lower()] = value.strip()
+
+        if response_headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await self._reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    await self._reader.readline()
+                    break
+                chunks.append((await self._reader.readexactly(size + 2))[:-2])
+            data = b"".join(chunks)
+        elif "content-length" in response_headers:
+            length = int(response_headers["content-length"])
+            data = await self._reader.readexactly(length)
+        else:
+            data = await self._reader.read()
+            await self.close()
+        if response_headers.get("connection", "").lower() == "close":
+            await self.close()
+        return status, data
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """最近秩法百分位数"""
+    if not sorted_values:
+        return 0.0
+    index = max(int(round(fraction * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+def summarize(latencies: List[float], errors: int, duration: float) -> Dict[str, Any]:
+    latencies = sorted(latencies)
+    total = len(latencies)
+    return {
+        "requests": total,
+        "errors": errors,
+        "rps": round(total / duration, 2) if duration else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+    }
+
+
+class LoadGenerator:
+    """并发运行一个场景并统计延迟"""
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        tokens: Dict[str, str],
+        concurrency: int,
+        warmup: float,
+        duration: float,
+    ):
+        self.host = host
+        self.port = port
+        self.tokens = tokens
+        self.concurrency = concurrency
+        self.warmup = warmup
+        self.duration = duration
+
+    async def _user(
+        self,
+        make_request: Callable[[], Request],
+        measure_from: float,
+        deadline: float,
+        latencies: List[float],
+        errors: List[int],
+    ) -> None:
+        connection = Connection(self.host, self.port)
+        try:
+            while time.perf_counter() < deadline:
+                method, path, auth, payload, expected = make_request()
+                headers = {}
+                if auth:
+                    headers["Authorization"] = f"Bearer {self.tokens[auth]}"
+                body = json.dumps(payload).encode() if payload is not None else None
+                start = time.perf_counter()
+                try:
+                    status, _ = await connection.request(method, path, headers, body)
+                except (OSError, ValueError, asyncio.IncompleteReadError):
+                    status = 0
+                    await connection.close()
+                if start < measure_from:
+                    continue
+                latencies.append(time.perf_counter() - start)
+                if status != expected:
+                    errors[0] += 1
+        finally:
+            await connection.close()
+
+    async def run(self, make_request: Callable[[], Request]) -> Dict[str, Any]:
+        latencies: List[float] = []
+        errors = [0]
+        measure_from = time.perf_counter() + self.warmup
+        deadline = measure_from + self.duration
+        await asyncio.gather(*(
+            self._user(make_request, measure_from, deadline, latencies, errors)
+            for _ in range(self.concurrency)
+        ))
+        return summarize(latencies, errors[0], self.duration)
+
+
+async def seed_users(target: int, update_targets: int = UPDATE_TARGETS) -> List[int]:
+    """补足用户表到 target 行（至少包含测试账号和 update 场景的目标用户）
+
+    Returns:
+        List[int]: update 场景使用的用户 ID
+    """
+    from sqlalchemy import func, insert, select
+    from werkzeug.security import generate_password_hash
+
+    from config.database import AsyncSessionLocal
+    from models.user import User
+
+    hashed = generate_password_hash(PASSWORD)
+    async with AsyncSessionLocal() as session:
+        accounts = [
+            {
+                "username": f"{PREFIX}{role}",
+                "email": f"{PREFIX}{role}@bench.test",
+                "hashed_password": hashed,
+                "is_superuser": role == "admin",
+            }
+            for role in ("admin", "user")
+        ]
+        result = await session.execute(
+            select(User.username).where(
+                User.username.in_([account["username"] for account in accounts])
+            )
+        )
+        existing = set(result.scalars())
+        accounts = [
+            account for account in accounts if account["username"] not in existing
+        ]
+        if accounts:
+            await session.execute(insert(User), accounts)
+
+        result = await session.execute(select(func.count()).select_from(User))
+        total = result.scalar_one()
+        missing = max(target, update_targets + 2) - total
+        batch = uuid.uuid4().hex[:6]
+        for start in range(0, max(missing, 0), 5000):
+            rows = [
+                {
+                    "username": f"{PREFIX}{batch}_{i}",
+                    "email": f"{PREFIX}{batch}_{i}@bench.test",
+                    "hashed_password": hashed,
+                }
+                for i in range(start, min(start + 5000, missing))
+            ]
+            await session.execute(insert(User), rows)
+        await session.commit()
+
+        result = await session.execute(
+            select(User.id)
+            .where(
+                User.username.like(f"{PREFIX}%"),
+                User.is_superuser.is_(False),
+                User.username != f"{PREFIX}user",
+            )
+            .order_by(User.id)
+            .limit(update_targets)
+        )
+        return list(result.scalars())
+
+
+async def cleanup_users() -> None:
+    from sqlalchemy import delete
+
+    from config.database import AsyncSessionLocal
+    from models.user import User
+
+    async with AsyncSessionLocal() as session:
+        await session.execute(delete(User).where(User.username.like(f"{PREFIX}%")))
+        await session.commit()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int, workers: int) -> subprocess.Popen:
+    """启动 Hypercorn（继承当前环境变量，关闭登录限流）"""
+    env = dict(os.environ, RATE_LIMIT_ENABLED="false")
+    return subprocess.Popen(
+        [
+            sys.executable, "cli.py", "run",
+            "--env", os.environ.get("ENV", "testing"),
+            "--no-debug",
+            "--bind", f"127.0.0.1:{port}",
+            "--workers", str(workers),
+        ],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+async def wait_ready(host: str, port: int, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        connection = Connection(host, port)
+        try:
+            status, _ = await connection.request("GET", "/api/v1/health", {})
+            if status == 200:
+                return
+        except (OSError, ValueError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            await connection.close()
+        await asyncio.sleep(0.2)
+    raise RuntimeError("服务未能在超时时间内启动")
+
+
+async def login(host: str, port: int, username: str) -> str:
+    connection = Connection(host, port)
+    try:
+        body = json.dumps({"username": username, "password": PASSWORD}).encode()
+        status, data = await connection.request("POST", "/api/v1/auth/login", {}, body)
+    finally:
+        await connection.close()
+    if status != 200:
+        raise RuntimeError(f"测试账号登录失败：{status} {data[:200]!r}")
+    return json.loads(data)["access_token"]
+
+
+def scenarios(update_ids: List[int]) -> Dict[str, Callable[[], Request]]:
+    """场景名 -> 生成下一个请求的函数（list 场景在 run 中按表大小单独生成）"""
+    register_counter = itertools.count()
+    register_batch = uuid.uuid4().hex[:6]
+    update_cycle = itertools.cycle(update_ids)
+    toggle = itertools.cycle([False, True])
+
+    def register() -> Request:
+        i = next(register_counter)
+        name = f"{PREFIX}r{register_batch}_{i}"
+        payload = {
+            "username": name,
+            "email": f"{name}@bench.test",
+            "password": PASSWORD,
+        }
+        return "POST", "/api/v1/auth/register", None, payload, 201
+
+    def update() -> Request:
+        user_id = next(update_cycle)
+        payload = {"is_active": next(toggle)}
+        return "PUT", f"/api/v1/users/{user_id}", "admin", payload, 200
+
+    login_payload = {"username": f"{PREFIX}user", "password": PASSWORD}
+    return {
+        "login": lambda: ("POST", "/api/v1/auth/login", None, login_payload, 200),
+        "me": lambda: ("GET", "/api/v1/auth/me", "user", None, 200),
+        "update": update,
+        "register": register,
+    }
+
+
+async def run_suite(args: argparse.Namespace) -> Dict[str, Any]:
+    from utils.loop import run_sync
+
+    sizes = sorted(int(size) for size in args.sizes.split(","))
+    selected = set(args.scenarios.split(",")) if args.scenarios else None
+    server = None
+    if args.url:
+        host, _, port = args.url.split("://")[-1].partition(":")
+        port = int(port.rstrip("/") or 80)
+    else:
+        host, port = "127.0.0.1", free_port()
+
+    # 种子数据在本进程的共享事件循环中写入（与服务使用同一个数据库）
+    import models.user  # noqa: F401  注册模型，init_db 才会建表
+    from config.database import init_db
+    run_sync(init_db())
+    update_ids = run_sync(seed_users(sizes[0]))
+    try:
+        if not args.url:
+            server = start_server(port, args.workers)
+        await wait_ready(host, port)
+        tokens = {
+            "admin": await login(host, port, f"{PREFIX}admin"),
+            "user": await login(host, port, f"{PREFIX}user"),
+        }
+        generator = LoadGenerator(
+            host, port, tokens, args.concurrency, args.warmup, args.duration
+        )
+        results: Dict[str, Any] = {}
+
+        async def measure(name: str, make_request: Callable[[], Request]) -> None:
+            results[name] = await generator.run(make_request)
+            summary = json.dumps(results[name], ensure_ascii=False)
+            print(f"{name:<16} {summary}", file=sys.stderr)
+
+        named = scenarios(update_ids)
+        for name in ("login", "me", "update"):
+            if selected is None or name in selected:
+                await measure(name, named[name])
+
+        if selected is None or "list" in selected:
+            path = f"/api/v1/users?per_page={args.per_page}"
+            for size in sizes:
+                run_sync(seed_users(size))
+                request = ("GET", path, "admin", None, 200)
+                await measure(f"list@{size}", lambda request=request: request)
+
+        # 注册会增加用户数，放在最后
+        if selected is None or "register" in selected:
+            await measure("register", named["register"])
+    finally:
+        if server is not None:
+            server.terminate()
+            try:
+                server.wait(10)
+            except subprocess.TimeoutExpired:
+                server.kill()
+        if not args.keep_data:
+            run_sync(cleanup_users())
+
+    from config.settings import settings
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "database": settings.DATABASE_URL.split(":", 1)[0],
+            "workers": None if args.url else args.workers,
+            "concurrency": args.concurrency,
+            "warmup": args.warmup,
+            "duration": args.duration,
+            "per_page": args.per_page,
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+        },
+        "results": results,
+    }
+
+
+def compare(
+    baseline: Dict[str, Any], current: Dict[str, Any], threshold: float
+) -> List[str]:
+    """打印对比表，返回超过阈值的回归描述"""
+    regressions = []
+    print(
+        f"{'场景':<16} {'rps 基线':>10} {'rps 当前':>10} {'变化':>8} "
+        f"{'p95 基线':>10} {'p95 当前':>10} {'p99 基线':>10} {'p99 当前':>10}"
+    )
+    for name, base in baseline["results"].items():
+        cur = current["results"].get(name)
+        if cur is None:
+            print(f"{name:<16} 当前结果中没有该场景")
+            continue
+        rps_change = 0.0
+        if base["rps"]:
+            rps_change = (cur["rps"] - base["rps"]) / base["rps"]
+        print(
+            f"{name:<16} {base['rps']:>10.1f} {cur['rps']:>10.1f} "
+            f"{rps_change:>+8.1%} "
+            f"{base['p95_ms']:>10.2f} {cur['p95_ms']:>10.2f} "
+            f"{base['p99_ms']:>10.2f} {cur['p99_ms']:>10.2f}"
+        )
+        if rps_change < -threshold:
+            regressions.append(f"{name}：吞吐量下降 {-rps_change:.1%}")
+        for key in ("p95_ms", "p99_ms"):
+            if not base[key]:
+                continue
+            change = (cur[key] - base[key]) / base[key]
+            if change > threshold:
+                regressions.append(f"{name}：{key} 上升 {change:.1%}")
+        if cur["errors"] > base["errors"]:
+            regressions.append(
+                f"{name}：错误数从 {base['errors']} 增加到 {cur['errors']}"
+            )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="HTTP 端到端压测与回归比较")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="运行压测")
+    run_parser.add_argument(
+        "--url", help="压测已有的服务（如 http://127.0.0.1:8000），默认启动新的服务"
+    )
+    run_parser.add_argument(
+        "--sqlite", action="store_true", help="使用临时 SQLite 数据库（冒烟测试）"
+    )
+    run_parser.add_argument(
+        "--workers", type=int, default=1, help="启动的服务的 worker 数"
+    )
+    run_parser.add_argument(
+        "--concurrency", type=int, default=16, help="并发虚拟用户数"
+    )
+    run_parser.add_argument(
+        "--warmup", type=float, default=2.0, help="每个场景的预热时间（秒）"
+    )
+    run_parser.add_argument(
+        "--duration", type=float, default=10.0, help="每个场景的统计时间（秒）"
+    )
+    run_parser.add_argument(
+        "--sizes", default="1000,10000", help="list 场景的用户表大小，逗号分隔"
+    )
+    run_parser.add_argument(
+        "--per-page", type=int, default=20, help="list 场景每页条数"
+    )
+    run_parser.add_argument(
+        "--scenarios",
+        help="只运行指定场景，逗号分隔：login,me,update,list,register",
+    )
+    run_parser.add_argument(
+        "--keep-data", action="store_true", help="结束后保留测试用户"
+    )
+    run_parser.add_argument("--output", help="结果 JSON 文件，默认输出到标准输出")
+
+    compare_parser = subparsers.add_parser("compare", help="与基线比较")
+    compare_parser.add_argument("current", help="当前结果 JSON")
+    compare_parser.add_argument(
+        "--baseline", default=DEFAULT_BASELINE, help="基线结果 JSON"
+    )
+    compare_parser.add_argument(
+        "--threshold", type=float, default=0.1, help="允许的退化比例"
+    )
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+        meta = baseline["meta"]
+        print(f"基线：{args.baseline}（{meta['timestamp']}，{meta['database']}）")
+        regressions = compare(baseline, current, args.threshold)
+        if regressions:
+            print("\n性能回归：\n" + "\n".join(f"  {item}" for item in regressions))
+            sys.exit(1)
+        print("\n未发现超过阈值的回归")
+        return
+
+    sqlite_path = None
+    if args.sqlite:
+        # 必须在导入 config 之前设置，服务子进程继承同一环境变量
+        sqlite_path = os.path.join(tempfile.mkdtemp(prefix="bench-"), "bench.db")
+        os.environ["DB_URL"] = f"sqlite+aiosqlite:///{sqlite_path}"
+    os.environ.setdefault("ENV", "testing")
+    try:
+        report = asyncio.run(run_suite(args))
+    finally:
+        if sqlite_path is not None and os.path.exists(sqlite_path):
+            os.remove(sqlite_path)
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
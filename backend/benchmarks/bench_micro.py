@@ -0,0 +1,262 @@
+"""认证与序列化热点路径的微基准测试
+
+单独测量以下函数（不需要数据库和服务）：
+
+- ``create_access_token`` / ``create_refresh_token``；
+- ``verify_token``（令牌缓存命中 ``verify_token[cached]`` 和关闭缓存
+  ``verify_token[uncached]``）；
+- ``User.set_password`` / ``User.verify_password``（pbkdf2，当前线程中计算）；
+- ``User.to_dict``；
+- flask-restx ``marshal(user_list_model)``（一页 ``--page-size`` 个用户）。
+
+每项先自动确定单轮循环次数（单轮至少 ``--min-time`` 秒），取 ``--repeat``
+轮中最快的一轮计算 ops/s；再用 tracemalloc 统计单次调用的内存分配峰值
+（多次取中位数）。结果与基线文件（默认 ``benchmarks/baselines/micro.json``）
+逐项对比输出表格；``--save`` 把本次结果写为新基线。
+
+基线与机器相关，只在同一台机器上比较才有意义；修改热点路径前后各跑一次，
+或在 CI 固定的机器上更新基线。``--fail-threshold`` 设置后，任一项 ops/s
+下降超过该比例时以非零状态退出；此时基线文件必须存在。
+
+用法（在 backend 目录下执行）::
+
+    python -m benchmarks.bench_micro
+    python -m benchmarks.bench_micro --only verify_token,to_dict --repeat 7
+    python -m benchmarks.bench_micro --save
+    python -m benchmarks.bench_micro --fail-threshold 0.2
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from flask import Flask
+from flask_restx import marshal
+
+from api.v1.endpoints.users import user_list_model
+from benchmarks.bench_serialization import envelope, make_rows
+from models.user import User
+from utils import auth
+from utils.auth import create_access_token, create_refresh_token, verify_token
+from utils.cache import TTLCache
+
+DEFAULT_BASELINE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "baselines", "micro.json"
+)
+ALLOC_SAMPLES = 5
+
+
+def build_cases(page_size: int) -> Dict[str, Callable[[], Any]]:
+    """基准项名称 -> 无参数的被测调用"""
+    token = create_access_token(user_id=1)
+    user = User(**dict(zip(User.PUBLIC_COLUMNS, make_rows(1)[0])))
+    user.set_password("benchmark-password")
+    page = envelope([User.row_to_dict(row) for row in make_rows(page_size)], page_size)
+
+    return {
+        "create_access_token": lambda: create_access_token(user_id=1),
+        "create_refresh_token": lambda: create_refresh_token(user_id=1),
+        # 两项调用相同，运行时分别替换为正常大小和容量为 0 的令牌缓存
+        "verify_token[cached]": lambda: verify_token(token),
+        "verify_token[uncached]": lambda: verify_token(token),
+        "set_password": lambda: user.set_password("benchmark-password"),
+        "verify_password": lambda: user.verify_password("benchmark-password"),
+        "to_dict": user.to_dict,
+        "marshal_user_list": lambda: marshal(page, user_list_model),
+    }
+
+
+def calibrate(func: Callable[[], Any], min_time: float) -> int:
+    """单轮耗时不少于 min_time 的循环次数"""
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return loops
+        # 按已测耗时估算，最多放大 10 倍，避免首轮过快导致估算偏差
+        estimate = int(loops * min_time / max(elapsed, 1e-9) * 1.2)
+        loops = max(loops + 1, min(loops * 10, estimate))
+
+
+def measure(func: Callable[[], Any], min_time: float, repeat: int) -> Dict[str, Any]:
+    """返回 ops/s 和单次调用的内存分配峰值"""
+    loops = calibrate(func, min_time)
+    timings = []
+    gc_was_enabled = gc.isenabled()
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(loops):
+                func()
+            timings.append(time.perf_counter() - start)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    peaks = []
+    tracemalloc.start()
+    try:
+        for _ in range(ALLOC_SAMPLES):
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            func()
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - current)
+    finally:
+        tracemalloc.stop()
+
+    best = min(timings)
+    return {
+        "ops_per_sec": round(loops / best, 1),
+        "us_per_op": round(best / loops * 1e6, 3),
+        "alloc_peak_bytes": int(statistics.median(peaks)),
+        "loops": loops,
+    }
+
+
+def load_baseline(path: str) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def print_table(
+    results: Dict[str, Dict[str, Any]], baseline: Optional[Dict[str, Any]]
+) -> List[Any]:
+    """打印结果（有基线时附带对比），返回 (名称, ops/s 变化比例) 列表"""
+    base_results = baseline["results"] if baseline else {}
+    changes = []
+    print(
+        f"{'基准项':<24} {'ops/s':>12} {'基线 ops/s':>12} {'变化':>8} "
+        f"{'分配峰值':>10} {'基线峰值':>10}"
+    )
+    for name, result in results.items():
+        ops, alloc = result["ops_per_sec"], result["alloc_peak_bytes"]
+        base = base_results.get(name)
+        if base is None:
+            print(f"{name:<24} {ops:>12.1f} {'-':>12} {'-':>8} {alloc:>9}B {'-':>10}")
+            continue
+        change = (ops - base["ops_per_sec"]) / base["ops_per_sec"]
+        changes.append((name, change))
+        print(
+            f"{name:<24} {ops:>12.1f} {base['ops_per_sec']:>12.1f} {change:>+8.1%} "
+            f"{alloc:>9}B {base['alloc_peak_bytes']:>9}B"
+        )
+    return changes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="认证与序列化热点路径的微基准测试")
+    parser.add_argument(
+        "--only", help="只运行名称中包含这些关键字的基准项，逗号分隔"
+    )
+    parser.add_argument(
+        "--min-time", type=float, default=0.2, help="单轮最短耗时（秒）"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="计时轮数，取最快的一轮"
+    )
+    parser.add_argument(
+        "--page-size", type=int, default=20, help="marshal_user_list 每页用户数"
+    )
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="基线文件")
+    parser.add_argument("--save", action="store_true", help="把本次结果写为基线")
+    parser.add_argument("--output", help="另外把本次结果写入该文件")
+    parser.add_argument(
+        "--fail-threshold", type=float, help="ops/s 下降超过该比例时以非零状态退出"
+    )
+    args = parser.parse_args()
+
+    baseline = load_baseline(args.baseline)
+    if baseline is None and args.fail_threshold is not None:
+        # 没有基线时无从比较，不能当作通过
+        parser.error(f"找不到基线文件：{args.baseline}")
+
+    # create_access_token 需要应用上下文来记录日志
+    with Flask(__name__).app_context():
+        cases = build_cases(args.page_size)
+        if args.only:
+            keywords = args.only.split(",")
+            cases = {
+                name: func
+                for name, func in cases.items()
+                if any(keyword in name for keyword in keywords)
+            }
+
+        token_cache = auth.token_cache
+        results = {}
+        try:
+            for name, func in cases.items():
+                uncached = name == "verify_token[uncached]"
+                auth.token_cache = TTLCache(maxsize=0 if uncached else 1000)
+                results[name] = measure(func, args.min_time, args.repeat)
+                print(f"{name:<24} 完成", file=sys.stderr)
+        finally:
+            auth.token_cache = token_cache
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "min_time": args.min_time,
+            "repeat": args.repeat,
+            "page_size": args.page_size,
+        },
+        "results": results,
+    }
+
+    if baseline is not None:
+        meta = baseline["meta"]
+        print(
+            f"基线：{args.baseline}（{meta['timestamp']}，"
+            f"Python {meta['python']}，{meta['cpus']} CPU）"
+        )
+    else:
+        print(f"未找到基线：{args.baseline}")
+    changes = print_table(results, baseline)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+    if args.save:
+        if args.only and baseline is not None:
+            # 只更新运行过的项，保留其余基线
+            baseline["results"].update(results)
+            baseline["meta"] = report["meta"]
+            report = baseline
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        print(f"已写入基线：{args.baseline}")
+
+    if args.fail_threshold is not None:
+        regressions = [
+            f"  {name}：ops/s 下降 {-change:.1%}"
+            for name, change in changes
+            if change < -args.fail_threshold
+        ]
+        if regressions:
+            print("\n性能回归：\n" + "\n".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""用户列表分页延迟基准测试
+
+对比 OFFSET 分页（``User.get_paginated``）和键集分页
+（``User.get_page_after``）在第 1 页和深页（默认第 10,000 页）的 p50/p99 延迟。
+表中行数不足时会先批量写入测试用户。
+
+用法（在 backend 目录下执行）::
+
+    python -m benchmarks.bench_pagination --rows 200000 --page 10000
+    python -m benchmarks.bench_pagination --url sqlite+aiosqlite:///bench.db \
+        --rows 50000 --page 2000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, List
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from config.database import Base
+from config.settings import settings
+from models.user import User
+from utils.pagination import encode_cursor
+
+SEED_BATCH = 5000
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """计算百分位数（毫秒）"""
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index] * 1000
+
+
+async def seed(session_factory, rows: int) -> None:
+    """补足测试用户"""
+    async with session_factory() as session:
+        result = await session.execute(select(func.count()).select_from(User))
+        existing = result.scalar_one()
+        if existing >= rows:
+            return
+        print(f"写入测试用户：{existing} -> {rows}")
+        start = datetime.utcnow()
+        for offset in range(existing, rows, SEED_BATCH):
+            batch = [
+                {
+                    "username": f"bench_{i}",
+                    "email": f"bench_{i}@example.com",
+                    "hashed_password": "x",
+                    "is_active": True,
+                    "is_superuser": False,
+                    "created_at": start + timedelta(microseconds=i),
+                    "updated_at": start + timedelta(microseconds=i),
+                }
+                for i in range(offset, min(offset + SEED_BATCH, rows))
+            ]
+            await session.execute(insert(User), batch)
+            await session.commit()
+
+
+async def measure(name: str, query: Callable[[], Awaitable], samples: int) -> None:
+    """重复执行查询并打印延迟分布"""
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        await query()
+        timings.append(time.perf_counter() - start)
+    print(
+        f"{name:<24} p50 {percentile(timings, 50):>8.2f}ms  "
+        f"p99 {percentile(timings, 99):>8.2f}ms  "
+        f"mean {statistics.mean(timings) * 1000:>8.2f}ms"
+    )
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    engine = create_async_engine(args.url)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    await seed(session_factory, args.rows)
+
+    async with session_factory() as session:
+        # 深页对应的游标：目标页之前最后一行的排序键
+        deep_offset = (args.page - 1) * args.per_page
+        last = (
+            await session.execute(
+                select(User.created_at, User.id)
+                .order_by(User.created_at, User.id)
+                .offset(deep_offset - 1)
+                .limit(1)
+            )
+        ).one()
+        deep_cursor = encode_cursor("created_at", list(last))
+
+        async def offset_page(page: int):
+            session.expunge_all()
+            return await User.get_paginated(session, page=page, per_page=args.per_page)
+
+        async def keyset_page(cursor):
+            session.expunge_all()
+            return await User.get_page_after(
+                session, cursor=cursor, limit=args.per_page
+            )
+
+        deep = args.page
+        await measure("offset page 1", lambda: offset_page(1), args.samples)
+        await measure(f"offset page {deep}", lambda: offset_page(deep), args.samples)
+        await measure("keyset page 1", lambda: keyset_page(None), args.samples)
+        await measure(
+            f"keyset page {deep}", lambda: keyset_page(deep_cursor), args.samples
+        )
+
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="用户列表分页延迟基准测试")
+    parser.add_argument("--url", default=settings.DATABASE_URL, help="数据库 URL")
+    parser.add_argument("--rows", type=int, default=200000, help="用户表行数")
+    parser.add_argument("--page", type=int, default=10000, help="深页页码")
+    parser.add_argument("--per-page", type=int, default=10, help="每页数量")
+    parser.add_argument("--samples", type=int, default=200, help="每种查询的采样次数")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
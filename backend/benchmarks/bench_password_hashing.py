@@ -0,0 +1,79 @@
+"""登录密码验证吞吐基准测试
+
+对比在事件循环线程中直接执行 pbkdf2（旧行为）和通过
+``utils.hashing.HashingExecutor`` 进程池执行时，并发登录请求的吞吐。
+
+用法（在 backend 目录下执行）::
+
+    python -m benchmarks.bench_password_hashing --logins 200 --concurrency 32
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from utils.hashing import HashingExecutor, hash_password_sync, verify_password_sync
+
+
+async def inline_login(hashed: str, password: str) -> bool:
+    await asyncio.sleep(0)
+    return verify_password_sync(hashed, password)
+
+
+async def run(name: str, login, logins: int, concurrency: int) -> float:
+    """以给定并发度执行登录验证并返回每秒登录数"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one() -> None:
+        async with semaphore:
+            if not await login():
+                raise RuntimeError("密码验证失败")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    rate = logins / elapsed
+    print(f"{name:<16} {logins:>6} 次  {elapsed:>8.3f}s  {rate:>10.1f} logins/s")
+    return rate
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    password = "benchmark-password"
+    hashed = hash_password_sync(password)
+    print(f"CPU 核数：{os.cpu_count()}，进程池大小：{args.workers}")
+
+    before = await run(
+        "inline",
+        lambda: inline_login(hashed, password),
+        args.logins,
+        args.concurrency,
+    )
+
+    executor = HashingExecutor(workers=args.workers, max_pending=args.concurrency)
+    # 预热进程池，排除子进程启动时间
+    await asyncio.gather(
+        *(executor.verify(hashed, password) for _ in range(args.workers))
+    )
+    after = await run(
+        "process pool",
+        lambda: executor.verify(hashed, password),
+        args.logins,
+        args.concurrency,
+    )
+    executor.shutdown()
+
+    print(f"加速比：{after / before:.2f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="登录密码验证吞吐基准测试")
+    parser.add_argument("--logins", type=int, default=200, help="登录次数")
+    parser.add_argument("--concurrency", type=int, default=32, help="并发登录数")
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 1, help="进程池大小"
+    )
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
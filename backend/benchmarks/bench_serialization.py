@@ -0,0 +1,119 @@
+"""用户列表序列化基准测试
+
+对比两种把一页用户编码为 JSON 响应体的方式（默认 10,000 行）：
+
+- ``marshal``：旧路径，构建 ORM ``User`` 对象 -> ``to_dict``（isoformat）
+  -> flask-restx ``marshal(user_list_model)`` -> ``json.dumps``；
+- ``row encoder``：新路径，按 PUBLIC_COLUMNS 选出的元组 -> ``RowEncoder``
+  -> ``utils.serialization.dumps``（orjson，未安装时为标准库 json）。
+
+耗时取多次运行的最小值；内存用 tracemalloc 统计单次运行的分配峰值。
+不需要数据库。
+
+用法（在 backend 目录下执行）::
+
+    python -m benchmarks.bench_serialization --rows 10000 --repeat 5
+"""
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, List, Tuple
+
+from flask_restx import marshal
+
+from api.v1.endpoints.users import user_list_model, user_row_encoder
+from models.user import User
+from utils import serialization
+
+
+def make_rows(count: int) -> List[Tuple[Any, ...]]:
+    """构造按 PUBLIC_COLUMNS 排列的测试行"""
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return [
+        (
+            i,
+            f"user_{i}",
+            f"user_{i}@example.com",
+            True,
+            i % 50 == 0,
+            start + timedelta(seconds=i),
+            start + timedelta(seconds=i, microseconds=i),
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+def envelope(users: Any, count: int) -> dict:
+    return {
+        "users": users,
+        "total": count,
+        "total_mode": "cached",
+        "page": None,
+        "per_page": count,
+        "next_cursor": None,
+    }
+
+
+def legacy(rows: List[Tuple[Any, ...]]) -> bytes:
+    """ORM 对象 + to_dict + marshal + json.dumps"""
+    users = [User(**dict(zip(User.PUBLIC_COLUMNS, row))) for row in rows]
+    page = envelope([user.to_dict() for user in users], len(rows))
+    data = marshal(page, user_list_model)
+    return json.dumps(data).encode()
+
+
+def fast(rows: List[Tuple[Any, ...]]) -> bytes:
+    """行编码器"""
+    return serialization.dumps(envelope(user_row_encoder.to_dicts(rows), len(rows)))
+
+
+def measure(
+    name: str,
+    func: Callable[[List[Tuple[Any, ...]]], bytes],
+    rows: List[Tuple[Any, ...]],
+    repeat: int,
+) -> float:
+    """打印最小耗时和内存分配峰值，返回最小耗时（秒）"""
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        body = func(rows)
+        timings.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    func(rows)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    best = min(timings)
+    print(
+        f"{name:<20} {best * 1000:>9.2f}ms  {len(rows) / best:>12.0f} rows/s  "
+        f"peak {peak / 1024 / 1024:>7.2f}MiB  body {len(body) / 1024:>8.1f}KiB"
+    )
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="用户列表序列化基准测试")
+    parser.add_argument("--rows", type=int, default=10000, help="行数")
+    parser.add_argument("--repeat", type=int, default=5, help="重复次数")
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    # 两条路径的输出必须一致
+    assert json.loads(legacy(rows[:100])) == json.loads(fast(rows[:100]))
+
+    backend = "orjson" if serialization.orjson is not None else "json"
+    print(f"{args.rows} 行，重复 {args.repeat} 次，编码后端：{backend}")
+    old = measure("marshal", legacy, rows, args.repeat)
+    new = measure("row encoder", fast, rows, args.repeat)
+    print(f"加速 {old / new:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""JWT 验证吞吐基准测试
+
+对比 ``utils.auth.verify_token`` 在令牌缓存开启和关闭时的吞吐。
+客户端在令牌有效期内会反复携带同一个令牌，``--tokens`` 控制
+参与轮询的不同令牌数量。
+
+用法（在 backend 目录下执行）::
+
+    python -m benchmarks.bench_verify_token --iterations 50000 --tokens 100
+"""
+import argparse
+import time
+from typing import List
+
+from flask import Flask
+
+from utils import auth
+from utils.auth import create_access_token, verify_token
+from utils.cache import TTLCache
+
+
+def measure(name: str, tokens: List[str], iterations: int) -> float:
+    """轮询验证令牌并返回每秒验证次数"""
+    count = len(tokens)
+    start = time.perf_counter()
+    for i in range(iterations):
+        if verify_token(tokens[i % count]) is None:
+            raise RuntimeError("令牌验证失败")
+    elapsed = time.perf_counter() - start
+    ops = iterations / elapsed
+    print(f"{name:<10} {iterations:>8} 次  {elapsed:>8.3f}s  {ops:>12.1f} ops/s")
+    return ops
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="JWT 验证吞吐基准测试")
+    parser.add_argument("--iterations", type=int, default=50000, help="验证次数")
+    parser.add_argument("--tokens", type=int, default=100, help="不同令牌数量")
+    args = parser.parse_args()
+
+    # create_access_token 需要应用上下文来记录日志
+    with Flask(__name__).app_context():
+        tokens = [create_access_token(user_id=i + 1) for i in range(args.tokens)]
+
+    auth.token_cache = TTLCache(maxsize=0)
+    off = measure("cache off", tokens, args.iterations)
+
+    auth.token_cache = TTLCache(maxsize=args.tokens)
+    on = measure("cache on", tokens, args.iterations)
+
+    print(f"加速比：{on / off:.1f}x")
+    print(f"缓存统计：{auth.token_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
-import asyncio
 import os
 import sys
+from typing import List, Optional, Tuple
+
 import click
 from flask import Flask
 from werkzeug.serving import run_simple
@@ -8,6 +9,7 @@ from werkzeug.serving import run_simple
 from config.database import init_db
 from config.settings import settings
 from app import create_app
+from utils.loop import run_sync
 
 def setup_environment(env: str) -> None:
     """设置环境变量
@@ -25,10 +27,14 @@ def setup_environment(env: str) -> None:
         os.environ["CONFIG_PATH"] = "config/default.yaml"
 
 def run_async_command(f):
-    """装饰器：运行异步命令"""
+    """装饰器：运行异步命令
+
+    命令在 ``utils.loop`` 的共享事件循环中执行。引擎的连接绑定在该事件循环上，
+    不能再用 ``asyncio.run`` 另建事件循环。
+    """
     @click.pass_context
     def wrapper(ctx, *args, **kwargs):
-        return asyncio.run(f(*args, **kwargs))
+        return run_sync(f(*args, **kwargs))
     return wrapper
 
 @click.group()
@@ -55,38 +61,125 @@ def cli():
     help="端口号",
 )
 @click.option(
-    "--debug",
-    is_flag=True,
-    default=True,
-    help="是否启用调试模式",
+    "--debug/--no-debug",
+    default=None,
+    help="是否启用调试模式（默认仅 development 环境启用）",
+)
+@click.option(
+    "--workers",
+    type=int,
+    default=None,
+    envvar="WEB_CONCURRENCY",
+    help="Hypercorn worker 进程数（默认为 CPU 核数）",
+)
+@click.option(
+    "--bind",
+    multiple=True,
+    help="监听地址，如 0.0.0.0:8000，可重复指定（默认使用 host:port）",
+)
+@click.option(
+    "--keep-alive",
+    default=5,
+    type=float,
+    help="HTTP keep-alive 空闲超时（秒）",
+)
+@click.option(
+    "--certfile",
+    default=None,
+    help="TLS 证书文件，配置后通过 ALPN 协商 HTTP/2",
+)
+@click.option(
+    "--keyfile",
+    default=None,
+    help="TLS 私钥文件",
 )
-def run(env: str, host: str, port: int, debug: bool) -> None:
+def run(
+    env: str,
+    host: str,
+    port: int,
+    debug: Optional[bool],
+    workers: Optional[int],
+    bind: Tuple[str, ...],
+    keep_alive: float,
+    certfile: Optional[str],
+    keyfile: Optional[str],
+) -> None:
     """运行应用服务器"""
     setup_environment(env)
     
-    # 创建应用实例
-    app = create_app()
+    if debug is None:
+        debug = env == "development"
+    # Hypercorn worker 重新导入配置，调试开关通过环境变量传给 worker
+    os.environ["DEBUG"] = "true" if debug else "false"
     
     if debug:
         # 使用 Werkzeug 的开发服务器，支持热重载
         run_simple(
             host,
             port,
-            app,
+            create_app(),
             use_reloader=True,
             use_debugger=True,
             threaded=True,
             processes=1
         )
     else:
-        # 生产环境使用 Flask 的开发服务器
-        app.run(
-            host=host,
-            port=port,
-            debug=False,
-            use_reloader=False
+        # 生产环境使用 Hypercorn 多进程服务，每个 worker 各自加载 main:app
+        serve_hypercorn(
+            bind=list(bind) or [f"{host}:{port}"],
+            workers=workers or os.cpu_count() or 1,
+            keep_alive=keep_alive,
+            certfile=certfile,
+            keyfile=keyfile,
         )
 
+def serve_hypercorn(
+    bind: List[str],
+    workers: int,
+    keep_alive: float,
+    certfile: Optional[str] = None,
+    keyfile: Optional[str] = None,
+) -> None:
+    """通过 Hypercorn 提供生产服务
+
+    Flask 应用以 WSGI 模式挂载，由 Hypercorn 的 WSGI 适配器转换为 ASGI。
+    明文连接支持 HTTP/1.1 keep-alive 和 h2c，配置 TLS 后通过 ALPN 协商 HTTP/2。
+
+    Args:
+        bind: 监听地址列表
+        workers: worker 进程数
+        keep_alive: keep-alive 空闲超时（秒）
+        certfile: TLS 证书文件
+        keyfile: TLS 私钥文件
+    """
+    from hypercorn.config import Config
+    from hypercorn.run import run as hypercorn_run
+
+    from utils.metrics import registry
+
+    # 丢弃上次运行留下的 worker 指标快照
+    registry.clear_directory()
+
+    # worker 进程据此平分 CPU 核数（如默认的密码哈希进程数）
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+
+    config = Config()
+    config.application_path = "wsgi:main:app"
+    config.bind = bind
+    config.workers = workers
+    # 默认的守护进程 worker 不能再创建子进程，密码哈希进程池需要非守护进程
+    config.daemon = False
+    config.keep_alive_timeout = keep_alive
+    config.alpn_protocols = ["h2", "http/1.1"]
+    config.accesslog = "-"
+    config.errorlog = "-"
+    if certfile:
+        config.certfile = certfile
+        config.keyfile = keyfile
+
+    click.echo(f"Hypercorn 启动：{', '.join(bind)}，{workers} 个 worker")
+    sys.exit(hypercorn_run(config))
+
 @cli.command(name="init")
 @click.option(
     "--env",
@@ -108,30 +201,113 @@ async def init_db_command(env: str) -> None:
         click.echo(f"数据库初始化失败：{str(e)}", err=True)
         raise click.Abort()
 
-@cli.command()
+@cli.command(name="import-users")
+@click.argument("file", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--env",
+    type=click.Choice(["development", "production", "testing"]),
+    default="development",
+    help="运行环境",
+)
+@click.option(
+    "--format",
+    "file_format",
+    type=click.Choice(["csv", "ndjson"]),
+    default=None,
+    help="文件格式，默认按扩展名判断",
+)
+@click.option(
+    "--batch-size",
+    default=10000,
+    type=click.IntRange(min=1),
+    help="每批导入的记录数",
+)
+@click.option(
+    "--workers",
+    default=None,
+    type=click.IntRange(min=0),
+    help="密码哈希进程数，默认 CPU 核数",
+)
+@click.option(
+    "--on-conflict",
+    type=click.Choice(["skip", "update"]),
+    default="skip",
+    help="用户名或邮箱已存在时跳过或按用户名更新",
+)
 @run_async_command
-async def shell() -> None:
-    """启动异步 Python Shell"""
+async def import_users_command(
+    file: str,
+    env: str,
+    file_format: Optional[str],
+    batch_size: int,
+    workers: Optional[int],
+    on_conflict: str,
+) -> None:
+    """从 CSV 或 NDJSON 文件批量导入用户
+
+    记录字段：username、email、password（或 hashed_password）、
+    is_active、is_superuser。
+    """
+    setup_environment(env)
+
+    def report(stats: dict) -> None:
+        click.echo(
+            f"已读取 {stats['read']} 行，写入 {stats['written']}，"
+            f"跳过 {stats['skipped']}，无效 {stats['invalid']}，"
+            f"拒绝 {stats['rejected']}，{stats['rows_per_sec']} 行/秒"
+        )
+
+    try:
+        from scripts.import_users import import_users
+        stats = await import_users(
+            file,
+            file_format=file_format,
+            batch_size=batch_size,
+            workers=workers,
+            on_conflict=on_conflict,
+            on_progress=report,
+        )
+    except Exception as e:
+        raise click.ClickException(f"导入失败：{str(e)}") from e
+
+    click.echo(
+        f"导入完成：共 {stats['read']} 行，写入 {stats['written']}，"
+        f"跳过 {stats['skipped']}，无效 {stats['invalid']}，"
+        f"拒绝 {stats['rejected']}，耗时 {stats['elapsed']} 秒"
+        f"（{stats['rows_per_sec']} 行/秒）"
+    )
+
+@cli.command()
+def shell() -> None:
+    """启动 Python Shell
+
+    Shell 运行在主线程，异步函数通过 ``run_sync`` 提交到应用共享的事件循环，
+    与 ``session`` 和连接池使用同一个事件循环。
+    """
     # 导入常用模块和对象
     from main import app
     from config.database import AsyncSessionLocal
     from models.user import User
     
-    # 创建异步会话
-    async with AsyncSessionLocal() as session:
+    # 创建异步会话，退出 Shell 时在共享事件循环中关闭
+    session = AsyncSessionLocal()
+    try:
         # 设置 Python Shell 环境
         import IPython
         IPython.embed(
             header=f"AI Demo Async Shell (Python {sys.version.split()[0]})\n"
-                  f"可用对象: app, session, User\n"
-                  "注意：这是一个异步环境，请使用 await 调用异步函数",
+                  f"可用对象: app, session, User, run_sync\n"
+                  "注意：异步函数请用 run_sync 执行，"
+                  "如 run_sync(User.get_by_username(session, 'admin'))",
             user_ns={
                 "app": app,
                 "session": session,
                 "User": User,
-                "asyncio": asyncio,
+                "run_sync": run_sync,
             }
         )
+    finally:
+        run_sync(session.close())
 
 if __name__ == "__main__":
     cli() 
\ No newline at end of file
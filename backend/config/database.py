@@ -1,32 +1,364 @@
-from typing import AsyncGenerator
+import asyncio
+import itertools
+import math
+import os
+import threading
+import time
+from typing import Any, AsyncGenerator, Callable, Dict, List, Optional
 
+from flask import g, request
+from sqlalchemy import exc, text
 from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
-from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.orm import DeclarativeBase, Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
-from config.settings import settings
+from config.settings import Settings, settings
+from utils.loop import runner
+from utils.metrics import db_pool_wait_seconds, instrument_engine
 
-# 创建异步引擎
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=settings.IS_DEVELOPMENT,
-    pool_pre_ping=True,
-    pool_size=5,
-    max_overflow=10,
-)
 
-# 创建异步会话工厂
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """记录连接获取等待时间的连接池"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # 指标中的引擎名称，由 EngineRegistry 设置
+        self.name = "primary"
+        self._stats_lock = threading.Lock()
+        self.acquire_count = 0
+        self.acquire_timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self.acquire_timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            db_pool_wait_seconds.observe(waited, self.name)
+            with self._stats_lock:
+                self.acquire_count += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+
+    def recreate(self):
+        # pool_pre_ping 失效重建时保留统计数据
+        pool = super().recreate()
+        pool.name = self.name
+        pool.acquire_count = self.acquire_count
+        pool.acquire_timeouts = self.acquire_timeouts
+        pool.wait_total = self.wait_total
+        pool.wait_max = self.wait_max
+        return pool
+
+    def stats(self) -> Dict[str, Any]:
+        """获取连接池实时统计
+
+        Returns:
+            Dict[str, Any]: 连接池大小、借出数、溢出数及等待时间
+        """
+        with self._stats_lock:
+            acquire_count = self.acquire_count
+            wait_total = self.wait_total
+            wait_avg = wait_total / acquire_count if acquire_count else 0.0
+            return {
+                "size": self.size(),
+                "max_overflow": self._max_overflow,
+                "checked_in": self.checkedin(),
+                "checked_out": self.checkedout(),
+                "overflow": max(self.overflow(), 0),
+                "acquire_count": acquire_count,
+                "acquire_timeouts": self.acquire_timeouts,
+                "wait_seconds_total": round(wait_total, 6),
+                "wait_seconds_avg": round(wait_avg, 6),
+                "wait_seconds_max": round(self.wait_max, 6),
+            }
+
+
+class EngineRegistry:
+    """数据库引擎注册表
+
+    按名称缓存进程内共享的异步引擎，连接池参数统一来自 ``Settings``。
+    所有模块都应通过注册表获取引擎，避免每个模块各自建立连接池。
+    """
+
+    def __init__(self, config: Settings):
+        self._config = config
+        self._engines: Dict[str, AsyncEngine] = {}
+        self._listeners: List[Callable[[AsyncEngine, str], Any]] = []
+        self._lock = threading.Lock()
+
+    def get(self, name: str = "primary", url: Optional[str] = None) -> AsyncEngine:
+        """获取（必要时创建）指定名称的引擎
+
+        Args:
+            name: 引擎名称
+            url: 数据库 URL，默认使用 ``settings.DATABASE_URL``
+
+        Returns:
+            AsyncEngine: 共享的异步引擎
+        """
+        engine = self._engines.get(name)
+        if engine is None:
+            with self._lock:
+                engine = self._engines.get(name)
+                if engine is None:
+                    engine = self._create(url or self._config.DATABASE_URL)
+                    if isinstance(engine.pool, InstrumentedPool):
+                        engine.pool.name = name
+                    instrument_engine(engine, name)
+                    for listener in self._listeners:
+                        listener(engine, name)
+                    self._engines[name] = engine
+        return engine
+
+    def add_listener(self, callback: Callable[[AsyncEngine, str], Any]) -> None:
+        """对已创建和之后创建的每个引擎调用 ``callback(engine, name)``
+
+        用于挂载事件监听器等。
+        """
+        with self._lock:
+            self._listeners.append(callback)
+            engines = list(self._engines.items())
+        for name, engine in engines:
+            callback(engine, name)
+
+    def _create(self, url: str) -> AsyncEngine:
+        return create_async_engine(
+            url,
+            echo=self._config.IS_DEVELOPMENT,
+            poolclass=InstrumentedPool,
+            pool_pre_ping=self._config.DB_POOL_PRE_PING,
+            pool_size=self._config.DB_POOL_SIZE,
+            max_overflow=self._config.DB_MAX_OVERFLOW,
+            pool_recycle=self._config.DB_POOL_RECYCLE,
+            pool_timeout=self._config.DB_POOL_TIMEOUT,
+        )
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """获取所有引擎的连接池统计"""
+        return {
+            name: engine.pool.stats()
+            for name, engine in list(self._engines.items())
+            if isinstance(engine.pool, InstrumentedPool)
+        }
+
+    async def dispose_all(self) -> None:
+        """释放所有引擎的连接"""
+        for engine in list(self._engines.values()):
+            await engine.dispose()
+
+
+class ReplicaSet:
+    """只读副本集合
+
+    在复制延迟不超过 ``DB_REPLICA_MAX_LAG`` 的副本中按 ``DB_REPLICA_STRATEGY``
+    （轮询或最少借出连接）选择一个。延迟由共享事件循环上的后台任务每
+    ``DB_REPLICA_CHECK_INTERVAL`` 秒检查一次；尚未检查、连接失败或延迟过大的副本
+    不参与选择，没有可用副本时 ``choose`` 返回 None，由调用方退回主库。
+    """
+
+    STRATEGIES = ("round_robin", "least_connections")
+
+    # 副本上 WAL 已全部回放时延迟为 0，否则为最后一次回放的事务距今的秒数
+    LAG_SQL = {
+        "postgresql": """
+            SELECT CASE
+                WHEN NOT pg_is_in_recovery() THEN 0
+                WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                ELSE COALESCE(
+                    EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0
+                )
+            END
+        """,
+    }
+
+    def __init__(self, registry: EngineRegistry, config: Settings):
+        if config.DB_REPLICA_STRATEGY not in self.STRATEGIES:
+            raise ValueError(f"不支持的副本选择策略：{config.DB_REPLICA_STRATEGY}")
+        self._registry = registry
+        self._config = config
+        self.names: List[str] = [
+            f"replica-{i}" for i in range(len(config.DB_REPLICA_URLS))
+        ]
+        for name, url in zip(self.names, config.DB_REPLICA_URLS):
+            registry.get(name, url)
+        # 副本名称 -> 复制延迟（秒），inf 表示不可用
+        self.lag: Dict[str, float] = {name: math.inf for name in self.names}
+        self.fallbacks = 0
+        self._counter = itertools.count()
+        self._monitor_pid: Optional[int] = None
+        self._monitor_future = None
+        self._lock = threading.Lock()
+
+    def available(self) -> List[str]:
+        """延迟在阈值内的副本名称"""
+        max_lag = self._config.DB_REPLICA_MAX_LAG
+        return [name for name in self.names if self.lag[name] <= max_lag]
+
+    def choose(self) -> Optional[AsyncEngine]:
+        """选择一个可用副本
+
+        Returns:
+            Optional[AsyncEngine]: 副本引擎，未配置或没有可用副本时返回 None
+        """
+        if not self.names:
+            return None
+        self._ensure_monitor()
+        candidates = self.available()
+        if not candidates:
+            self.fallbacks += 1
+            return None
+        if self._config.DB_REPLICA_STRATEGY == "least_connections":
+            name = min(
+                candidates, key=lambda n: self._registry.get(n).pool.checkedout()
+            )
+        else:
+            name = candidates[next(self._counter) % len(candidates)]
+        return self._registry.get(name)
+
+    def _ensure_monitor(self) -> None:
+        if self._monitor_pid == os.getpid():
+            return
+        with self._lock:
+            if self._monitor_pid != os.getpid():
+                self._monitor_pid = os.getpid()
+                self._monitor_future = runner.submit(self._monitor())
+
+    async def _measure(self, name: str) -> float:
+        engine = self._registry.get(name)
+        sql = self.LAG_SQL.get(engine.dialect.name, "SELECT 0")
+        try:
+            async with engine.connect() as conn:
+                result = await conn.execute(text(sql))
+                return float(result.scalar() or 0)
+        except Exception:
+            return math.inf
+
+    async def check(self) -> None:
+        """检查所有副本的复制延迟"""
+        timeout = self._config.DB_REPLICA_CHECK_INTERVAL
+        results = await asyncio.gather(
+            *(asyncio.wait_for(self._measure(name), timeout) for name in self.names),
+            return_exceptions=True,
+        )
+        for name, lag in zip(self.names, results):
+            self.lag[name] = lag if isinstance(lag, float) else math.inf
+
+    async def _monitor(self) -> None:
+        while True:
+            await self.check()
+            await asyncio.sleep(self._config.DB_REPLICA_CHECK_INTERVAL)
+
+    async def stop(self) -> None:
+        """停止延迟检查任务"""
+        if self._monitor_future is not None:
+            self._monitor_future.cancel()
+            self._monitor_future = None
+            self._monitor_pid = None
+
+    def stats(self) -> Dict[str, Any]:
+        """获取副本状态
+
+        Returns:
+            Dict[str, Any]: 各副本的延迟和可用性，以及退回主库的次数
+        """
+        available = set(self.available())
+        return {
+            "strategy": self._config.DB_REPLICA_STRATEGY,
+            "max_lag": self._config.DB_REPLICA_MAX_LAG,
+            "fallbacks": self.fallbacks,
+            "replicas": {
+                name: {
+                    "lag_seconds": (
+                        None if math.isinf(self.lag[name])
+                        else round(self.lag[name], 3)
+                    ),
+                    "available": name in available,
+                }
+                for name in self.names
+            },
+        }
+
+
+# 进程内共享的引擎注册表
+engines = EngineRegistry(settings)
+
+# 主库引擎
+engine = engines.get()
+
+# 只读副本
+replicas = ReplicaSet(engines, settings)
+
+# 连接池绑定在共享事件循环上，进程退出前在同一循环中释放
+runner.on_shutdown(replicas.stop)
+runner.on_shutdown(engines.dispose_all)
+
+
+class RoutingSession(Session):
+    """按语句类型选择主库或副本的会话
+
+    ``info["use_replica"]`` 为真时，只读查询发往 ``replicas.choose()`` 选出的副本，
+    同一会话固定使用同一个副本。写语句、flush 和 ``SELECT ... FOR UPDATE``
+    总是发往主库，并把会话固定到主库，之后的读取也能看到本会话的写入（read-your-writes）。
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if not self.info.get("use_replica") or self.info.get("pin_primary"):
+            return super().get_bind(mapper, clause=clause, **kw)
+        if self._flushing or (
+            clause is not None
+            and (clause.is_dml or getattr(clause, "_for_update_arg", None) is not None)
+        ):
+            self.info["pin_primary"] = True
+            return super().get_bind(mapper, clause=clause, **kw)
+        if "replica" not in self.info:
+            self.info["replica"] = replicas.choose()
+        replica = self.info["replica"]
+        if replica is None:
+            return super().get_bind(mapper, clause=clause, **kw)
+        return replica.sync_engine
+
+
+def pin_primary(session: AsyncSession) -> None:
+    """让会话后续的查询都发往主库（例如刚修改过的数据需要立即读到）"""
+    session.info["pin_primary"] = True
+
+
+# 创建异步会话工厂（主库）
 AsyncSessionLocal = async_sessionmaker(
     bind=engine,
     class_=AsyncSession,
+    sync_session_class=RoutingSession,
+    expire_on_commit=False,
+    autocommit=False,
+    autoflush=False,
+)
+
+# 只读会话工厂：读取走副本，写入后自动固定到主库
+ReadSessionLocal = async_sessionmaker(
+    bind=engine,
+    class_=AsyncSession,
+    sync_session_class=RoutingSession,
+    info={"use_replica": True},
     expire_on_commit=False,
     autocommit=False,
     autoflush=False,
 )
 
+# 使用只读会话的请求方法
+READ_METHODS = ("GET", "HEAD")
+
 class Base(DeclarativeBase):
     """声明性基类"""
     pass
@@ -43,8 +375,49 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
         finally:
             await session.close()
 
+def get_session() -> AsyncSession:
+    """获取当前请求的数据库会话
+
+    会话在首次调用时创建并保存在 ``g`` 上，同一请求内的认证装饰器和视图
+    共用一个会话（及其连接），由 ``close_session`` 在请求结束时统一释放。
+    AsyncSession 在第一次执行语句时才会从连接池借出连接。
+    GET/HEAD 请求使用 ``ReadSessionLocal``，读取优先发往只读副本。
+
+    Returns:
+        AsyncSession: 当前请求的数据库会话
+    """
+    session = g.get("db_session")
+    if session is None:
+        if request.method in READ_METHODS:
+            factory = ReadSessionLocal
+        else:
+            factory = AsyncSessionLocal
+        session = factory()
+        g.db_session = session
+    return session
+
+async def close_session(exception: Optional[BaseException] = None) -> None:
+    """提交或回滚当前请求的会话并归还连接
+
+    Args:
+        exception: 请求处理过程中未捕获的异常，存在时回滚
+    """
+    session = g.pop("db_session", None)
+    if session is None:
+        return
+    try:
+        if exception is None and session.in_transaction():
+            await session.commit()
+        else:
+            await session.rollback()
+    except Exception:
+        await session.rollback()
+        raise
+    finally:
+        await session.close()
+
 # 初始化数据库
 async def init_db() -> None:
     """初始化数据库"""
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all) 
\ No newline at end of file
+        await conn.run_sync(Base.metadata.create_all)
@@ -1,9 +1,9 @@
 import os
 from pathlib import Path
 from functools import lru_cache
-from typing import List
+from typing import List, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class DatabaseSettings(BaseModel):
@@ -18,7 +18,8 @@ class Settings(BaseSettings):
     """应用配置"""
     # 环境
     ENV: str = Field(default="development")
-    DEBUG: bool = Field(default=True)
+    # 调试模式（未设置时仅 development 环境启用）
+    DEBUG: Optional[bool] = Field(default=None)
     
     # 数据库配置
     POSTGRES_HOST: str = Field(default="localhost")
@@ -26,6 +27,77 @@ class Settings(BaseSettings):
     POSTGRES_USER: str = Field(default="postgres")
     POSTGRES_PASSWORD: str = Field(default="postgres")
     POSTGRES_DB: str = Field(default="ai_demo")
+    # 完整的数据库 URL，设置后不再使用 POSTGRES_*（如压测冒烟用的 sqlite+aiosqlite:///bench.db）
+    DB_URL: Optional[str] = Field(default=None)
+
+    # 连接池配置（每个 worker 进程共享一个连接池）
+    DB_POOL_SIZE: int = Field(default=5)
+    DB_MAX_OVERFLOW: int = Field(default=5)
+    DB_POOL_RECYCLE: int = Field(default=1800)  # 秒
+    DB_POOL_TIMEOUT: float = Field(default=30.0)  # 获取连接的超时时间（秒）
+    DB_POOL_PRE_PING: bool = Field(default=True)
+
+    # 只读副本（JSON 列表，为空时所有查询都走主库）
+    DB_REPLICA_URLS: List[str] = Field(default=[])
+    # 副本选择策略：round_robin/least_connections
+    DB_REPLICA_STRATEGY: str = Field(default="round_robin")
+    # 复制延迟超过该值（秒）的副本不参与读取
+    DB_REPLICA_MAX_LAG: float = Field(default=5.0)
+    DB_REPLICA_CHECK_INTERVAL: float = Field(default=5.0)  # 副本延迟检查间隔（秒）
+
+    # 用户列表分页
+    USERS_MAX_PER_PAGE: int = Field(default=100)
+    USERS_MAX_OFFSET: int = Field(default=10000)  # page/per_page 模式允许的最大偏移
+    # 默认总数模式：exact/estimated/cached
+    USERS_COUNT_MODE: str = Field(default="cached")
+    USERS_COUNT_CACHE_TTL: float = Field(default=30.0)  # cached 模式的刷新间隔（秒）
+    USERS_EXPORT_BATCH_SIZE: int = Field(default=1000)  # 导出时每批从游标读取的行数
+    USERS_BATCH_MAX_SIZE: int = Field(default=1000)  # 批量操作单次最多影响的用户数
+
+    # 响应压缩（brotli 未安装时只使用 gzip）
+    COMPRESSION_ENABLED: bool = Field(default=True)
+    COMPRESSION_MIN_SIZE: int = Field(default=1024)  # 小于该字节数的响应不压缩
+    COMPRESSION_GZIP_LEVEL: int = Field(default=6)  # 1-9
+    COMPRESSION_BROTLI_QUALITY: int = Field(default=4)  # 0-11
+
+    # 登录/注册限流（"次数/周期"，周期为 second/minute/hour/day 或秒数，为空表示不限）
+    RATE_LIMIT_ENABLED: bool = Field(default=True)
+    RATE_LIMIT_LOGIN_PER_IP: str = Field(default="20/minute")
+    RATE_LIMIT_LOGIN_PER_USERNAME: str = Field(default="5/minute")
+    RATE_LIMIT_LOGIN_GLOBAL: str = Field(default="50/second")  # 每个 worker
+    RATE_LIMIT_REGISTER_PER_IP: str = Field(default="5/minute")
+    RATE_LIMIT_REGISTER_PER_USERNAME: str = Field(default="3/minute")
+    RATE_LIMIT_REGISTER_GLOBAL: str = Field(default="10/second")  # 每个 worker
+    RATE_LIMIT_STORE_SHARDS: int = Field(default=16)
+    RATE_LIMIT_STORE_SIZE: int = Field(default=100000)  # 最多保存的令牌桶数
+    # 反向代理层数：大于 0 时按 X-Forwarded-For 识别客户端 IP
+    PROXY_FIX_X_FOR: int = Field(default=0)
+
+    # Prometheus 指标（/metrics）
+    METRICS_ENABLED: bool = Field(default=True)
+    # 多 worker 时各进程定期写入快照的目录，抓取时合并；为空时只导出处理抓取请求的进程
+    METRICS_MULTIPROC_DIR: Optional[str] = Field(default=None)
+    METRICS_FLUSH_INTERVAL: float = Field(default=1.0)  # 秒
+
+    # 慢查询日志和重复查询检测（默认关闭）
+    QUERY_ANALYZER_ENABLED: bool = Field(default=False)
+    SLOW_QUERY_THRESHOLD: float = Field(default=0.2)  # 秒
+    SLOW_QUERY_EXPLAIN: bool = Field(default=True)  # 为慢查询获取执行计划
+    # 同一形状的语句以不同参数执行的次数
+    QUERY_N_PLUS_ONE_THRESHOLD: int = Field(default=3)
+    # 未用 query_budget 声明的视图的语句上限
+    QUERY_BUDGET_DEFAULT: Optional[int] = Field(default=None)
+    QUERY_BUDGET_STRICT: bool = Field(default=False)  # 超出预算时请求失败（用于测试）
+
+    # 请求性能分析（关闭时不注册钩子）
+    PROFILING_ENABLED: bool = Field(default=False)
+    # 随机分析的请求比例，0 表示只分析管理员指定的请求
+    PROFILING_SAMPLE_RATE: float = Field(default=0.0)
+    PROFILING_FORMAT: str = Field(default="pstats")  # 默认输出格式：pstats/collapsed
+    # collapsed 格式的调用栈采样间隔（秒）
+    PROFILING_SAMPLE_INTERVAL: float = Field(default=0.001)
+    PROFILING_DIR: str = Field(default="/tmp/ai-demo-profiles")
+    PROFILING_MAX_FILES: int = Field(default=50)  # 最多保留的结果文件数
     
     # Flask 配置
     SECRET_KEY: str = Field(default="ai-demo-secret-key-2024-01-01")
@@ -37,6 +109,17 @@ class Settings(BaseSettings):
     JWT_ALGORITHM: str = Field(default="HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = Field(default=30)
     REFRESH_TOKEN_EXPIRE_DAYS: int = Field(default=7)
+    # 已验证令牌缓存（条目在令牌 exp 时过期，0 表示关闭）
+    TOKEN_CACHE_SIZE: int = Field(default=10000)
+
+    # 密码哈希进程池（每个 worker 一个；None 表示 CPU 核数 // WEB_CONCURRENCY，至少 1；
+    # 0 表示在当前线程中计算）
+    PASSWORD_HASH_WORKERS: Optional[int] = Field(default=None)
+    PASSWORD_HASH_QUEUE_SIZE: int = Field(default=64)  # 等待中的哈希任务上限
+
+    # 认证用户缓存（按用户 ID 缓存 token_required 加载的用户，0 表示关闭）
+    PRINCIPAL_CACHE_SIZE: int = Field(default=10000)
+    PRINCIPAL_CACHE_TTL: float = Field(default=60.0)  # 秒
     
     # CORS 配置
     CORS_ORIGINS: List[str] = Field(default=["http://localhost:3000"])
@@ -48,14 +131,18 @@ class Settings(BaseSettings):
         case_sensitive=True,
     )
     
+    @model_validator(mode="after")
+    def default_debug(self) -> "Settings":
+        """未设置 DEBUG 时按运行环境决定是否启用调试模式"""
+        if self.DEBUG is None:
+            self.DEBUG = self.IS_DEVELOPMENT
+        return self
+
     @property
     def DATABASE_URL(self) -> str:
         """获取数据库 URL"""
-        return f"postgresql+psycopg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
-
-    @property
-    def SYNC_DATABASE_URL(self) -> str:
-        """获取同步数据库 URL（用于 Flask-SQLAlchemy）"""
+        if self.DB_URL:
+            return self.DB_URL
         return f"postgresql+psycopg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
 
     @property
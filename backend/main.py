@@ -1,3 +1,12 @@
+"""应用入口
+
+``hypercorn main:app`` 等服务器从这里加载应用；
+直接执行时进入管理命令行（``python main.py run ...``）。
+"""
 if __name__ == "__main__":
-    from .cli import cli
-    cli()
\ No newline at end of file
+    from cli import cli
+    cli()
+else:
+    from app import create_app
+
+    app = create_app()
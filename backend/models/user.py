@@ -1,12 +1,26 @@
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, AsyncIterator, List, Optional, Sequence, Tuple
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
-from sqlalchemy import select, Integer, String, Boolean, DateTime
+from sqlalchemy import (
+    select, insert, update, delete, func, text, tuple_, any_, literal,
+    ARRAY, Index, Integer, String, Boolean, DateTime,
+)
 from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from config.database import Base
+from config.settings import settings
+from utils.hashing import hashing_executor, hash_password_sync, verify_password_sync
+from utils.pagination import encode_cursor, decode_cursor
+from utils.cache import CachedCounter
+from utils.serialization import isoformat_utc
+
+# PostgreSQL 唯一约束冲突的 SQLSTATE
+UNIQUE_VIOLATION = "23505"
+
+# 用户总数缓存（cached 计数模式），由写操作增量维护并定期刷新
+user_count_cache = CachedCounter(ttl=settings.USERS_COUNT_CACHE_TTL)
 
 class User(UserMixin, Base):
     """用户模型
@@ -22,6 +36,23 @@ class User(UserMixin, Base):
         updated_at: 最后更新时间
     """
     __tablename__ = "users"
+    __table_args__ = (
+        # 键集分页 ORDER BY created_at, id 使用的复合索引
+        Index("ix_users_created_at_id", "created_at", "id"),
+        # 登录时按用户名或邮箱不区分大小写查找使用的函数索引
+        Index("ix_users_lower_username", func.lower(text("username"))),
+        Index("ix_users_lower_email", func.lower(text("email"))),
+        # 列表 ETag / Last-Modified 使用的 max(updated_at)
+        Index("ix_users_updated_at", "updated_at"),
+    )
+
+    # 键集分页支持的排序方式：名称 -> (排序键列名, 是否降序)
+    PAGE_ORDERINGS = {
+        "created_at": (("created_at", "id"), False),
+        "-created_at": (("created_at", "id"), True),
+        "id": (("id",), False),
+        "-id": (("id",), True),
+    }
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     username: Mapped[str] = mapped_column(String(50), unique=True, index=True)
@@ -38,7 +69,7 @@ class User(UserMixin, Base):
         Args:
             password: 明文密码
         """
-        self.hashed_password = generate_password_hash(password, method='pbkdf2:sha256')
+        self.hashed_password = hash_password_sync(password)
 
     def verify_password(self, password: str) -> bool:
         """验证密码
@@ -49,7 +80,38 @@ class User(UserMixin, Base):
         Returns:
             bool: 密码是否匹配
         """
-        return check_password_hash(self.hashed_password, password)
+        return verify_password_sync(self.hashed_password, password)
+
+    async def set_password_async(self, password: str) -> None:
+        """在哈希进程池中设置用户密码
+
+        Args:
+            password: 明文密码
+
+        Raises:
+            HashingQueueFullError: 哈希任务队列已满
+        """
+        self.hashed_password = await hashing_executor.hash(password)
+
+    async def verify_password_async(self, password: str) -> bool:
+        """在哈希进程池中验证密码
+
+        Args:
+            password: 待验证的明文密码
+
+        Returns:
+            bool: 密码是否匹配
+
+        Raises:
+            HashingQueueFullError: 哈希任务队列已满
+        """
+        return await hashing_executor.verify(self.hashed_password, password)
+
+    # 对外公开的列，与 to_dict 的键一致
+    PUBLIC_COLUMNS = (
+        "id", "username", "email", "is_active", "is_superuser",
+        "created_at", "updated_at",
+    )
 
     def to_dict(self) -> Dict[str, Any]:
         """转换用户对象为字典
@@ -63,10 +125,171 @@ class User(UserMixin, Base):
             "email": self.email,
             "is_active": self.is_active,
             "is_superuser": self.is_superuser,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+            "created_at": isoformat_utc(self.created_at),
+            "updated_at": isoformat_utc(self.updated_at),
         }
 
+    @staticmethod
+    def row_to_dict(row: Sequence[Any]) -> Dict[str, Any]:
+        """把按 PUBLIC_COLUMNS 顺序选出的行转换为与 to_dict 相同的字典
+
+        Args:
+            row: 查询结果行
+
+        Returns:
+            Dict[str, Any]: 用户数据字典
+        """
+        data = dict(zip(User.PUBLIC_COLUMNS, row))
+        for key in ("created_at", "updated_at"):
+            data[key] = isoformat_utc(data[key])
+        return data
+
+    @classmethod
+    async def stream_public_rows(
+        cls, db: AsyncSession, batch_size: int = 1000
+    ) -> AsyncIterator[Sequence[Sequence[Any]]]:
+        """通过服务器端游标分批读取所有用户的公开列
+
+        只选择 PUBLIC_COLUMNS，不构建 ORM 对象，内存占用与表大小无关。
+
+        Args:
+            db: 数据库会话
+            batch_size: 每批行数
+
+        Yields:
+            Sequence[Row]: 一批按 PUBLIC_COLUMNS 顺序排列的行
+        """
+        columns = [getattr(cls, name) for name in cls.PUBLIC_COLUMNS]
+        result = await db.stream(
+            select(*columns).order_by(cls.id).execution_options(yield_per=batch_size)
+        )
+        async for partition in result.partitions(batch_size):
+            yield partition
+
+    # 唯一约束冲突时用于识别冲突列的约束/索引名
+    UNIQUE_CONSTRAINTS = {
+        "ix_users_username": "username",
+        "ix_users_email": "email",
+    }
+
+    @classmethod
+    async def create(
+        cls,
+        db: AsyncSession,
+        username: str,
+        email: str,
+        hashed_password: str,
+        is_active: bool = True,
+        is_superuser: bool = False,
+    ) -> int:
+        """用一条 ``INSERT ... RETURNING id`` 创建用户
+
+        不预先查询用户名和邮箱是否存在，重复由唯一索引保证，
+        并发注册时也不会产生重复用户。
+
+        Args:
+            db: 数据库会话
+            username: 用户名
+            email: 邮箱地址
+            hashed_password: 密码哈希
+            is_active: 是否激活
+            is_superuser: 是否超级用户
+
+        Returns:
+            int: 新用户 ID
+
+        Raises:
+            IntegrityError: 用户名或邮箱已存在，可用 ``conflicting_column`` 判断冲突列
+        """
+        result = await db.execute(
+            insert(cls)
+            .values(
+                username=username,
+                email=email,
+                hashed_password=hashed_password,
+                is_active=is_active,
+                is_superuser=is_superuser,
+            )
+            .returning(cls.id)
+        )
+        return result.scalar_one()
+
+    @classmethod
+    def conflicting_column(cls, error: IntegrityError) -> Optional[str]:
+        """从唯一约束冲突中识别冲突的列
+
+        PostgreSQL（psycopg）通过诊断信息中的约束名识别，
+        其他驱动退回到匹配唯一约束错误的消息。
+
+        Args:
+            error: 数据库抛出的完整性错误
+
+        Returns:
+            Optional[str]: "username" 或 "email"；不是这两列的唯一约束冲突时返回 None
+        """
+        diag = getattr(error.orig, "diag", None)
+        constraint = getattr(diag, "constraint_name", None)
+        if constraint in cls.UNIQUE_CONSTRAINTS:
+            return cls.UNIQUE_CONSTRAINTS[constraint]
+        # 非空、外键等其他完整性错误不是重复，不能映射为“已存在”
+        sqlstate = getattr(error.orig, "sqlstate", None)
+        if sqlstate is not None and sqlstate != UNIQUE_VIOLATION:
+            return None
+        message = str(error.orig)
+        if "unique" not in message.lower():
+            return None
+        for column in cls.UNIQUE_CONSTRAINTS.values():
+            if f"{cls.__tablename__}.{column}" in message or f"({column})" in message:
+                return column
+        return None
+
+    @staticmethod
+    def check_username(username: str) -> None:
+        """检查用户名能否注册或修改
+
+        登录时包含 ``@`` 的标识按邮箱查找，用户名不能包含 ``@``，
+        否则可以注册与他人邮箱相同的用户名。
+
+        Args:
+            username: 用户名
+
+        Raises:
+            ValueError: 用户名包含 ``@``
+        """
+        if "@" in username:
+            raise ValueError("用户名不能包含 @")
+
+    @classmethod
+    def credentials_query(cls, identifier: str):
+        """构造 ``get_credentials`` 使用的查询（也用于检查执行计划）"""
+        column = cls.email if "@" in identifier else cls.username
+        return (
+            select(cls.id, cls.hashed_password, cls.is_active, cls.is_superuser)
+            .where(func.lower(column) == identifier.lower())
+            .order_by((column == identifier).desc(), cls.id)
+            .limit(1)
+        )
+
+    @classmethod
+    async def get_credentials(cls, db: AsyncSession, identifier: str) -> Optional[Any]:
+        """按用户名或邮箱（不区分大小写）查找登录所需的字段
+
+        包含 ``@`` 的标识只按邮箱查找（``WHERE lower(email) = :x``），
+        其他标识只按用户名查找，由对应的 ``lower()`` 函数索引支持；
+        用户名不能包含 ``@``，两者不会相互冒用。
+        只选择 id、hashed_password、is_active、is_superuser，不构建 ORM 对象。
+        多个用户仅大小写不同时优先大小写完全一致的一个。
+
+        Args:
+            db: 数据库会话
+            identifier: 用户名或邮箱
+
+        Returns:
+            Optional[Row]: 包含上述字段的行，用户不存在时返回 None
+        """
+        result = await db.execute(cls.credentials_query(identifier))
+        return result.first()
+
     @classmethod
     async def get_by_username(cls, db: AsyncSession, username: str) -> Optional["User"]:
         """通过用户名获取用户
@@ -99,6 +322,9 @@ class User(UserMixin, Base):
     async def get_by_id(cls, db: AsyncSession, user_id: int) -> Optional["User"]:
         """通过 ID 获取用户
         
+        优先从会话的 identity map 中返回已加载的对象，同一会话内重复获取
+        同一用户不会再次查询数据库。
+
         Args:
             db: 数据库会话
             user_id: 用户 ID
@@ -106,5 +332,366 @@ class User(UserMixin, Base):
         Returns:
             Optional[User]: 用户对象，如果不存在则返回 None
         """
-        result = await db.execute(select(cls).filter(cls.id == user_id))
-        return result.scalar_one_or_none()
\ No newline at end of file
+        return await db.get(cls, user_id)
+
+    @classmethod
+    async def get_updated_at(cls, db: AsyncSession, user_id: int) -> Optional[datetime]:
+        """只查询用户的 updated_at，用于条件请求的快速判断
+
+        Args:
+            db: 数据库会话
+            user_id: 用户 ID
+
+        Returns:
+            Optional[datetime]: 最后更新时间，用户不存在时返回 None
+        """
+        result = await db.execute(select(cls.updated_at).where(cls.id == user_id))
+        return result.scalar_one_or_none()
+
+    @classmethod
+    async def last_modified(cls, db: AsyncSession) -> Optional[datetime]:
+        """所有用户中最新的 updated_at（由 ix_users_updated_at 索引直接得出）
+
+        Args:
+            db: 数据库会话
+
+        Returns:
+            Optional[datetime]: 最后更新时间，没有用户时返回 None
+        """
+        result = await db.execute(select(func.max(cls.updated_at)))
+        return result.scalar_one_or_none()
+
+    COUNT_MODES = ("exact", "estimated", "cached")
+
+    @classmethod
+    async def count(cls, db: AsyncSession, mode: str = "exact") -> Tuple[int, str]:
+        """获取用户总数
+
+        - exact: ``SELECT count(*)``，结果精确但需要扫描全表；
+        - estimated: PostgreSQL 规划器统计 ``pg_class.reltuples``，
+          不可用（非 PostgreSQL 或从未 ANALYZE）时退回 exact；
+        - cached: 进程内缓存的计数，写操作增量维护，过期后重新精确计数。
+
+        Args:
+            db: 数据库会话
+            mode: 计数模式
+
+        Returns:
+            Tuple[int, str]: 用户总数和实际使用的计数模式
+
+        Raises:
+            ValueError: 计数模式无效
+        """
+        if mode not in cls.COUNT_MODES:
+            raise ValueError(f"不支持的计数模式：{mode}")
+
+        if mode == "estimated":
+            estimate = await cls._estimated_count(db)
+            if estimate is not None:
+                return estimate, "estimated"
+        elif mode == "cached":
+            cached = user_count_cache.get()
+            if cached is not None:
+                return cached, "cached"
+            generation = user_count_cache.generation
+            total = await cls._exact_count(db)
+            user_count_cache.set(total, generation=generation)
+            return total, "cached"
+
+        return await cls._exact_count(db), "exact"
+
+    @classmethod
+    async def _exact_count(cls, db: AsyncSession) -> int:
+        result = await db.execute(select(func.count()).select_from(cls))
+        return result.scalar_one()
+
+    @classmethod
+    async def _estimated_count(cls, db: AsyncSession) -> Optional[int]:
+        if db.get_bind().dialect.name != "postgresql":
+            return None
+        result = await db.execute(
+            text(
+                "SELECT reltuples::bigint FROM pg_class"
+                " WHERE oid = CAST(:table AS regclass)"
+            ),
+            {"table": cls.__tablename__},
+        )
+        estimate = result.scalar_one_or_none()
+        # PostgreSQL 14+ 在表从未 ANALYZE 时返回 -1
+        if estimate is None or estimate < 0:
+            return None
+        return estimate
+
+    @staticmethod
+    def adjust_cached_count(delta: int) -> None:
+        """写入或删除用户后增量维护缓存的用户总数
+
+        Args:
+            delta: 新增用户数（删除时为负数）
+        """
+        user_count_cache.adjust(delta)
+
+    @classmethod
+    def _page_select(cls, columns_only: bool):
+        if columns_only:
+            return select(*(getattr(cls, name) for name in cls.PUBLIC_COLUMNS))
+        return select(cls)
+
+    @classmethod
+    async def get_paginated(
+        cls,
+        db: AsyncSession,
+        page: int = 1,
+        per_page: int = 10,
+        columns_only: bool = False,
+    ) -> List[Any]:
+        """按页码获取用户列表（OFFSET 分页，深度翻页代价线性增长）
+
+        Args:
+            db: 数据库会话
+            page: 页码，从 1 开始
+            per_page: 每页数量
+            columns_only: 为真时只选择 PUBLIC_COLUMNS 并返回行，不构建 ORM 对象
+
+        Returns:
+            List[User]: 用户列表（columns_only 时为按 PUBLIC_COLUMNS 排列的行）
+        """
+        result = await db.execute(
+            cls._page_select(columns_only)
+            .order_by(cls.created_at, cls.id)
+            .offset((page - 1) * per_page)
+            .limit(per_page)
+        )
+        return list(result.all() if columns_only else result.scalars())
+
+    @classmethod
+    async def get_page_after(
+        cls,
+        db: AsyncSession,
+        cursor: Optional[str] = None,
+        limit: int = 10,
+        order_by: str = "created_at",
+        columns_only: bool = False,
+    ) -> Tuple[List[Any], Optional[str]]:
+        """键集（游标）分页获取用户列表
+
+        以 ``(created_at, id) > 游标值`` 定位下一页，配合复合索引，
+        任意深度的翻页代价都与第一页相同。
+
+        Args:
+            db: 数据库会话
+            cursor: 上一页返回的游标，None 表示第一页
+            limit: 每页数量
+            order_by: 排序方式，见 ``PAGE_ORDERINGS``
+            columns_only: 为真时只选择 PUBLIC_COLUMNS 并返回行，不构建 ORM 对象
+
+        Returns:
+            Tuple[List[User], Optional[str]]: 用户列表（columns_only 时为行）
+            和下一页游标（没有下一页时为 None）
+
+        Raises:
+            ValueError: 排序方式或游标无效
+        """
+        if order_by not in cls.PAGE_ORDERINGS:
+            raise ValueError(f"不支持的排序方式：{order_by}")
+        names, descending = cls.PAGE_ORDERINGS[order_by]
+        keys = [getattr(cls, name) for name in names]
+
+        stmt = cls._page_select(columns_only)
+        if cursor:
+            cursor_order, values = decode_cursor(cursor)
+            if cursor_order != order_by or len(values) != len(keys):
+                raise ValueError("分页游标与排序方式不匹配")
+            values = [
+                cls._parse_cursor_value(key, value)
+                for key, value in zip(keys, values)
+            ]
+            row, after = tuple_(*keys), tuple_(*values)
+            stmt = stmt.where(row < after if descending else row > after)
+        stmt = stmt.order_by(*(key.desc() if descending else key.asc() for key in keys))
+
+        # 多取一行判断是否还有下一页
+        result = await db.execute(stmt.limit(limit + 1))
+        users = list(result.all() if columns_only else result.scalars())
+        next_cursor = None
+        if len(users) > limit:
+            users = users[:limit]
+            next_cursor = encode_cursor(
+                order_by, [getattr(users[-1], name) for name in names]
+            )
+        return users, next_cursor
+
+    @staticmethod
+    def _parse_cursor_value(column, value: Any) -> Any:
+        """把游标中的值转换为列对应的 Python 类型"""
+        try:
+            if column.type.python_type is datetime:
+                return datetime.fromisoformat(value)
+            return column.type.python_type(value)
+        except (TypeError, ValueError) as e:
+            raise ValueError("无效的分页游标") from e
+
+    # update_fields 允许修改的列（hashed_password 只能通过 set_password 修改）
+    WRITABLE_COLUMNS = ("username", "email", "is_active", "is_superuser")
+
+    @classmethod
+    async def update_fields(
+        cls, db: AsyncSession, user_id: int, changes: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        """用一条 ``UPDATE ... RETURNING`` 更新用户并返回更新后的数据
+
+        不预先加载用户，也不在提交后刷新，行锁只在这一条语句期间持有。
+
+        Args:
+            db: 数据库会话
+            user_id: 用户 ID
+            changes: 要修改的列，键必须在 ``WRITABLE_COLUMNS`` 中
+
+        Returns:
+            Optional[Dict[str, Any]]: 与 to_dict 相同的用户数据，用户不存在时返回 None
+
+        Raises:
+            ValueError: 没有要修改的列、包含不可写的列或用户名无效
+            IntegrityError: 用户名或邮箱与其他用户重复
+        """
+        if not changes:
+            raise ValueError("没有要更新的字段")
+        invalid = set(changes) - set(cls.WRITABLE_COLUMNS)
+        if invalid:
+            raise ValueError(f"不允许修改的字段：{', '.join(sorted(invalid))}")
+        if "username" in changes:
+            cls.check_username(changes["username"])
+
+        columns = [getattr(cls, name) for name in cls.PUBLIC_COLUMNS]
+        result = await db.execute(
+            update(cls)
+            .where(cls.id == user_id)
+            .values(**changes, updated_at=datetime.utcnow())
+            .returning(*columns)
+            .execution_options(synchronize_session=False)
+        )
+        row = result.one_or_none()
+        return cls.row_to_dict(row) if row is not None else None
+
+    # 批量操作允许修改的列
+    BATCH_UPDATE_COLUMNS = ("is_active", "is_superuser")
+    # 批量操作支持的过滤条件
+    BATCH_FILTERS = ("is_active", "is_superuser", "created_before", "created_after")
+
+    @classmethod
+    def _id_in(cls, db: AsyncSession, ids: Sequence[int]):
+        """``id = ANY(:ids)`` 条件
+
+        PostgreSQL 下整个 ID 列表作为一个数组参数绑定，语句文本与列表长度无关；
+        其他数据库退回 ``IN (...)``。
+        """
+        if db.get_bind().dialect.name == "postgresql":
+            return cls.id == any_(literal(list(ids), ARRAY(Integer)))
+        return cls.id.in_(ids)
+
+    @classmethod
+    def batch_filter_clauses(cls, filters: Dict[str, Any]) -> List[Any]:
+        """把批量操作的过滤条件转换为 WHERE 子句
+
+        Args:
+            filters: 过滤条件，键见 ``BATCH_FILTERS``
+
+        Returns:
+            List: WHERE 子句列表
+
+        Raises:
+            ValueError: 过滤条件为空、未知或取值无效
+        """
+        if not filters:
+            raise ValueError("过滤条件不能为空")
+        clauses = []
+        for key, value in filters.items():
+            if key not in cls.BATCH_FILTERS:
+                raise ValueError(f"不支持的过滤条件：{key}")
+            if key in ("is_active", "is_superuser"):
+                if not isinstance(value, bool):
+                    raise ValueError(f"{key} 必须是布尔值")
+                clauses.append(getattr(cls, key).is_(value))
+                continue
+            try:
+                moment = datetime.fromisoformat(value)
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"{key} 必须是 ISO 8601 时间") from e
+            if key == "created_before":
+                clauses.append(cls.created_at < moment)
+            else:
+                clauses.append(cls.created_at >= moment)
+        return clauses
+
+    @classmethod
+    async def select_ids(
+        cls,
+        db: AsyncSession,
+        clauses: Sequence[Any],
+        limit: int,
+        exclude_id: Optional[int] = None,
+    ) -> List[int]:
+        """查询满足条件的用户 ID
+
+        Args:
+            db: 数据库会话
+            clauses: WHERE 子句
+            limit: 最多返回的 ID 数
+            exclude_id: 排除的用户 ID（如当前管理员）
+
+        Returns:
+            List[int]: 按 ID 排序的用户 ID 列表
+        """
+        stmt = select(cls.id).where(*clauses)
+        if exclude_id is not None:
+            stmt = stmt.where(cls.id != exclude_id)
+        result = await db.execute(stmt.order_by(cls.id).limit(limit))
+        return list(result.scalars())
+
+    @classmethod
+    async def batch_update(
+        cls, db: AsyncSession, ids: Sequence[int], values: Dict[str, Any]
+    ) -> List[int]:
+        """用一条 ``UPDATE ... WHERE id = ANY(...)`` 批量更新用户
+
+        不加载 ORM 对象，也不同步会话中已加载的对象。
+
+        Args:
+            db: 数据库会话
+            ids: 用户 ID 列表
+            values: 要更新的列，键见 ``BATCH_UPDATE_COLUMNS``
+
+        Returns:
+            List[int]: 实际更新的用户 ID
+        """
+        if not ids:
+            return []
+        result = await db.execute(
+            update(cls)
+            .where(cls._id_in(db, ids))
+            .values(**values, updated_at=datetime.utcnow())
+            .returning(cls.id)
+            .execution_options(synchronize_session=False)
+        )
+        return list(result.scalars())
+
+    @classmethod
+    async def batch_delete(cls, db: AsyncSession, ids: Sequence[int]) -> List[int]:
+        """用一条 ``DELETE ... WHERE id = ANY(...)`` 批量删除用户
+
+        Args:
+            db: 数据库会话
+            ids: 用户 ID 列表
+
+        Returns:
+            List[int]: 实际删除的用户 ID
+        """
+        if not ids:
+            return []
+        result = await db.execute(
+            delete(cls)
+            .where(cls._id_in(db, ids))
+            .returning(cls.id)
+            .execution_options(synchronize_session=False)
+        )
+        return list(result.scalars())
@@ -0,0 +1,256 @@
+import asyncio
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from config.database import engine
+from utils.hashing import hash_password_sync
+
+# 暂存表：每个连接私有，提交后清空
+STAGING_TABLE = "users_import_staging"
+STAGING_COLUMNS = ("username", "email", "hashed_password", "is_active", "is_superuser")
+
+CREATE_STAGING_SQL = f"""
+CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} (
+    username varchar(50) NOT NULL,
+    email varchar(100) NOT NULL,
+    hashed_password varchar(255) NOT NULL,
+    is_active boolean NOT NULL,
+    is_superuser boolean NOT NULL
+) ON COMMIT DELETE ROWS
+"""
+
+COPY_SQL = f"COPY {STAGING_TABLE} ({', '.join(STAGING_COLUMNS)}) FROM STDIN"
+
+# 冲突处理：skip 跳过已存在的用户名或邮箱；update 按用户名更新已存在的用户
+MERGE_SQL = {
+    "skip": f"""
+        INSERT INTO users (username, email, hashed_password, is_active, is_superuser,
+                           created_at, updated_at)
+        SELECT username, email, hashed_password, is_active, is_superuser, now(), now()
+        FROM {STAGING_TABLE}
+        ON CONFLICT DO NOTHING
+    """,
+    "update": f"""
+        INSERT INTO users (username, email, hashed_password, is_active, is_superuser,
+                           created_at, updated_at)
+        SELECT DISTINCT ON (username)
+               username, email, hashed_password, is_active, is_superuser, now(), now()
+        FROM {STAGING_TABLE}
+        ORDER BY username
+        ON CONFLICT (username) DO UPDATE SET
+            email = EXCLUDED.email,
+            hashed_password = EXCLUDED.hashed_password,
+            is_active = EXCLUDED.is_active,
+            is_superuser = EXCLUDED.is_superuser,
+            updated_at = now()
+    """,
+}
+
+# update 模式合并前剔除邮箱冲突的行，否则一行冲突就会使整批的 INSERT 失败：
+# 邮箱属于其他已有用户的行，以及同一批中邮箱与先出现的其他用户名重复的行
+REJECT_EMAIL_CONFLICTS_SQL = f"""
+    DELETE FROM {STAGING_TABLE} s
+    WHERE EXISTS (
+        SELECT 1 FROM users u WHERE u.email = s.email AND u.username <> s.username
+    )
+    OR EXISTS (
+        SELECT 1 FROM {STAGING_TABLE} o
+        WHERE o.email = s.email AND o.username <> s.username AND o.ctid < s.ctid
+    )
+"""
+
+# 与 users 表的列长度一致，超长的记录计为无效，而不是让 COPY 失败
+MAX_LENGTHS = {"username": 50, "email": 100, "hashed_password": 255}
+
+TRUE_VALUES = {"1", "true", "t", "yes", "y"}
+
+
+def detect_format(path: str) -> str:
+    """根据扩展名判断文件格式"""
+    return "csv" if path.lower().endswith(".csv") else "ndjson"
+
+
+def read_records(path: str, file_format: str) -> Iterator[Dict[str, Any]]:
+    """逐行读取 CSV 或 NDJSON 中的用户记录"""
+    with open(path, newline="", encoding="utf-8") as f:
+        if file_format == "csv":
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+
+def parse_bool(value: Any, default: bool) -> bool:
+    if value is None or value == "":
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in TRUE_VALUES
+
+
+def batched(
+    records: Iterator[Dict[str, Any]], size: int
+) -> Iterator[List[Dict[str, Any]]]:
+    """把记录按固定大小分批，内存占用只与批大小有关"""
+    batch: List[Dict[str, Any]] = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def is_valid(record: Dict[str, Any]) -> bool:
+    """必填字段存在、类型为字符串且不超过列长度，用户名不含 ``@``"""
+    for field in ("username", "email"):
+        value = record.get(field)
+        if not value or not isinstance(value, str) or len(value) > MAX_LENGTHS[field]:
+            return False
+    # 与注册一致：登录时包含 @ 的标识按邮箱查找
+    if "@" in record["username"]:
+        return False
+    hashed = record.get("hashed_password")
+    if hashed:
+        return isinstance(hashed, str) and len(hashed) <= MAX_LENGTHS["hashed_password"]
+    return bool(record.get("password")) and isinstance(record["password"], str)
+
+
+def prepare_rows(
+    batch: List[Dict[str, Any]], pool: Optional[ProcessPoolExecutor]
+) -> Tuple[List[Tuple[Any, ...]], int]:
+    """校验记录并计算密码哈希
+
+    记录可以提供明文 ``password``（在进程池中并行哈希），
+    也可以直接提供 ``hashed_password``。
+
+    Returns:
+        Tuple[List[Tuple], int]: 按 STAGING_COLUMNS 排列的行和无效记录数
+    """
+    valid = [r for r in batch if is_valid(r)]
+    plain = [r["password"] for r in valid if not r.get("hashed_password")]
+    if plain and pool is not None:
+        chunksize = max(1, len(plain) // ((os.cpu_count() or 1) * 4))
+        hashed = iter(pool.map(hash_password_sync, plain, chunksize=chunksize))
+    else:
+        hashed = iter([hash_password_sync(p) for p in plain])
+
+    rows = [
+        (
+            r["username"],
+            r["email"],
+            r.get("hashed_password") or next(hashed),
+            parse_bool(r.get("is_active"), True),
+            parse_bool(r.get("is_superuser"), False),
+        )
+        for r in valid
+    ]
+    return rows, len(batch) - len(valid)
+
+
+async def import_users(
+    path: str,
+    file_format: Optional[str] = None,
+    batch_size: int = 10000,
+    workers: Optional[int] = None,
+    on_conflict: str = "skip",
+    on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """批量导入用户
+
+    每批记录先在进程池中并行计算密码哈希，再通过 COPY 写入连接私有的暂存表，
+    最后用一条 ``INSERT ... SELECT ... ON CONFLICT`` 合并到 users 表并提交。
+    下一批的哈希与当前批的写入并行进行，内存中最多同时保留两批记录。
+
+    Args:
+        path: CSV 或 NDJSON 文件路径
+        file_format: 文件格式，默认按扩展名判断
+        batch_size: 每批记录数
+        workers: 哈希进程数，默认 CPU 核数，0 表示在当前进程中计算
+        on_conflict: 用户名或邮箱冲突时的处理方式（skip/update）；
+            update 模式下邮箱属于其他用户的行不写入，计为 rejected
+        on_progress: 每批完成后的进度回调
+
+    Returns:
+        Dict[str, Any]: 读取、写入、跳过、无效、拒绝的行数以及耗时和速率
+
+    Raises:
+        RuntimeError: 数据库驱动不是 psycopg
+    """
+    if engine.dialect.driver != "psycopg":
+        raise RuntimeError("批量导入需要 PostgreSQL + psycopg 驱动（COPY）")
+
+    file_format = file_format or detect_format(path)
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    pool = (
+        ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"))
+        if workers > 0 else None
+    )
+    stats = {"read": 0, "written": 0, "skipped": 0, "invalid": 0, "rejected": 0}
+    start = time.perf_counter()
+    loop = asyncio.get_running_loop()
+
+    try:
+        async with engine.connect() as conn:
+            raw = await conn.get_raw_connection()
+            driver = raw.driver_connection
+            await driver.execute(CREATE_STAGING_SQL)
+            await driver.commit()
+
+            batches = batched(read_records(path, file_format), batch_size)
+            batch = next(batches, None)
+            pending = (
+                loop.run_in_executor(None, prepare_rows, batch, pool) if batch else None
+            )
+            while pending is not None:
+                rows, invalid = await pending
+                current, batch = batch, next(batches, None)
+                pending = (
+                    loop.run_in_executor(None, prepare_rows, batch, pool)
+                    if batch else None
+                )
+
+                rejected = 0
+                async with driver.cursor() as cur:
+                    async with cur.copy(COPY_SQL) as copy:
+                        for row in rows:
+                            await copy.write_row(row)
+                    if on_conflict == "update":
+                        await cur.execute(REJECT_EMAIL_CONFLICTS_SQL)
+                        rejected = max(cur.rowcount, 0)
+                    await cur.execute(MERGE_SQL[on_conflict])
+                    written = max(cur.rowcount, 0)
+                await driver.commit()
+
+                stats["read"] += len(current)
+                stats["invalid"] += invalid
+                stats["rejected"] += rejected
+                stats["written"] += written
+                stats["skipped"] += len(rows) - rejected - written
+                elapsed = time.perf_counter() - start
+                stats["elapsed"] = round(elapsed, 3)
+                stats["rows_per_sec"] = (
+                    round(stats["read"] / elapsed, 1) if elapsed else 0.0
+                )
+                if on_progress:
+                    on_progress(dict(stats))
+
+            # 刷新规划器统计，使 estimated 计数模式及时反映导入结果
+            await driver.execute("ANALYZE users")
+            await driver.commit()
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    elapsed = time.perf_counter() - start
+    stats["elapsed"] = round(elapsed, 3)
+    stats["rows_per_sec"] = round(stats["read"] / elapsed, 1) if elapsed else 0.0
+    return stats
@@ -32,7 +32,7 @@ async def init_db():
                     is_active=True,
                     is_superuser=True
                 )
-                admin.set_password("admin123")
+                await admin.set_password_async("admin123")
                 print(f"新管理员用户密码哈希值: {admin.hashed_password}")
                 session.add(admin)
                 await session.commit()
@@ -40,7 +40,7 @@ async def init_db():
             else:
                 print(f"现有管理员用户密码哈希值: {admin.hashed_password}")
                 # 更新现有管理员用户的密码
-                admin.set_password("admin123")
+                await admin.set_password_async("admin123")
                 print(f"更新后的密码哈希值: {admin.hashed_password}")
                 await session.commit()
                 print("管理员用户密码更新成功")
@@ -0,0 +1,30 @@
+"""测试公共配置
+
+默认使用临时 SQLite 数据库（需要 aiosqlite）；设置 ``DB_URL`` 时改用该数据库，
+例如本地 PostgreSQL。环境变量必须在导入 ``config.settings`` 之前设置。
+"""
+import os
+import tempfile
+
+import pytest
+
+_db_path = os.path.join(tempfile.mkdtemp(prefix="ai-demo-tests-"), "test.db")
+os.environ.setdefault("DB_URL", f"sqlite+aiosqlite:///{_db_path}")
+os.environ.setdefault("ENV", "testing")
+# 并发注册等测试从同一 IP 发出大量请求，不能被登录/注册限流拦截
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+# 在当前线程中计算密码哈希，不启动进程池
+os.environ.setdefault("PASSWORD_HASH_WORKERS", "0")
+
+
+@pytest.fixture(scope="session")
+def app():
+    """应用实例（创建时建表）"""
+    from app import create_app
+
+    return create_app()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
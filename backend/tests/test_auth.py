@@ -0,0 +1,50 @@
+"""认证装饰器测试
+
+``token_required`` / ``admin_required`` 的错误响应经过 flask-restx 序列化，
+必须返回字典而不是 ``jsonify`` 的 Response，否则 401/403 会变成 500。
+"""
+import uuid
+
+PASSWORD = "auth-secret"
+
+
+def register_and_login(client) -> str:
+    username = f"auth_{uuid.uuid4().hex[:8]}"
+    response = client.post(
+        "/api/v1/auth/register",
+        json={
+            "username": username,
+            "email": f"{username}@auth.test",
+            "password": PASSWORD,
+        },
+    )
+    assert response.status_code == 201
+    response = client.post(
+        "/api/v1/auth/login", json={"username": username, "password": PASSWORD}
+    )
+    assert response.status_code == 200
+    return response.get_json()["access_token"]
+
+
+def test_missing_token_returns_401(client):
+    response = client.get("/api/v1/auth/me")
+    assert response.status_code == 401
+    assert response.get_json()["message"] == "缺少认证令牌"
+
+
+def test_invalid_token_returns_401(client):
+    response = client.get(
+        "/api/v1/auth/me", headers={"Authorization": "Bearer not-a-token"}
+    )
+    assert response.status_code == 401
+    assert response.get_json()["message"] == "无效的认证令牌"
+
+
+def test_non_admin_gets_403(client):
+    token = register_and_login(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/api/v1/auth/me", headers=headers).status_code == 200
+
+    response = client.get("/api/v1/users", headers=headers)
+    assert response.status_code == 403
+    assert response.get_json()["message"] == "需要管理员权限"
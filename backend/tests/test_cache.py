@@ -0,0 +1,122 @@
+"""进程内缓存测试（使用可控时钟，不依赖真实时间）"""
+import pytest
+
+from utils.cache import (
+    CachedCounter,
+    InvalidationChannel,
+    LocalInvalidationChannel,
+    TTLCache,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_ttl_cache_expires_entries(clock):
+    cache = TTLCache(maxsize=10, ttl=5, clock=clock)
+    cache.set("a", 1)
+    clock.advance(4.9)
+    assert cache.get("a") == 1
+    clock.advance(0.1)
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+    assert len(cache) == 0
+
+
+def test_ttl_cache_per_entry_ttl_overrides_default(clock):
+    cache = TTLCache(maxsize=10, ttl=60, clock=clock)
+    cache.set("short", 1, ttl=1)
+    cache.set("expired", 2, ttl=0)
+    clock.advance(2)
+    assert cache.get("short") is None
+    assert cache.get("expired") is None
+
+
+def test_ttl_cache_evicts_least_recently_used(clock):
+    cache = TTLCache(maxsize=2, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_cache_disabled_when_maxsize_is_zero(clock):
+    cache = TTLCache(maxsize=0, clock=clock)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+
+
+def test_ttl_cache_drops_values_read_before_invalidation(clock):
+    cache = TTLCache(maxsize=10, clock=clock)
+    generation = cache.generation
+    # 读取数据期间条目被删除，之后写入的旧值应被丢弃
+    cache.pop("a")
+    cache.set("a", "stale", generation=generation)
+    assert cache.get("a") is None
+
+    cache.set("a", "fresh", generation=cache.generation)
+    assert cache.get("a") == "fresh"
+    cache.clear()
+    assert cache.get("a") is None
+
+
+def test_cached_counter_expires(clock):
+    counter = CachedCounter(ttl=30, clock=clock)
+    assert counter.get() is None
+    counter.set(10)
+    clock.advance(29)
+    assert counter.get() == 10
+    clock.advance(1)
+    assert counter.get() is None
+
+
+def test_cached_counter_adjust_and_invalidate(clock):
+    counter = CachedCounter(ttl=30, clock=clock)
+    counter.set(10)
+    counter.adjust(2)
+    counter.adjust(-20)
+    assert counter.get() == 0
+
+    counter.invalidate()
+    assert counter.get() is None
+
+
+def test_cached_counter_discards_refresh_after_concurrent_change(clock):
+    counter = CachedCounter(ttl=30, clock=clock)
+    generation = counter.generation
+    counter.adjust(1)
+    counter.set(10, generation=generation)
+    assert counter.get() is None
+    counter.set(11, generation=counter.generation)
+    assert counter.get() == 11
+
+
+def test_local_invalidation_channel_notifies_subscribers(clock):
+    cache = TTLCache(maxsize=10, clock=clock)
+    cache.set("user:1", "principal")
+    channel = LocalInvalidationChannel()
+    channel.subscribe(cache.pop)
+    channel.publish("user:1")
+    assert cache.get("user:1") is None
+
+
+def test_invalidation_channel_requires_publish():
+    with pytest.raises(TypeError):
+        InvalidationChannel()
@@ -0,0 +1,105 @@
+"""响应压缩测试
+
+- 流式响应逐块压缩，每块之后 flush，客户端无需等待整个响应；
+- 压缩后的表示与原始表示字节不同，强 ETag 改为弱 ETag；
+- 客户端不接受压缩编码或响应过小时保持原样。
+"""
+import gzip
+import zlib
+
+import pytest
+from flask import Flask, Response
+
+from utils.compression import Compressor
+
+CHUNKS = [f'{{"id": {i}, "name": "user-{i}"}}\n' * 50 for i in range(3)]
+BODY = "".join(CHUNKS)
+
+
+@pytest.fixture
+def compressed_app():
+    app = Flask(__name__)
+    app.config["COMPRESSION_MIN_SIZE"] = 100
+    Compressor(app)
+    app.closed_streams = []
+
+    def generate():
+        try:
+            yield from CHUNKS
+        finally:
+            app.closed_streams.append(True)
+
+    @app.route("/stream")
+    def stream():
+        return Response(generate(), mimetype="application/x-ndjson")
+
+    @app.route("/tagged")
+    def tagged():
+        response = Response(BODY, mimetype="application/json")
+        response.set_etag("users-1")
+        return response
+
+    @app.route("/small")
+    def small():
+        return Response("{}", mimetype="application/json")
+
+    return app
+
+
+def test_streamed_response_is_compressed_chunk_by_chunk(compressed_app):
+    client = compressed_app.test_client()
+    response = client.get(
+        "/stream", headers={"Accept-Encoding": "gzip"}, buffered=False
+    )
+    assert response.is_streamed
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Content-Length" not in response.headers
+    assert "Accept-Encoding" in response.headers["Vary"]
+
+    decoder = zlib.decompressobj(wbits=31)
+    chunks = iter(response.response)
+    # 每块都已 flush，收到第一块就能解出第一段原始内容
+    assert decoder.decompress(next(chunks)).decode() == CHUNKS[0]
+    rest = b"".join(decoder.decompress(chunk) for chunk in chunks)
+    assert rest.decode() == "".join(CHUNKS[1:])
+    assert decoder.eof
+    response.close()
+    assert compressed_app.closed_streams == [True]
+
+
+def test_closing_compressed_stream_closes_source(compressed_app):
+    client = compressed_app.test_client()
+    response = client.get(
+        "/stream", headers={"Accept-Encoding": "gzip"}, buffered=False
+    )
+    next(iter(response.response))
+    # 客户端中途断开：原始迭代器也被关闭
+    response.close()
+    assert compressed_app.closed_streams == [True]
+
+
+def test_strong_etag_becomes_weak_when_compressed(compressed_app):
+    client = compressed_app.test_client()
+    response = client.get("/tagged", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["ETag"] == 'W/"users-1"'
+    assert gzip.decompress(response.data).decode() == BODY
+
+    response = client.get("/tagged", headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in response.headers
+    assert response.headers["ETag"] == '"users-1"'
+
+
+def test_brotli_is_preferred_when_installed(compressed_app):
+    brotli = pytest.importorskip("brotli")
+    client = compressed_app.test_client()
+    response = client.get("/tagged", headers={"Accept-Encoding": "gzip, br"})
+    assert response.headers["Content-Encoding"] == "br"
+    assert brotli.decompress(response.data).decode() == BODY
+
+
+def test_small_responses_are_not_compressed(compressed_app):
+    client = compressed_app.test_client()
+    response = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
+    assert response.data == b"{}"
@@ -0,0 +1,54 @@
+"""条件请求测试
+
+updated_at 带微秒，HTTP 日期只精确到秒：客户端回传收到的 Last-Modified 时
+必须命中（304），早一秒时不命中。
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from flask import Flask
+
+from utils.conditional import is_not_modified, make_etag, validator_headers
+
+UPDATED_AT = datetime(2024, 5, 1, 8, 30, 15, 987654, tzinfo=timezone.utc)
+ETAG = make_etag("user", 1, UPDATED_AT)
+
+
+@pytest.fixture
+def flask_app():
+    return Flask(__name__)
+
+
+def check(flask_app, headers, last_modified=UPDATED_AT) -> bool:
+    with flask_app.test_request_context(headers=headers):
+        return is_not_modified(ETAG, last_modified)
+
+
+def test_last_modified_is_whole_seconds():
+    headers = validator_headers(ETAG, UPDATED_AT)
+    assert headers["Last-Modified"] == "Wed, 01 May 2024 08:30:15 GMT"
+
+
+def test_echoed_last_modified_matches_sub_second_updated_at(flask_app):
+    last_modified = validator_headers(ETAG, UPDATED_AT)["Last-Modified"]
+    assert check(flask_app, {"If-Modified-Since": last_modified})
+
+
+def test_earlier_if_modified_since_does_not_match(flask_app):
+    earlier = validator_headers(ETAG, UPDATED_AT - timedelta(seconds=1))
+    assert not check(flask_app, {"If-Modified-Since": earlier["Last-Modified"]})
+
+
+def test_naive_updated_at_is_treated_as_utc(flask_app):
+    naive = UPDATED_AT.replace(tzinfo=None)
+    headers = {"If-Modified-Since": "Wed, 01 May 2024 08:30:15 GMT"}
+    assert check(flask_app, headers, last_modified=naive)
+
+
+def test_if_none_match_takes_precedence(flask_app):
+    headers = {
+        "If-None-Match": '"other"',
+        "If-Modified-Since": "Wed, 01 May 2024 08:30:15 GMT",
+    }
+    assert not check(flask_app, headers)
+    assert check(flask_app, {"If-None-Match": f'W/"{ETAG}"'})
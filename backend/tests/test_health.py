@@ -0,0 +1,44 @@
+"""健康检查接口测试
+
+``/health`` 公开；连接池、副本、缓存和限流统计只对管理员开放。
+"""
+import pytest
+
+from tests.test_auth import register_and_login
+from tests.test_users import promote
+from utils.loop import run_sync
+
+STATS_PATHS = [
+    "/api/v1/health/pool",
+    "/api/v1/health/replicas",
+    "/api/v1/health/cache",
+    "/api/v1/health/ratelimit",
+]
+
+
+@pytest.fixture(autouse=True)
+def cheap_hashing(monkeypatch):
+    monkeypatch.setattr("utils.hashing.PASSWORD_HASH_METHOD", "pbkdf2:sha256:1000")
+
+
+@pytest.fixture
+def user_headers(client):
+    return {"Authorization": f"Bearer {register_and_login(client)}"}
+
+
+def test_health_is_public(client):
+    response = client.get("/api/v1/health")
+    assert response.status_code == 200
+    assert response.get_json()["status"] == "healthy"
+
+
+@pytest.mark.parametrize("path", STATS_PATHS)
+def test_stats_require_admin(client, user_headers, path):
+    assert client.get(path).status_code == 401
+    assert client.get(path, headers=user_headers).status_code == 403
+
+    user = client.get("/api/v1/auth/me", headers=user_headers).get_json()
+    run_sync(promote(user["id"]))
+    response = client.get(path, headers=user_headers)
+    assert response.status_code == 200
+    assert isinstance(response.get_json(), dict)
@@ -0,0 +1,58 @@
+"""登录查询执行计划测试
+
+按用户名或邮箱登录的查询必须走 ``lower(username)`` / ``lower(email)``
+函数索引，而不是全表扫描。
+"""
+import json
+from typing import Any, Iterator, List
+
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from config.database import engine
+from models.user import User
+from utils.loop import run_sync
+
+
+def walk_plan(node: dict) -> Iterator[dict]:
+    """遍历 PostgreSQL JSON 执行计划的所有节点"""
+    yield node
+    for child in node.get("Plans", []):
+        yield from walk_plan(child)
+
+
+async def explain(conn: AsyncConnection, identifier: str) -> List[str]:
+    """返回登录查询执行计划的文本行"""
+    compiled = User.credentials_query(identifier).compile(dialect=conn.dialect)
+    params: Any = compiled.params
+    if compiled.positional:
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+
+    if conn.dialect.name == "postgresql":
+        # 测试库的表很小，关闭顺序扫描后规划器只要“能够”使用索引就会使用
+        await conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", params)
+        plan = result.scalar_one()
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+        nodes = walk_plan(plan[0]["Plan"])
+        return [node.get("Index Name", node["Node Type"]) for node in nodes]
+
+    result = await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params)
+    return [row[-1] for row in result]
+
+
+async def login_plan(identifier: str) -> List[str]:
+    async with engine.connect() as conn:
+        async with conn.begin() as transaction:
+            lines = await explain(conn, identifier)
+            await transaction.rollback()
+    return lines
+
+
+def test_login_lookup_uses_lower_username_index(app):
+    lines = run_sync(login_plan("alice"))
+    assert any("ix_users_lower_username" in line for line in lines), lines
+
+
+def test_login_lookup_uses_lower_email_index(app):
+    lines = run_sync(login_plan("Alice@Example.com"))
+    assert any("ix_users_lower_email" in line for line in lines), lines
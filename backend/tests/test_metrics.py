@@ -0,0 +1,58 @@
+"""多进程指标合并测试
+
+每个 worker 把快照写入 ``<directory>/metrics-<pid>.json``，抓取时合并：
+计数和分桶统计逐项相加，已退出进程的瞬时值被丢弃。
+"""
+import json
+import os
+
+from utils.metrics import MetricsRegistry
+
+# 不存在的进程号，模拟已退出的 worker
+WORKER_PIDS = (4194301, 4194302)
+
+
+def worker_snapshot(requests: int, durations) -> dict:
+    worker = MetricsRegistry()
+    counter = worker.counter("requests_total", "请求数", ("route",))
+    histogram = worker.histogram(
+        "duration_seconds", "耗时（秒）", ("route",), buckets=(0.1, 1.0)
+    )
+    in_flight = worker.gauge("in_flight", "正在处理的请求数")
+    counter.inc("/users", amount=requests)
+    for duration in durations:
+        histogram.observe(duration, "/users")
+    in_flight.inc()
+    return worker.snapshot()
+
+
+def test_render_merges_worker_files(tmp_path):
+    snapshots = (worker_snapshot(3, [0.05, 0.5]), worker_snapshot(2, [0.05, 5.0]))
+    for pid, snapshot in zip(WORKER_PIDS, snapshots):
+        with open(tmp_path / f"metrics-{pid}.json", "w") as f:
+            json.dump(snapshot, f)
+
+    output = MetricsRegistry(str(tmp_path)).render()
+    lines = output.splitlines()
+
+    assert 'requests_total{route="/users"} 5' in lines
+    assert 'duration_seconds_bucket{route="/users",le="0.1"} 2' in lines
+    assert 'duration_seconds_bucket{route="/users",le="1"} 3' in lines
+    assert 'duration_seconds_bucket{route="/users",le="+Inf"} 4' in lines
+    assert 'duration_seconds_sum{route="/users"} 5.6' in lines
+    assert 'duration_seconds_count{route="/users"} 4' in lines
+    assert "# TYPE duration_seconds histogram" in lines
+    # 两个 worker 都已退出，瞬时值不再计入
+    assert "in_flight" not in [line.split(" ")[0] for line in lines]
+
+
+def test_render_includes_current_process(tmp_path):
+    with open(tmp_path / f"metrics-{WORKER_PIDS[0]}.json", "w") as f:
+        json.dump(worker_snapshot(3, []), f)
+
+    registry = MetricsRegistry(str(tmp_path))
+    registry.counter("requests_total", "请求数", ("route",)).inc("/users")
+    registry.write()
+    assert os.path.exists(tmp_path / f"metrics-{os.getpid()}.json")
+
+    assert 'requests_total{route="/users"} 4' in registry.render().splitlines()
@@ -0,0 +1,71 @@
+"""语句预算测试
+
+``QUERY_BUDGET_STRICT`` 为真时，视图执行的语句数超过 ``query_budget``
+声明的上限应使请求失败（抛出 ``QueryBudgetExceededError``）。
+
+测试应用使用独立的引擎注册表，分析器的监听器不会挂到共享引擎上。
+"""
+import pytest
+from flask import Flask
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.database import EngineRegistry
+from config.settings import settings
+from models.user import User
+from utils.loop import async_route, run_sync
+from utils.query_analyzer import (
+    QueryAnalyzer,
+    QueryBudgetExceededError,
+    query_budget,
+)
+
+LOOKUPS = 5
+
+
+@pytest.fixture
+def budget_app(app):
+    registry = EngineRegistry(settings)
+    engine = registry.get()
+
+    budget_app = Flask(__name__)
+    budget_app.config.update(
+        TESTING=True,
+        QUERY_ANALYZER_ENABLED=True,
+        QUERY_BUDGET_STRICT=True,
+        SLOW_QUERY_EXPLAIN=False,
+    )
+    budget_app.extensions["db_engines"] = registry
+    QueryAnalyzer(budget_app)
+
+    async def lookup_each():
+        # 典型的 N+1：逐个按 ID 查询，而不是一条 IN 查询
+        async with AsyncSession(engine) as session:
+            for user_id in range(1, LOOKUPS + 1):
+                await session.execute(select(User.username).where(User.id == user_id))
+        return {"lookups": LOOKUPS}
+
+    @budget_app.route("/over-budget")
+    @query_budget(2)
+    @async_route
+    async def over_budget():
+        return await lookup_each()
+
+    @budget_app.route("/within-budget")
+    @query_budget(LOOKUPS)
+    @async_route
+    async def within_budget():
+        return await lookup_each()
+
+    yield budget_app
+    run_sync(registry.dispose_all())
+
+
+def test_n_plus_one_over_budget_fails_in_strict_mode(budget_app):
+    with pytest.raises(QueryBudgetExceededError):
+        budget_app.test_client().get("/over-budget")
+
+
+def test_statements_within_budget_pass(budget_app):
+    response = budget_app.test_client().get("/within-budget")
+    assert response.status_code == 200
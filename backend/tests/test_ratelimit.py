@@ -0,0 +1,85 @@
+"""登录/注册限流测试
+
+conftest 关闭了限流；``enabled`` 在每个请求时检查，这里为单个测试打开，
+并换成使用可控时钟的独立令牌桶存储，不影响其他测试。
+"""
+import uuid
+
+import pytest
+
+from tests.test_cache import FakeClock
+from utils.ratelimit import (
+    LocalTokenBucketStore,
+    client_ip,
+    login_limiter,
+    register_limiter,
+)
+
+LOGIN = ("/api/v1/auth/login", login_limiter)
+REGISTER = ("/api/v1/auth/register", register_limiter)
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def enable(monkeypatch, limiter, clock, spec=(2, 60.0)):
+    """只保留按 IP 的规则：每 60 秒 2 次"""
+    monkeypatch.setattr(limiter, "enabled", True)
+    monkeypatch.setattr(limiter, "store", LocalTokenBucketStore(clock=clock))
+    monkeypatch.setattr(limiter, "rules", [("ip", spec, client_ip)])
+    monkeypatch.setattr(limiter, "rejected", {"ip": 0})
+
+
+def payload() -> dict:
+    username = f"limit_{uuid.uuid4().hex[:8]}"
+    return {
+        "username": username,
+        "email": f"{username}@limit.test",
+        "password": "limit-secret",
+    }
+
+
+@pytest.fixture(autouse=True)
+def cheap_hashing(monkeypatch):
+    monkeypatch.setattr("utils.hashing.PASSWORD_HASH_METHOD", "pbkdf2:sha256:1000")
+
+
+@pytest.mark.parametrize("path, limiter", [LOGIN, REGISTER])
+def test_exceeding_limit_returns_429_with_retry_after(
+    client, monkeypatch, clock, path, limiter
+):
+    enable(monkeypatch, limiter, clock)
+    for _ in range(2):
+        assert client.post(path, json=payload()).status_code != 429
+
+    response = client.post(path, json=payload())
+    assert response.status_code == 429
+    assert response.get_json()["message"] == "请求过于频繁，请稍后重试"
+    # 每 30 秒补充一个令牌
+    assert response.headers["Retry-After"] == "30"
+    assert limiter.stats() == {"ip": 1}
+
+    clock.advance(30)
+    assert client.post(path, json=payload()).status_code != 429
+
+
+@pytest.mark.parametrize("path, limiter", [LOGIN, REGISTER])
+def test_rejected_request_opens_no_session(client, monkeypatch, clock, path, limiter):
+    enable(monkeypatch, limiter, clock, spec=(1, 60.0))
+    assert client.post(path, json=payload()).status_code != 429
+
+    calls = []
+
+    def forbidden(*args, **kwargs):
+        calls.append(args)
+        raise AssertionError("被限流的请求不应访问数据库或计算密码哈希")
+
+    monkeypatch.setattr("api.v1.endpoints.auth.get_session", forbidden)
+    monkeypatch.setattr("utils.hashing.hash_password_sync", forbidden)
+    monkeypatch.setattr("utils.hashing.verify_password_sync", forbidden)
+
+    response = client.post(path, json=payload())
+    assert response.status_code == 429
+    assert calls == []
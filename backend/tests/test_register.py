@@ -0,0 +1,205 @@
+"""注册测试
+
+注册不预先查询用户名和邮箱，由唯一索引判断冲突：
+
+- 并发用相同的用户名和邮箱注册时不出现 500，每个邮箱恰好成功一次，
+  冲突只返回“用户名已存在”或“邮箱已存在”；
+- 非唯一约束的完整性错误（如缺少必填列）不能被报告为重复；
+- 用户名不能包含 ``@``，注册与他人邮箱相同的用户名不能冒用其登录。
+
+conftest 关闭了登录/注册限流，否则同一 IP 的大量注册会返回 429。
+"""
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+
+import pytest
+from sqlalchemy import delete, func, select
+from sqlalchemy.exc import IntegrityError
+
+from config.database import AsyncSessionLocal
+from models.user import User
+from utils.auth import invalidate_principal
+from utils.hashing import hash_password_sync
+from utils.loop import run_sync
+
+PASSWORD = "stress-secret"
+USERS = 10
+ATTEMPTS = 4
+THREADS = 8
+
+
+def build_attempts(prefix: str) -> List[Tuple[str, str]]:
+    """构造注册请求：(用户名, 邮箱)
+
+    每个邮箱用同一用户名提交 ATTEMPTS 次（用户名冲突），
+    再用另一个用户名提交一次（邮箱冲突），每个邮箱应恰好注册成功一次。
+    """
+    attempts = []
+    for i in range(USERS):
+        email = f"{prefix}{i}@stress.test"
+        attempts += [(f"{prefix}{i}", email)] * ATTEMPTS
+        attempts.append((f"{prefix}{i}x", email))
+    return attempts
+
+
+async def count_users(prefix: str) -> int:
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(func.count())
+            .select_from(User)
+            .where(User.username.like(f"{prefix}%"))
+        )
+        return result.scalar_one()
+
+
+async def cleanup(prefix: str) -> None:
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            delete(User)
+            .where(User.username.like(f"{prefix}%"))
+            .returning(User.id)
+        )
+        user_ids = result.scalars().all()
+        await session.commit()
+    # SQLite 会复用已删除的 id，认证缓存中不能留下被删除的用户
+    for user_id in user_ids:
+        invalidate_principal(user_id)
+
+
+@pytest.fixture
+def prefix(app):
+    prefix = f"stress_{uuid.uuid4().hex[:8]}_"
+    yield prefix
+    run_sync(cleanup(prefix))
+
+
+def test_concurrent_signups_register_each_email_once(app, prefix, monkeypatch):
+    # 哈希在请求线程中计算（PASSWORD_HASH_WORKERS=0），降低迭代次数，
+    # 避免长时间占用 GIL 使 SQLite 写锁等待超时
+    monkeypatch.setattr("utils.hashing.PASSWORD_HASH_METHOD", "pbkdf2:sha256:1000")
+    attempts = build_attempts(prefix)
+
+    def register(attempt: Tuple[str, str]) -> Tuple[str, int, str]:
+        username, email = attempt
+        with app.test_client() as client:
+            response = client.post(
+                "/api/v1/auth/register",
+                json={"username": username, "email": email, "password": PASSWORD},
+            )
+        message = (response.get_json() or {}).get("message", "")
+        return email, response.status_code, message
+
+    with ThreadPoolExecutor(max_workers=THREADS) as pool:
+        results = list(pool.map(register, attempts))
+
+    statuses = Counter(status for _, status, _ in results)
+    assert set(statuses) <= {201, 400}, statuses
+    created = Counter(email for email, status, _ in results if status == 201)
+    assert created == Counter({email: 1 for _, email in attempts})
+    messages = {message for _, status, message in results if status == 400}
+    assert messages <= {"用户名已存在", "邮箱已存在"}
+    assert run_sync(count_users(prefix)) == USERS
+
+
+async def create_error(**values) -> IntegrityError:
+    """执行一次会失败的插入，返回完整性错误"""
+    async with AsyncSessionLocal() as session:
+        try:
+            await User.create(session, hashed_password="x", **values)
+            await session.commit()
+        except IntegrityError as e:
+            await session.rollback()
+            return e
+    raise AssertionError("插入没有失败")
+
+
+def test_conflicting_column_identifies_unique_violations(app, prefix):
+    client = app.test_client()
+    response = client.post(
+        "/api/v1/auth/register",
+        json={
+            "username": f"{prefix}a",
+            "email": f"{prefix}a@x.test",
+            "password": PASSWORD,
+        },
+    )
+    assert response.status_code == 201
+
+    error = run_sync(create_error(username=f"{prefix}a", email=f"{prefix}b@x.test"))
+    assert User.conflicting_column(error) == "username"
+    error = run_sync(create_error(username=f"{prefix}b", email=f"{prefix}a@x.test"))
+    assert User.conflicting_column(error) == "email"
+
+
+def test_conflicting_column_ignores_other_integrity_errors(app, prefix):
+    error = run_sync(create_error(username=f"{prefix}c", email=None))
+    assert User.conflicting_column(error) is None
+
+
+def login(client, identifier: str, password: str):
+    return client.post(
+        "/api/v1/auth/login", json={"username": identifier, "password": password}
+    )
+
+
+def current_username(client, response) -> str:
+    token = response.get_json()["access_token"]
+    me = client.get("/api/v1/auth/me", headers={"Authorization": f"Bearer {token}"})
+    return me.get_json()["username"]
+
+
+async def create_user(username: str, email: str, password: str) -> None:
+    async with AsyncSessionLocal() as session:
+        await User.create(
+            session,
+            username=username,
+            email=email,
+            hashed_password=hash_password_sync(password),
+        )
+        await session.commit()
+
+
+def test_username_matching_another_email_is_rejected(app, prefix, monkeypatch):
+    monkeypatch.setattr("utils.hashing.PASSWORD_HASH_METHOD", "pbkdf2:sha256:1000")
+    client = app.test_client()
+    victim_email = f"{prefix}victim@x.test"
+    response = client.post(
+        "/api/v1/auth/register",
+        json={
+            "username": f"{prefix}victim",
+            "email": victim_email,
+            "password": PASSWORD,
+        },
+    )
+    assert response.status_code == 201
+
+    response = client.post(
+        "/api/v1/auth/register",
+        json={
+            "username": victim_email,
+            "email": f"{prefix}attacker@x.test",
+            "password": "attacker-secret",
+        },
+    )
+    assert response.status_code == 400
+    assert response.get_json()["message"] == "用户名不能包含 @"
+
+    response = login(client, victim_email, PASSWORD)
+    assert response.status_code == 200
+    assert current_username(client, response) == f"{prefix}victim"
+
+
+def test_email_login_ignores_usernames(app, prefix, monkeypatch):
+    # 规则生效前已存在的用户名可能包含 @，按邮箱登录时不能匹配到它
+    monkeypatch.setattr("utils.hashing.PASSWORD_HASH_METHOD", "pbkdf2:sha256:1000")
+    victim_email = f"{prefix}victim@x.test"
+    run_sync(create_user(f"{prefix}victim", victim_email, PASSWORD))
+    run_sync(create_user(victim_email, f"{prefix}attacker@x.test", "attacker-secret"))
+    client = app.test_client()
+
+    response = login(client, victim_email.upper(), PASSWORD)
+    assert response.status_code == 200
+    assert current_username(client, response) == f"{prefix}victim"
+    assert login(client, victim_email, "attacker-secret").status_code == 401
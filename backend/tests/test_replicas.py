@@ -0,0 +1,176 @@
+"""读副本路由测试（使用桩引擎注册表，不连接真实数据库）
+
+- ``ReplicaSet.choose`` 只在延迟不超过阈值的副本中选择，
+  没有可用副本时返回 None（由调用方退回主库）并累计 ``fallbacks``；
+- ``RoutingSession.get_bind`` 把只读查询发往副本，写语句和 ``FOR UPDATE``
+  发往主库，并把会话固定到主库（read-your-writes）。
+"""
+import math
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, select, update
+
+import config.database as database
+from config.database import ReplicaSet, RoutingSession
+from models.user import User
+from utils.loop import run_sync
+
+
+class StubEngine:
+    def __init__(self, name: str, checkedout: int = 0):
+        self.name = name
+        self.pool = SimpleNamespace(checkedout=lambda: checkedout)
+        self.sync_engine = self
+
+
+class StubRegistry:
+    """只记录名称的引擎注册表"""
+
+    def __init__(self, checkedout=None):
+        self.engines = {}
+        self.checkedout = checkedout or {}
+
+    def get(self, name: str, url=None):
+        if name not in self.engines:
+            self.engines[name] = StubEngine(name, self.checkedout.get(name, 0))
+        return self.engines[name]
+
+
+def replica_set(monkeypatch, lags, strategy="round_robin", checkedout=None):
+    config = SimpleNamespace(
+        DB_REPLICA_URLS=[f"postgresql://replica-{i}" for i in range(len(lags))],
+        DB_REPLICA_STRATEGY=strategy,
+        DB_REPLICA_MAX_LAG=5.0,
+        DB_REPLICA_CHECK_INTERVAL=5.0,
+    )
+    replicas = ReplicaSet(StubRegistry(checkedout), config)
+    # 不启动后台延迟检查，延迟由测试直接设置
+    monkeypatch.setattr(replicas, "_ensure_monitor", lambda: None)
+    replicas.lag.update(zip(replicas.names, lags))
+    return replicas
+
+
+def chosen(replicas: ReplicaSet):
+    engine = replicas.choose()
+    return engine.name if engine is not None else None
+
+
+def test_unchecked_replicas_fall_back_to_primary(monkeypatch):
+    replicas = replica_set(monkeypatch, [math.inf, math.inf])
+    assert chosen(replicas) is None
+    assert replicas.fallbacks == 1
+
+
+def test_lagging_replicas_are_skipped(monkeypatch):
+    replicas = replica_set(monkeypatch, [10.0, 1.0])
+    assert {chosen(replicas) for _ in range(4)} == {"replica-1"}
+    assert replicas.fallbacks == 0
+
+    replicas.lag["replica-1"] = 5.1
+    assert chosen(replicas) is None
+    assert chosen(replicas) is None
+    assert replicas.fallbacks == 2
+    assert replicas.stats()["fallbacks"] == 2
+
+
+def test_round_robin_alternates(monkeypatch):
+    replicas = replica_set(monkeypatch, [0.0, 0.0])
+    assert [chosen(replicas) for _ in range(4)] == [
+        "replica-0",
+        "replica-1",
+        "replica-0",
+        "replica-1",
+    ]
+
+
+def test_least_connections_prefers_idle_replica(monkeypatch):
+    replicas = replica_set(
+        monkeypatch,
+        [0.0, 0.0, 9.0],
+        strategy="least_connections",
+        checkedout={"replica-0": 3, "replica-1": 1, "replica-2": 0},
+    )
+    # replica-2 连接最少，但延迟超过阈值
+    assert chosen(replicas) == "replica-1"
+
+
+def test_failed_lag_check_marks_replica_unavailable(monkeypatch):
+    replicas = replica_set(monkeypatch, [0.0, 0.0])
+
+    async def measure(name: str) -> float:
+        if name == "replica-0":
+            raise ConnectionError(name)
+        return 0.5
+
+    monkeypatch.setattr(replicas, "_measure", measure)
+    run_sync(replicas.check())
+    assert replicas.lag == {"replica-0": math.inf, "replica-1": 0.5}
+    assert replicas.available() == ["replica-1"]
+
+
+class StubReplicas:
+    def __init__(self, engine):
+        self.engine = engine
+        self.calls = 0
+
+    def choose(self):
+        self.calls += 1
+        return self.engine
+
+
+@pytest.fixture
+def primary():
+    engine = create_engine("sqlite://")
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def stub_replicas(monkeypatch):
+    replicas = StubReplicas(StubEngine("replica-0"))
+    monkeypatch.setattr(database, "replicas", replicas)
+    return replicas
+
+
+def routing_session(primary, use_replica=True) -> RoutingSession:
+    info = {"use_replica": True} if use_replica else {}
+    return RoutingSession(bind=primary, info=info)
+
+
+def test_reads_use_one_replica_per_session(primary, stub_replicas):
+    session = routing_session(primary)
+    query = select(User.id)
+    assert session.get_bind(clause=query) is stub_replicas.engine
+    assert session.get_bind(clause=query) is stub_replicas.engine
+    assert stub_replicas.calls == 1
+
+
+def test_write_pins_session_to_primary(primary, stub_replicas):
+    session = routing_session(primary)
+    assert session.get_bind(clause=select(User.id)) is stub_replicas.engine
+
+    write = update(User).where(User.id == 1).values(is_active=False)
+    assert session.get_bind(clause=write) is primary
+    # 写入之后的读取必须能看到本会话的写入
+    assert session.get_bind(clause=select(User.id)) is primary
+    assert session.info["pin_primary"] is True
+
+
+def test_select_for_update_uses_primary(primary, stub_replicas):
+    session = routing_session(primary)
+    locked = select(User.id).with_for_update()
+    assert session.get_bind(clause=locked) is primary
+    assert stub_replicas.calls == 0
+
+
+def test_primary_sessions_never_choose_replica(primary, stub_replicas):
+    session = routing_session(primary, use_replica=False)
+    assert session.get_bind(clause=select(User.id)) is primary
+    assert stub_replicas.calls == 0
+
+
+def test_no_available_replica_reads_from_primary(primary, stub_replicas):
+    stub_replicas.engine = None
+    session = routing_session(primary)
+    assert session.get_bind(clause=select(User.id)) is primary
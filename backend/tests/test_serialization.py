@@ -0,0 +1,52 @@
+"""JSON 序列化测试
+
+快速路径（``RowEncoder`` + ``dumps``）与 ``User.to_dict`` 的输出必须逐字节一致，
+带时区的时间统一输出为 UTC。
+"""
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from models.user import User
+from utils import serialization
+from utils.serialization import RowEncoder, dumps
+
+SHANGHAI = timezone(timedelta(hours=8))
+ROW = (
+    1,
+    "alice",
+    "alice@example.com",
+    True,
+    False,
+    datetime(2024, 1, 1, 20, 30, 15, 123456, tzinfo=SHANGHAI),
+    datetime(2024, 1, 2, 8, 0, 0, tzinfo=timezone.utc),
+)
+
+
+@pytest.fixture(params=["orjson", "json"])
+def encoder(request, monkeypatch):
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(serialization, "orjson", None)
+    return RowEncoder(User.PUBLIC_COLUMNS)
+
+
+def test_aware_datetimes_are_encoded_in_utc(encoder):
+    user = json.loads(encoder.encode([ROW]))[0]
+    assert user["created_at"] == "2024-01-01T12:30:15.123456+00:00"
+    assert user["updated_at"] == "2024-01-02T08:00:00+00:00"
+
+
+def test_row_encoder_matches_to_dict(encoder):
+    legacy = dumps([User(**dict(zip(User.PUBLIC_COLUMNS, ROW))).to_dict()])
+    assert encoder.encode([ROW]) == legacy
+    assert dumps([User.row_to_dict(ROW)]) == legacy
+
+
+def test_naive_datetimes_are_unchanged(encoder):
+    naive = datetime(2024, 1, 1, 12, 0, 0)
+    row = ROW[:5] + (naive, naive)
+    user = json.loads(encoder.encode([row]))[0]
+    assert user["created_at"] == naive.isoformat()
@@ -0,0 +1,24 @@
+"""配置测试
+
+``cli.py run`` 通过环境变量把调试开关传给 Hypercorn worker；
+未设置 DEBUG 时只有 development 环境启用调试模式。
+"""
+import pytest
+
+from config.settings import Settings
+
+
+@pytest.mark.parametrize(
+    "env, debug",
+    [("development", True), ("production", False), ("testing", False)],
+)
+def test_debug_defaults_to_environment(monkeypatch, env, debug):
+    monkeypatch.setenv("ENV", env)
+    monkeypatch.delenv("DEBUG", raising=False)
+    assert Settings().DEBUG is debug
+
+
+def test_debug_environment_variable_overrides_default(monkeypatch):
+    monkeypatch.setenv("ENV", "development")
+    monkeypatch.setenv("DEBUG", "false")
+    assert Settings().DEBUG is False
@@ -0,0 +1,421 @@
+"""用户接口测试
+
+- GET 列表默认使用游标分页，翻页不重复、不遗漏，无效或被篡改的游标返回 400，
+  页码分页的偏移超过 USERS_MAX_OFFSET 时返回 400；
+- PUT 只修改请求中出现的可修改列；字段类型或长度不符合数据库列时返回 400，
+  用户名或邮箱与其他用户冲突时返回 409；
+- 导出为分批读取的流式响应（NDJSON 或 CSV），启用压缩时逐块 gzip；
+- POST /users/batch 按 ID 列表或过滤条件执行，只允许修改 BATCH_UPDATE_COLUMNS，
+  删除后按删除数调整缓存的用户总数。
+"""
+import csv
+import gzip
+import io
+import json
+import uuid
+from datetime import datetime
+
+import pytest
+from sqlalchemy import update
+
+from config.database import AsyncSessionLocal
+from config.settings import settings
+from models.user import User, user_count_cache
+from tests.test_auth import register_and_login
+from utils.auth import invalidate_principal
+from utils.loop import run_sync
+from utils.pagination import encode_cursor
+
+
+async def promote(user_id: int) -> None:
+    async with AsyncSessionLocal() as session:
+        await session.execute(
+            update(User).where(User.id == user_id).values(is_superuser=True)
+        )
+        await session.commit()
+    # 认证缓存中仍是普通用户
+    invalidate_principal(user_id)
+
+
+@pytest.fixture(autouse=True)
+def cheap_hashing(monkeypatch):
+    # 每个测试注册并登录多个用户，降低 pbkdf2 迭代次数
+    monkeypatch.setattr("utils.hashing.PASSWORD_HASH_METHOD", "pbkdf2:sha256:1000")
+
+
+@pytest.fixture
+def admin_headers(client):
+    token = register_and_login(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    user = client.get("/api/v1/auth/me", headers=headers).get_json()
+    run_sync(promote(user["id"]))
+    return headers
+
+
+@pytest.fixture
+def target(client):
+    username = f"target_{uuid.uuid4().hex[:8]}"
+    response = client.post(
+        "/api/v1/auth/register",
+        json={
+            "username": username,
+            "email": f"{username}@users.test",
+            "password": "target-secret",
+        },
+    )
+    assert response.status_code == 201
+    response = client.post(
+        "/api/v1/auth/login", json={"username": username, "password": "target-secret"}
+    )
+    token = response.get_json()["access_token"]
+    me = client.get("/api/v1/auth/me", headers={"Authorization": f"Bearer {token}"})
+    return me.get_json()
+
+
+def test_partial_update_changes_only_given_fields(client, admin_headers, target):
+    response = client.put(
+        f"/api/v1/users/{target['id']}",
+        json={"is_active": False},
+        headers=admin_headers,
+    )
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["is_active"] is False
+    assert body["username"] == target["username"]
+    assert body["email"] == target["email"]
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        {"email": 123},
+        {"username": ["admin"]},
+        {"username": None},
+        {"is_active": "yes"},
+        {"is_superuser": 1},
+        {"username": "x" * 51},
+        {"email": ""},
+    ],
+)
+def test_invalid_field_types_return_400(client, admin_headers, target, payload):
+    response = client.put(
+        f"/api/v1/users/{target['id']}", json=payload, headers=admin_headers
+    )
+    assert response.status_code == 400
+
+
+def test_username_with_at_sign_returns_400(client, admin_headers, target):
+    response = client.put(
+        f"/api/v1/users/{target['id']}",
+        json={"username": target["email"]},
+        headers=admin_headers,
+    )
+    assert response.status_code == 400
+    assert response.get_json()["message"] == "用户名不能包含 @"
+
+
+def test_no_writable_fields_returns_400(client, admin_headers, target):
+    response = client.put(
+        f"/api/v1/users/{target['id']}", json={"id": 1}, headers=admin_headers
+    )
+    assert response.status_code == 400
+    assert response.get_json()["message"] == "没有可更新的字段"
+
+
+def test_duplicate_username_returns_409(client, admin_headers, target):
+    me = client.get("/api/v1/auth/me", headers=admin_headers).get_json()
+    response = client.put(
+        f"/api/v1/users/{target['id']}",
+        json={"username": me["username"]},
+        headers=admin_headers,
+    )
+    assert response.status_code == 409
+    assert response.get_json()["message"] == "用户名已存在"
+
+
+def test_current_user_timestamps_match_user_detail(client, admin_headers, target):
+    # /auth/me 与用户详情使用同一种时间格式（isoformat_utc）
+    response = client.get(f"/api/v1/users/{target['id']}", headers=admin_headers)
+    detail = response.get_json()
+    assert detail["created_at"] == target["created_at"]
+    assert detail["updated_at"] == target["updated_at"]
+
+
+async def create_users(count: int, is_active: bool = True) -> list:
+    async with AsyncSessionLocal() as session:
+        ids = []
+        for _ in range(count):
+            username = f"page_{uuid.uuid4().hex[:8]}"
+            ids.append(
+                await User.create(
+                    session,
+                    username=username,
+                    email=f"{username}@users.test",
+                    hashed_password="x",
+                    is_active=is_active,
+                )
+            )
+        await session.commit()
+    return ids
+
+
+def walk_pages(client, headers, order_by: str, per_page: int = 3) -> list:
+    """沿 next_cursor 翻到最后一页，返回所有用户"""
+    users, cursor = [], None
+    while True:
+        params = {"order_by": order_by, "per_page": per_page}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/api/v1/users", query_string=params, headers=headers)
+        assert response.status_code == 200
+        body = response.get_json()
+        assert len(body["users"]) <= per_page
+        users += body["users"]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return users
+
+
+@pytest.mark.parametrize(
+    "order_by, key, descending",
+    [
+        ("id", "id", False),
+        ("-id", "id", True),
+        ("created_at", "created_at", False),
+        ("-created_at", "created_at", True),
+    ],
+)
+def test_cursor_pages_cover_every_user_once(
+    client, admin_headers, order_by, key, descending
+):
+    run_sync(create_users(7))
+    users = walk_pages(client, admin_headers, order_by)
+    ids = [user["id"] for user in users]
+    assert len(ids) == len(set(ids))
+
+    response = client.get(
+        "/api/v1/users", query_string={"count": "exact"}, headers=admin_headers
+    )
+    assert len(ids) == response.get_json()["total"]
+    values = [(user[key], user["id"]) for user in users]
+    assert values == sorted(values, reverse=descending)
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"cursor": "not-a-cursor"},
+        # 游标与排序方式不一致
+        {"cursor": encode_cursor("id", [1]), "order_by": "-id"},
+        # 排序键个数或取值被篡改
+        {"cursor": encode_cursor("id", [1, 2]), "order_by": "id"},
+        {"cursor": encode_cursor("created_at", ["yesterday", 1])},
+        {"order_by": "username"},
+    ],
+)
+def test_invalid_cursor_returns_400(client, admin_headers, params):
+    response = client.get("/api/v1/users", query_string=params, headers=admin_headers)
+    assert response.status_code == 400
+
+
+def test_page_depth_is_capped(client, admin_headers, monkeypatch):
+    monkeypatch.setattr(settings, "USERS_MAX_OFFSET", 20)
+    params = {"per_page": 10, "page": 3}
+    response = client.get("/api/v1/users", query_string=params, headers=admin_headers)
+    assert response.status_code == 200
+
+    params["page"] = 4
+    response = client.get("/api/v1/users", query_string=params, headers=admin_headers)
+    assert response.status_code == 400
+    assert response.get_json()["message"] == "页码超出范围，请使用 cursor 分页"
+
+
+def batch(client, headers, payload: dict):
+    return client.post("/api/v1/users/batch", json=payload, headers=headers)
+
+
+def get_user(client, headers, user_id: int):
+    return client.get(f"/api/v1/users/{user_id}", headers=headers)
+
+
+def test_batch_operations_by_id(client, admin_headers):
+    active, inactive, removed = run_sync(create_users(3))
+    missing = removed + 100000
+    response = batch(
+        client,
+        admin_headers,
+        {
+            "operations": [
+                {"id": active, "op": "update", "values": {"is_superuser": True}},
+                {"id": inactive, "op": "update", "values": {"is_active": False}},
+                {"id": removed, "op": "delete"},
+                {"id": missing, "op": "delete"},
+            ]
+        },
+    )
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [result["status"] for result in body["results"]] == [
+        "updated",
+        "updated",
+        "deleted",
+        "not_found",
+    ]
+    assert (body["updated"], body["deleted"], body["not_found"]) == (2, 1, 1)
+
+    assert get_user(client, admin_headers, active).get_json()["is_superuser"] is True
+    assert get_user(client, admin_headers, inactive).get_json()["is_active"] is False
+    assert get_user(client, admin_headers, removed).status_code == 404
+
+
+def test_batch_by_filter(client, admin_headers):
+    since = datetime.utcnow().isoformat()
+    ids = run_sync(create_users(3, is_active=False))
+    response = batch(
+        client,
+        admin_headers,
+        {
+            "filter": {"is_active": False, "created_after": since},
+            "op": "update",
+            "values": {"is_active": True},
+        },
+    )
+    assert response.status_code == 200
+    body = response.get_json()
+    assert sorted(result["id"] for result in body["results"]) == ids
+    assert body["updated"] == 3
+    for user_id in ids:
+        assert get_user(client, admin_headers, user_id).get_json()["is_active"]
+
+
+@pytest.mark.parametrize(
+    "values", [{"username": "renamed"}, {"hashed_password": "x"}, {}]
+)
+def test_batch_rejects_columns_outside_whitelist(client, admin_headers, values):
+    (user_id,) = run_sync(create_users(1))
+    response = batch(
+        client,
+        admin_headers,
+        {"operations": [{"id": user_id, "op": "update", "values": values}]},
+    )
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["results"][0]["status"] == "invalid"
+    assert (body["invalid"], body["updated"]) == (1, 0)
+
+    response = batch(
+        client,
+        admin_headers,
+        {"filter": {"created_after": "2000-01-01"}, "op": "update", "values": values},
+    )
+    assert response.status_code == 400
+
+
+def test_batch_rejects_unknown_filter(client, admin_headers):
+    response = batch(
+        client, admin_headers, {"filter": {"email": "a@b.test"}, "op": "delete"}
+    )
+    assert response.status_code == 400
+    assert response.get_json()["message"] == "不支持的过滤条件：email"
+
+
+def test_batch_delete_adjusts_cached_count(client, admin_headers):
+    ids = run_sync(create_users(2))
+    # 刷新计数缓存，使其包含新建的用户
+    user_count_cache.invalidate()
+    response = client.get(
+        "/api/v1/users", query_string={"count": "cached"}, headers=admin_headers
+    )
+    total = response.get_json()["total"]
+    assert user_count_cache.get() == total
+
+    response = batch(
+        client,
+        admin_headers,
+        {"operations": [{"id": user_id, "op": "delete"} for user_id in ids]},
+    )
+    assert response.get_json()["deleted"] == 2
+    # 计数缓存按删除数调整，而不是失效后重新计数
+    assert user_count_cache.get() == total - 2
+
+
+def test_export_stream_is_gzip_compressed(client, admin_headers):
+    run_sync(create_users(3))
+    response = client.get(
+        "/api/v1/users/export",
+        headers={**admin_headers, "Accept-Encoding": "gzip"},
+        buffered=False,
+    )
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Content-Length" not in response.headers
+    body = gzip.decompress(b"".join(response.response)).decode()
+    response.close()
+    users = [json.loads(line) for line in body.splitlines()]
+    assert users and all("hashed_password" not in user for user in users)
+
+
+def export(client, headers, export_format: str):
+    response = client.get(
+        "/api/v1/users/export",
+        query_string={"format": export_format},
+        headers={**headers, "Accept-Encoding": "identity"},
+        buffered=False,
+    )
+    assert response.status_code == 200
+    assert response.is_streamed
+    chunks = [
+        chunk.decode() if isinstance(chunk, bytes) else chunk
+        for chunk in response.response
+    ]
+    response.close()
+    return response, chunks
+
+
+def exact_total(client, headers) -> int:
+    response = client.get(
+        "/api/v1/users", query_string={"count": "exact"}, headers=headers
+    )
+    return response.get_json()["total"]
+
+
+def test_export_ndjson_streams_batches(client, admin_headers, monkeypatch):
+    monkeypatch.setattr(settings, "USERS_EXPORT_BATCH_SIZE", 2)
+    ids = run_sync(create_users(3))
+    response, chunks = export(client, admin_headers, "ndjson")
+    assert response.mimetype == "application/x-ndjson"
+    assert (
+        response.headers["Content-Disposition"]
+        == "attachment; filename=users.ndjson"
+    )
+    # 每批一块，每块最多 USERS_EXPORT_BATCH_SIZE 行
+    assert len(chunks) > 1
+    assert all(chunk.count("\n") <= 2 for chunk in chunks)
+
+    users = [json.loads(line) for line in "".join(chunks).splitlines()]
+    assert len(users) == exact_total(client, admin_headers)
+    assert set(ids) <= {user["id"] for user in users}
+    assert set(users[0]) == set(User.PUBLIC_COLUMNS)
+
+
+def test_export_csv_streams_header_and_rows(client, admin_headers, monkeypatch):
+    monkeypatch.setattr(settings, "USERS_EXPORT_BATCH_SIZE", 2)
+    ids = run_sync(create_users(3))
+    response, chunks = export(client, admin_headers, "csv")
+    assert response.mimetype == "text/csv"
+    assert (
+        response.headers["Content-Disposition"] == "attachment; filename=users.csv"
+    )
+
+    rows = list(csv.reader(io.StringIO("".join(chunks))))
+    assert rows[0] == list(User.PUBLIC_COLUMNS)
+    assert len(rows) - 1 == exact_total(client, admin_headers)
+    assert {str(user_id) for user_id in ids} <= {row[0] for row in rows[1:]}
+
+
+def test_export_rejects_unknown_format(client, admin_headers):
+    response = client.get(
+        "/api/v1/users/export", query_string={"format": "xml"}, headers=admin_headers
+    )
+    assert response.status_code == 400
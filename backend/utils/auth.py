@@ -1,13 +1,97 @@
+import hashlib
+import time
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional
-from jose import JWTError, jwt
-from flask import current_app, jsonify, request, g
-from config.settings import settings
 from functools import wraps
-from flask_login import current_user
+from typing import Any, Dict, Optional
+
+from flask import current_app, g, request
+from jose import JWTError, jwt
 
+from config.database import get_session, pin_primary
+from config.settings import settings
 from models.user import User
-from config.database import AsyncSessionLocal
+from utils.cache import LocalInvalidationChannel, TTLCache
+from utils.loop import async_route
+
+
+@dataclass(frozen=True)
+class Principal:
+    """已认证用户的只读快照
+
+    由 token_required 写入 ``g.user``，可跨请求缓存，不绑定数据库会话。
+    """
+    id: int
+    username: str
+    email: str
+    is_active: bool
+    is_superuser: bool
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        """从用户模型创建快照"""
+        return cls(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            is_active=user.is_active,
+            is_superuser=user.is_superuser,
+            created_at=user.created_at,
+            updated_at=user.updated_at,
+        )
+
+# 已验证令牌缓存：令牌 SHA-256 摘要 -> 声明
+token_cache = TTLCache(maxsize=settings.TOKEN_CACHE_SIZE)
+
+# 认证用户缓存：用户 ID -> Principal
+principal_cache = TTLCache(
+    maxsize=settings.PRINCIPAL_CACHE_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL,
+)
+
+# 用户变更的失效通道，当前为进程内实现，其他 worker 依靠 TTL 过期
+principal_invalidation = LocalInvalidationChannel()
+principal_invalidation.subscribe(principal_cache.pop)
+
+# 最近被修改的用户：在副本可能尚未追上的时间窗内从主库重新加载
+recently_written = TTLCache(
+    maxsize=settings.PRINCIPAL_CACHE_SIZE,
+    ttl=settings.DB_REPLICA_MAX_LAG,
+)
+principal_invalidation.subscribe(lambda user_id: recently_written.set(user_id, True))
+
+def invalidate_principal(user_id: int) -> None:
+    """用户被修改或删除后使其缓存失效
+
+    Args:
+        user_id: 用户 ID
+    """
+    principal_invalidation.publish(user_id)
+
+async def load_principal(user_id: int) -> Optional[Principal]:
+    """加载已认证用户，优先使用缓存
+
+    Args:
+        user_id: 用户 ID
+
+    Returns:
+        Optional[Principal]: 用户快照，用户不存在时返回 None
+    """
+    principal = principal_cache.get(user_id)
+    if principal is None:
+        generation = principal_cache.generation
+        session = get_session()
+        if recently_written.get(user_id):
+            # 避免从副本读到修改前的用户并写回缓存
+            pin_primary(session)
+        user = await User.get_by_id(session, user_id)
+        if user is None:
+            return None
+        principal = Principal.from_user(user)
+        principal_cache.set(user_id, principal, generation=generation)
+    return principal
 
 def create_access_token(user_id: int, expires_delta: Optional[timedelta] = None) -> str:
     """创建访问令牌
@@ -82,6 +166,33 @@ def create_refresh_token(user_id: int, expires_delta: Optional[timedelta] = None
         algorithm=settings.JWT_ALGORITHM
     )
 
+def decode_token(token: str) -> Dict[str, Any]:
+    """解码并验证 JWT 令牌，结果按令牌摘要缓存到 exp
+
+    同一令牌在有效期内重复验证只需一次字典查找；无效令牌不缓存。
+
+    Args:
+        token: JWT 令牌
+
+    Returns:
+        Dict[str, Any]: 已验证的声明
+
+    Raises:
+        JWTError: 令牌无效或已过期
+    """
+    key = hashlib.sha256(token.encode()).digest()
+    payload = token_cache.get(key)
+    if payload is None:
+        payload = jwt.decode(
+            token,
+            settings.SECRET_KEY,
+            algorithms=[settings.JWT_ALGORITHM]
+        )
+        exp = payload.get("exp")
+        if exp is not None:
+            token_cache.set(key, payload, ttl=exp - time.time())
+    return payload
+
 def verify_token(token: str) -> Optional[int]:
     """验证 JWT 令牌
     
@@ -92,53 +203,53 @@ def verify_token(token: str) -> Optional[int]:
         Optional[int]: 用户 ID，如果令牌无效则返回 None
     """
     try:
-        payload = jwt.decode(
-            token,
-            settings.SECRET_KEY,
-            algorithms=[settings.JWT_ALGORITHM]
-        )
+        payload = decode_token(token)
         user_id = int(payload["sub"])
         return user_id
     except (JWTError, ValueError):
         return None
 
 def token_required(f):
-    """JWT 令牌验证装饰器"""
+    """JWT 令牌验证装饰器
+
+    被装饰的视图在共享事件循环中执行，返回同步结果，
+    因此可以直接放在 ``marshal_with`` 之下。
+    """
+    @async_route
     @wraps(f)
     async def decorated_function(*args, **kwargs):
         auth_header = request.headers.get('Authorization')
         if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({
+            return {
                 'error': 'Unauthorized',
                 'message': '缺少认证令牌'
-            }), 401
+            }, 401
             
         token = auth_header.split(' ')[1]
         user_id = verify_token(token)
         if not user_id:
-            return jsonify({
+            return {
                 'error': 'Unauthorized',
                 'message': '无效的认证令牌'
-            }), 401
+            }, 401
             
-        # 获取用户
-        async with AsyncSessionLocal() as session:
-            user = await User.get_by_id(session, user_id)
-            if not user:
-                return jsonify({
-                    'error': 'Unauthorized',
-                    'message': '用户不存在'
-                }), 401
-                
-            if not user.is_active:
-                return jsonify({
-                    'error': 'Forbidden',
-                    'message': '用户账户未激活'
-                }), 403
-                
-            # 将用户对象存储在 g 对象中，以便视图函数访问
-            g.user = user
-            return await f(*args, **kwargs)
+        # 获取用户（优先命中缓存，视图可直接复用 g.user）
+        user = await load_principal(user_id)
+        if not user:
+            return {
+                'error': 'Unauthorized',
+                'message': '用户不存在'
+            }, 401
+
+        if not user.is_active:
+            return {
+                'error': 'Forbidden',
+                'message': '用户账户未激活'
+            }, 403
+
+        # 将用户对象存储在 g 对象中，以便视图函数访问
+        g.user = user
+        return await f(*args, **kwargs)
         
     return decorated_function
 
@@ -146,17 +257,20 @@ def admin_required(f):
     """管理员权限装饰器"""
     @wraps(f)
     async def decorated_function(*args, **kwargs):
-        if not current_user.is_authenticated:
-            return jsonify({
+        # 依赖 token_required 写入的 g.user；flask_login 的 current_user
+        # 会在事件循环线程中触发同步的 user_loader
+        user = g.get('user')
+        if user is None:
+            return {
                 'error': 'Unauthorized',
                 'message': '请先登录'
-            }), 401
+            }, 401
             
-        if not current_user.is_superuser:
-            return jsonify({
+        if not user.is_superuser:
+            return {
                 'error': 'Permission denied',
                 'message': '需要管理员权限'
-            }), 403
+            }, 403
             
         return await f(*args, **kwargs)
     return decorated_function 
\ No newline at end of file
@@ -0,0 +1,207 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+class TTLCache:
+    """线程安全的 TTL + LRU 缓存
+
+    条目数不超过 ``maxsize``，超出时淘汰最久未使用的条目；
+    每个条目在各自的过期时间之后视为不存在。
+    ``maxsize`` 为 0 时缓存关闭，所有读取都未命中。
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        # 键 -> (值, 过期时间)，按最近使用顺序排列
+        self._data: "OrderedDict[Hashable, Tuple[Any, Optional[float]]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+        # 每次删除或清空时递增，用于丢弃失效前读取到的旧值
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """读取缓存
+
+        Args:
+            key: 缓存键
+            default: 未命中时的返回值
+
+        Returns:
+            缓存值，未命中或已过期时返回 default
+        """
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            value, expires_at = item
+            if expires_at is not None and expires_at <= self._clock():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(
+        self,
+        key: Hashable,
+        value: Any,
+        ttl: Optional[float] = None,
+        generation: Optional[int] = None,
+    ) -> None:
+        """写入缓存
+
+        Args:
+            key: 缓存键
+            value: 缓存值
+            ttl: 该条目的存活时间（秒），默认使用缓存的 ttl
+            generation: 读取数据前记录的 ``generation``；期间发生过失效时放弃写入
+        """
+        if self.maxsize <= 0:
+            return
+        ttl = self.ttl if ttl is None else ttl
+        if ttl is not None and ttl <= 0:
+            return
+        expires_at = self._clock() + ttl if ttl is not None else None
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable) -> None:
+        """删除缓存条目"""
+        with self._lock:
+            self.generation += 1
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self.generation += 1
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        """获取缓存统计
+
+        Returns:
+            Dict[str, Any]: 条目数、容量及命中、未命中、淘汰和过期次数
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class CachedCounter:
+    """带 TTL 的计数缓存
+
+    保存一个定期从数据源刷新的计数，写操作可以通过 ``adjust`` 增量维护，
+    过期后 ``get`` 返回 None，由调用方重新计算并 ``set``。
+    """
+
+    def __init__(self, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self._clock = clock
+        self._value: Optional[int] = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+        # 每次 adjust 或 invalidate 时递增，用于丢弃刷新期间过时的结果
+        self.generation = 0
+
+    def get(self) -> Optional[int]:
+        """获取计数，未缓存或已过期时返回 None"""
+        with self._lock:
+            if self._value is None or self._expires_at <= self._clock():
+                return None
+            return self._value
+
+    def set(self, value: int, generation: Optional[int] = None) -> None:
+        """写入重新计算的计数
+
+        Args:
+            value: 计数
+            generation: 开始计算前记录的 ``generation``；期间有变更时放弃写入
+        """
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._value = value
+            self._expires_at = self._clock() + self.ttl
+
+    def adjust(self, delta: int) -> None:
+        """按写操作增减计数"""
+        with self._lock:
+            self.generation += 1
+            if self._value is not None:
+                self._value = max(self._value + delta, 0)
+
+    def invalidate(self) -> None:
+        """丢弃缓存的计数"""
+        with self._lock:
+            self.generation += 1
+            self._value = None
+
+
+class InvalidationChannel(ABC):
+    """缓存失效通知通道
+
+    写操作通过 ``publish`` 广播失效的键，订阅者收到后删除本地缓存条目。
+    跨 worker 的实现（如 Redis pub/sub、PostgreSQL LISTEN/NOTIFY）
+    只需继承本类并在收到远端消息时调用 ``_deliver``。
+    """
+
+    def __init__(self):
+        self._subscribers: List[Callable[[Hashable], Any]] = []
+
+    def subscribe(self, callback: Callable[[Hashable], Any]) -> None:
+        """订阅失效通知"""
+        self._subscribers.append(callback)
+
+    @abstractmethod
+    def publish(self, key: Hashable) -> None:
+        """广播失效的键"""
+
+    def _deliver(self, key: Hashable) -> None:
+        for callback in self._subscribers:
+            callback(key)
+
+
+class LocalInvalidationChannel(InvalidationChannel):
+    """进程内失效通道，仅通知当前 worker 的订阅者
+
+    其他 worker 的缓存依靠 TTL 过期。
+    """
+
+    def publish(self, key: Hashable) -> None:
+        self._deliver(key)
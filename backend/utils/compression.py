@@ -0,0 +1,157 @@
+import zlib
+from typing import Iterable, Iterator, Optional
+
+from flask import Flask, Response, request
+
+try:
+    import brotli
+except ImportError:  # brotli 为可选依赖，未安装时只使用 gzip
+    brotli = None
+
+# 本身已压缩、再压缩没有收益的内容类型
+SKIP_MIMETYPE_PREFIXES = ("image/", "video/", "audio/", "font/woff")
+SKIP_MIMETYPES = {
+    "application/zip",
+    "application/gzip",
+    "application/x-gzip",
+    "application/x-bzip2",
+    "application/x-xz",
+    "application/x-7z-compressed",
+    "application/x-rar-compressed",
+    "application/pdf",
+    "application/octet-stream",
+}
+# 例外：SVG 是文本
+COMPRESSIBLE_MIMETYPES = {"image/svg+xml"}
+
+
+def is_compressible(mimetype: str) -> bool:
+    """内容类型是否值得压缩"""
+    if mimetype in COMPRESSIBLE_MIMETYPES:
+        return True
+    if mimetype in SKIP_MIMETYPES:
+        return False
+    return not mimetype.startswith(SKIP_MIMETYPE_PREFIXES)
+
+
+class GzipStream:
+    """增量 gzip 压缩"""
+
+    def __init__(self, level: int):
+        # wbits=31：带 gzip 头和尾
+        self._obj = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, flush: bool = False) -> bytes:
+        """压缩一段数据，flush 为真时立即输出已压缩的全部内容"""
+        out = self._obj.compress(data)
+        return out + self._obj.flush(zlib.Z_SYNC_FLUSH) if flush else out
+
+    def finish(self) -> bytes:
+        return self._obj.flush(zlib.Z_FINISH)
+
+
+class BrotliStream:
+    """增量 brotli 压缩"""
+
+    def __init__(self, quality: int):
+        self._obj = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes, flush: bool = False) -> bytes:
+        """压缩一段数据，flush 为真时立即输出已压缩的全部内容"""
+        out = self._obj.process(data)
+        return out + self._obj.flush() if flush else out
+
+    def finish(self) -> bytes:
+        return self._obj.finish()
+
+
+class Compressor:
+    """响应压缩
+
+    按 ``Accept-Encoding`` 协商 brotli（已安装时）或 gzip，只压缩超过
+    ``COMPRESSION_MIN_SIZE`` 字节的响应；流式响应逐块压缩并在每块后 flush，
+    不会把整个响应体缓冲在内存中。已设置 Content-Encoding、本身已压缩的内容类型、
+    304/204 以及 HEAD 请求不压缩。
+
+    压缩后的表示与原始表示字节不同，强 ETag 会被改为弱 ETag
+    （条件请求按弱比较判断，不受影响）。
+    """
+
+    def __init__(self, app: Optional[Flask] = None):
+        self.enabled = True
+        self.min_size = 1024
+        self.gzip_level = 6
+        self.brotli_quality = 4
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        """从应用配置读取参数并注册 after_request 钩子"""
+        self.enabled = app.config.get("COMPRESSION_ENABLED", self.enabled)
+        self.min_size = app.config.get("COMPRESSION_MIN_SIZE", self.min_size)
+        self.gzip_level = app.config.get("COMPRESSION_GZIP_LEVEL", self.gzip_level)
+        self.brotli_quality = app.config.get(
+            "COMPRESSION_BROTLI_QUALITY", self.brotli_quality
+        )
+        if self.enabled:
+            app.after_request(self.after_request)
+
+    def encodings(self) -> list:
+        """服务端支持的编码，按优先顺序排列"""
+        return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+    def open_stream(self, encoding: str):
+        """创建指定编码的增量压缩器"""
+        if encoding == "br":
+            return BrotliStream(self.brotli_quality)
+        return GzipStream(self.gzip_level)
+
+    def should_compress(self, response: Response) -> bool:
+        if request.method == "HEAD" or response.direct_passthrough:
+            return False
+        if response.status_code < 200 or response.status_code in (204, 206, 304):
+            return False
+        if "Content-Encoding" in response.headers:
+            return False
+        if not is_compressible(response.mimetype or ""):
+            return False
+        length = response.content_length
+        return length is None or length >= self.min_size
+
+    def after_request(self, response: Response) -> Response:
+        if not self.should_compress(response):
+            return response
+        response.vary.add("Accept-Encoding")
+        encoding = request.accept_encodings.best_match(self.encodings())
+        if encoding is None:
+            return response
+
+        stream = self.open_stream(encoding)
+        if response.is_streamed:
+            response.response = self._iter_compressed(response.response, stream)
+            response.headers.pop("Content-Length", None)
+        else:
+            response.set_data(stream.compress(response.get_data()) + stream.finish())
+        response.headers["Content-Encoding"] = encoding
+
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+    @staticmethod
+    def _iter_compressed(chunks: Iterable, stream) -> Iterator[bytes]:
+        try:
+            for chunk in chunks:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode("utf-8")
+                if chunk:
+                    out = stream.compress(chunk, flush=True)
+                    if out:
+                        yield out
+            yield stream.finish()
+        finally:
+            # 客户端中途断开时也要关闭原始迭代器（如释放导出使用的数据库游标）
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()
@@ -0,0 +1,75 @@
+import hashlib
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from flask import Response, request
+from werkzeug.http import http_date, quote_etag
+
+# 需要认证的资源：允许客户端缓存，但每次使用前都要重新验证
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts: Any) -> str:
+    """由资源版本信息生成强 ETag（未加引号）
+
+    Args:
+        parts: 能唯一确定响应内容的值，如用户 ID 和 updated_at
+
+    Returns:
+        str: ETag 值
+    """
+    raw = "|".join(
+        part.isoformat() if isinstance(part, datetime) else str(part)
+        for part in parts
+    )
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def _http_datetime(value: datetime) -> datetime:
+    """转换为 HTTP 日期的精度：UTC，截断到整秒
+
+    数据库中的 updated_at 带微秒，而 Last-Modified / If-Modified-Since
+    只精确到秒。比较和输出都使用截断后的值，否则客户端原样回传的
+    If-Modified-Since 总是早于带微秒的 updated_at，条件请求永远不会命中。
+    数据库返回的无时区时间按 UTC 处理。
+    """
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).replace(microsecond=0)
+
+
+def is_not_modified(etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """判断当前请求的条件头是否表明客户端缓存仍然有效
+
+    If-None-Match 存在时只按 ETag 弱比较（压缩后的响应带弱 ETag），
+    否则比较 If-Modified-Since。
+
+    Args:
+        etag: 资源当前的 ETag
+        last_modified: 资源最后修改时间
+
+    Returns:
+        bool: 应返回 304 时为 True
+    """
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified is not None:
+        # 两边都是整秒的 UTC 时间
+        since = _http_datetime(request.if_modified_since)
+        return _http_datetime(last_modified) <= since
+    return False
+
+
+def validator_headers(
+    etag: str, last_modified: Optional[datetime] = None
+) -> Dict[str, str]:
+    """生成 ETag、Last-Modified 和 Cache-Control 响应头"""
+    headers = {"ETag": quote_etag(etag), "Cache-Control": CACHE_CONTROL}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(_http_datetime(last_modified))
+    return headers
+
+
+def not_modified(etag: str, last_modified: Optional[datetime] = None) -> Response:
+    """304 响应（不含响应体）"""
+    return Response(status=304, headers=validator_headers(etag, last_modified))
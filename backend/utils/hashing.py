@@ -0,0 +1,140 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+from typing import Callable, Optional, TypeVar
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from config.settings import settings
+
+T = TypeVar("T")
+
+# 密码哈希算法
+PASSWORD_HASH_METHOD = "pbkdf2:sha256"
+
+
+class HashingQueueFullError(RuntimeError):
+    """哈希任务队列已满"""
+
+
+def hash_password_sync(password: str) -> str:
+    """同步计算密码哈希（在进程池子进程中执行）"""
+    return generate_password_hash(password, method=PASSWORD_HASH_METHOD)
+
+
+def verify_password_sync(hashed_password: str, password: str) -> bool:
+    """同步验证密码（在进程池子进程中执行）"""
+    return check_password_hash(hashed_password, password)
+
+
+class HashingExecutor:
+    """密码哈希进程池
+
+    pbkdf2 计算会长时间占用 GIL，放在独立进程中执行，
+    避免阻塞共享事件循环和其他请求。等待中的任务数达到 ``max_pending``
+    时立即抛出 ``HashingQueueFullError``，而不是继续排队。
+    ``workers`` 为 0 时在当前线程中直接计算（用于脚本和调试）。
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.rejected = 0
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None or self._pid != os.getpid():
+                # 使用 spawn，避免 fork 带有事件循环线程的 worker 进程
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=get_context("spawn"),
+                )
+                self._pid = os.getpid()
+            return self._pool
+
+    def _reset_pool(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def _submit(self, func: Callable[..., T], *args) -> T:
+        if self.workers <= 0:
+            return func(*args)
+
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise HashingQueueFullError("密码哈希任务队列已满")
+            self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_pool(), func, *args)
+        except BrokenProcessPool:
+            self._reset_pool()
+            raise
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        """计算密码哈希
+
+        Args:
+            password: 明文密码
+
+        Returns:
+            str: 密码哈希
+
+        Raises:
+            HashingQueueFullError: 等待中的任务过多
+        """
+        return await self._submit(hash_password_sync, password)
+
+    async def verify(self, hashed_password: str, password: str) -> bool:
+        """验证密码
+
+        Args:
+            hashed_password: 密码哈希
+            password: 待验证的明文密码
+
+        Returns:
+            bool: 密码是否匹配
+
+        Raises:
+            HashingQueueFullError: 等待中的任务过多
+        """
+        return await self._submit(verify_password_sync, hashed_password, password)
+
+    def shutdown(self) -> None:
+        """关闭进程池"""
+        self._reset_pool()
+
+
+def default_workers() -> int:
+    """默认的哈希进程数：CPU 核数平分给各个 Hypercorn worker
+
+    每个 worker 各有一个进程池，按核数创建会得到“核数 × worker 数”个哈希进程。
+    worker 数取自 ``WEB_CONCURRENCY``（``cli.py run`` 启动 Hypercorn 时设置），
+    未设置时视为单 worker。
+    """
+    web_concurrency = int(os.environ.get("WEB_CONCURRENCY") or 1)
+    return max((os.cpu_count() or 1) // max(web_concurrency, 1), 1)
+
+
+# 每个进程共享的哈希执行器
+hashing_executor = HashingExecutor(
+    workers=(
+        default_workers()
+        if settings.PASSWORD_HASH_WORKERS is None
+        else settings.PASSWORD_HASH_WORKERS
+    ),
+    max_pending=settings.PASSWORD_HASH_QUEUE_SIZE,
+)
@@ -0,0 +1,164 @@
+import asyncio
+import atexit
+import os
+import threading
+from concurrent.futures import Future
+from functools import wraps
+from typing import Any, Awaitable, Callable, Coroutine, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class LoopRunner:
+    """后台事件循环运行器
+
+    每个 worker 进程持有一个长期存活的事件循环，运行在独立的守护线程中。
+    同步的 Flask 视图通过 ``run`` 把协程线程安全地提交到该循环并等待结果，
+    绑定在循环上的数据库连接池因此可以在请求之间复用。
+
+    提交时会复制调用线程的 contextvars，协程内可以照常访问
+    ``request``、``g`` 和 ``current_app``。
+    """
+
+    def __init__(self, name: str = "loop-runner"):
+        self._name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self._shutdown_callbacks: List[Callable[[], Awaitable[Any]]] = []
+
+    def _is_running(self) -> bool:
+        return (
+            self._loop is not None
+            and self._pid == os.getpid()
+            and self._thread is not None
+            and self._thread.is_alive()
+        )
+
+    def _start(self) -> None:
+        loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def _run() -> None:
+            asyncio.set_event_loop(loop)
+            loop.call_soon(ready.set)
+            try:
+                loop.run_forever()
+            finally:
+                loop.run_until_complete(loop.shutdown_asyncgens())
+                loop.close()
+
+        thread = threading.Thread(target=_run, name=self._name, daemon=True)
+        thread.start()
+        ready.wait()
+
+        self._loop = loop
+        self._thread = thread
+        self._pid = os.getpid()
+
+    def _ensure_running(self) -> None:
+        """首次使用（或 fork 之后）时启动事件循环线程"""
+        if not self._is_running():
+            with self._lock:
+                if not self._is_running():
+                    self._start()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """获取当前进程的事件循环，首次访问（或 fork 之后）时启动"""
+        self._ensure_running()
+        return self._loop
+
+    def thread_ident(self) -> int:
+        """事件循环线程的标识（首次访问时启动循环）"""
+        self._ensure_running()
+        return self._thread.ident
+
+    def in_loop_thread(self) -> bool:
+        """当前线程是否为事件循环线程"""
+        return self._is_running() and threading.current_thread() is self._thread
+
+    def submit(self, coro: Coroutine[Any, Any, T]) -> Future:
+        """线程安全地提交协程
+
+        Args:
+            coro: 待执行的协程
+
+        Returns:
+            Future: 可在任意线程等待的结果
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Coroutine[Any, Any, T], timeout: Optional[float] = None) -> T:
+        """在后台事件循环中执行协程并阻塞等待结果
+
+        Args:
+            coro: 待执行的协程
+            timeout: 等待超时时间（秒），None 表示一直等待
+
+        Returns:
+            协程的返回值
+
+        Raises:
+            RuntimeError: 在事件循环线程内调用（会导致死锁）
+        """
+        if self.in_loop_thread():
+            coro.close()
+            raise RuntimeError("不能在事件循环线程中同步等待协程，请直接使用 await")
+        return self.submit(coro).result(timeout)
+
+    def on_shutdown(self, callback: Callable[[], Awaitable[Any]]) -> None:
+        """注册停止前在事件循环中执行的清理回调（如释放连接池）"""
+        self._shutdown_callbacks.append(callback)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """执行清理回调并停止事件循环"""
+        with self._lock:
+            if not self._is_running():
+                return
+
+            async def _cleanup() -> None:
+                for callback in self._shutdown_callbacks:
+                    try:
+                        await callback()
+                    except Exception:
+                        pass
+
+            try:
+                asyncio.run_coroutine_threadsafe(_cleanup(), self._loop).result(timeout)
+            finally:
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._thread.join(timeout)
+                self._loop = None
+                self._thread = None
+                self._pid = None
+
+
+# 每个进程共享的运行器
+runner = LoopRunner()
+atexit.register(runner.stop)
+
+
+def run_sync(coro: Coroutine[Any, Any, T], timeout: Optional[float] = None) -> T:
+    """在共享事件循环中执行协程并返回结果
+
+    Args:
+        coro: 待执行的协程
+        timeout: 等待超时时间（秒）
+
+    Returns:
+        协程的返回值
+    """
+    return runner.run(coro, timeout)
+
+
+def async_route(f: Callable[..., Coroutine[Any, Any, T]]) -> Callable[..., T]:
+    """异步路由装饰器
+
+    把 ``async def`` 视图包装成同步函数，交给共享事件循环执行。
+    """
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        return run_sync(f(*args, **kwargs))
+    return wrapper
@@ -0,0 +1,464 @@
+import asyncio
+import json
+import math
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from flask import Flask, Response, request
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from config.settings import settings
+from utils.loop import runner
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 请求耗时（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# 单个请求执行的语句数
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+# 单个请求的数据库耗时和连接池等待时间（秒）
+DB_TIME_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0
+)
+
+
+class Metric:
+    """带标签的指标
+
+    样本按标签值元组保存在进程内；``snapshot`` 导出可以 JSON 序列化的快照，
+    多个进程的快照由 ``merge`` 合并。
+    """
+
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Sequence[Any]) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} 需要标签 {self.labelnames}")
+        return tuple(str(label) for label in labels)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            samples = [[list(key), value] for key, value in self._values.items()]
+        return {
+            "type": self.type,
+            "help": self.documentation,
+            "labelnames": list(self.labelnames),
+            "samples": samples,
+        }
+
+
+class Counter(Metric):
+    """只增不减的计数"""
+
+    type = "counter"
+
+    def inc(self, *labels: Any, amount: float = 1.0) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(Metric):
+    """可增可减的瞬时值（多进程合并时只累加仍在运行的进程）"""
+
+    type = "gauge"
+
+    def inc(self, *labels: Any, amount: float = 1.0) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, *labels: Any, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels: Any, value: float) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Metric):
+    """分桶统计
+
+    每组标签保存各桶（不累积）的计数，最后两项为总和与次数，
+    输出时再转换为 Prometheus 的累积桶。
+    """
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: Any) -> None:
+        key = self._key(labels)
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                # 各桶 + (+Inf 桶) + 总和 + 次数
+                counts = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            counts[index] += 1
+            counts[-2] += value
+            counts[-1] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            samples = [[list(key), list(value)] for key, value in self._values.items()]
+        data = super().snapshot()
+        data["samples"] = samples
+        data["buckets"] = list(self.buckets)
+        return data
+
+
+class MetricsRegistry:
+    """指标注册表
+
+    单进程时直接导出当前进程的指标。设置了 ``directory`` 时，每个 worker
+    每隔 ``flush_interval`` 秒把快照写入 ``<directory>/metrics-<pid>.json``，
+    抓取时由处理请求的 worker 合并所有进程的快照：计数和分桶统计累加
+    （已退出进程的数据保留），瞬时值只累加仍在运行的进程。
+    """
+
+    def __init__(self, directory: Optional[str] = None, flush_interval: float = 1.0):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._metrics: Dict[str, Metric] = {}
+        self._flusher_pid: Optional[int] = None
+        self._flusher_future = None
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"指标已注册：{metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def snapshot(self) -> Dict[str, Any]:
+        """当前进程所有指标的快照"""
+        return {name: metric.snapshot() for name, metric in list(self._metrics.items())}
+
+    def _path(self, pid: int) -> str:
+        return os.path.join(self.directory, f"metrics-{pid}.json")
+
+    def write(self) -> None:
+        """把当前进程的快照写入共享目录（先写临时文件再替换，读取方不会读到半个文件）"""
+        if not self.directory:
+            return
+        path = self._path(os.getpid())
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp, path)
+
+    def ensure_flusher(self) -> None:
+        """在当前进程的事件循环上启动定期写入快照的任务（fork 之后重新启动）"""
+        if not self.directory or self._flusher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher_pid != os.getpid():
+                os.makedirs(self.directory, exist_ok=True)
+                self._flusher_pid = os.getpid()
+                self._flusher_future = runner.submit(self._flush_loop())
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await asyncio.to_thread(self.write)
+
+    async def stop(self) -> None:
+        """停止写入任务，并写入最后一次快照"""
+        if self._flusher_future is not None:
+            self._flusher_future.cancel()
+            self._flusher_future = None
+            self._flusher_pid = None
+            await asyncio.to_thread(self.write)
+
+    def collect(self) -> Dict[str, Any]:
+        """合并所有进程的快照（未设置共享目录时只有当前进程）"""
+        snapshots = [self.snapshot()]
+        if self.directory and os.path.isdir(self.directory):
+            own = os.getpid()
+            for filename in os.listdir(self.directory):
+                if not (filename.startswith("metrics-") and filename.endswith(".json")):
+                    continue
+                try:
+                    pid = int(filename[len("metrics-"):-len(".json")])
+                except ValueError:
+                    continue
+                if pid == own:
+                    continue
+                try:
+                    with open(os.path.join(self.directory, filename)) as f:
+                        data = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                if not _pid_alive(pid):
+                    data = {
+                        name: metric
+                        for name, metric in data.items()
+                        if metric["type"] != "gauge"
+                    }
+                snapshots.append(data)
+        return merge(snapshots)
+
+    def render(self) -> str:
+        """Prometheus 文本格式"""
+        return render(self.collect())
+
+    def clear_directory(self) -> None:
+        """删除共享目录中上次运行留下的快照（在启动 worker 之前调用）"""
+        if not self.directory or not os.path.isdir(self.directory):
+            return
+        for filename in os.listdir(self.directory):
+            if filename.startswith("metrics-"):
+                os.remove(os.path.join(self.directory, filename))
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def merge(snapshots: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """合并多个进程的快照，同名同标签的样本逐项相加"""
+    merged: Dict[str, Any] = {}
+    for snapshot in snapshots:
+        for name, metric in snapshot.items():
+            target = merged.setdefault(name, {**metric, "samples": {}})
+            samples = target["samples"]
+            for labels, value in metric["samples"]:
+                key = tuple(labels)
+                current = samples.get(key)
+                if current is None:
+                    samples[key] = list(value) if isinstance(value, list) else value
+                elif isinstance(value, list):
+                    samples[key] = [a + b for a, b in zip(current, value)]
+                else:
+                    samples[key] = current + value
+    return merged
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(
+    names: Sequence[str],
+    values: Sequence[str],
+    extra: Optional[Tuple[str, str]] = None,
+) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if isinstance(value, float) and not value.is_integer():
+        return repr(float(value))
+    return str(int(value))
+
+
+def render(metrics: Dict[str, Any]) -> str:
+    """把合并后的快照输出为 Prometheus 文本格式"""
+    lines: List[str] = []
+    for name, metric in sorted(metrics.items()):
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        names = metric["labelnames"]
+        for key, value in sorted(metric["samples"].items()):
+            if metric["type"] == "histogram":
+                cumulative = 0
+                bounds = list(metric["buckets"]) + [math.inf]
+                for bound, count in zip(bounds, value[:-2]):
+                    cumulative += count
+                    labels = _labels(names, key, ("le", _number(bound)))
+                    lines.append(f"{name}_bucket{labels} {cumulative}")
+                lines.append(f"{name}_sum{_labels(names, key)} {_number(value[-2])}")
+                lines.append(f"{name}_count{_labels(names, key)} {_number(value[-1])}")
+            else:
+                lines.append(f"{name}{_labels(names, key)} {_number(value)}")
+    return "\n".join(lines) + "\n"
+
+
+class RequestStats:
+    """当前请求执行的数据库语句数和耗时"""
+
+    __slots__ = ("statements", "db_time")
+
+    def __init__(self):
+        self.statements = 0
+        self.db_time = 0.0
+
+
+# 请求开始时设置；事件循环中的协程和 SQLAlchemy 的 greenlet 继承调用方的 contextvars
+current_request_stats: ContextVar[Optional[RequestStats]] = ContextVar(
+    "current_request_stats", default=None
+)
+
+registry = MetricsRegistry(
+    settings.METRICS_MULTIPROC_DIR, settings.METRICS_FLUSH_INTERVAL
+)
+
+http_requests_total = registry.counter(
+    "http_requests_total", "HTTP 请求数", ("method", "route", "status")
+)
+http_request_duration_seconds = registry.histogram(
+    "http_request_duration_seconds", "HTTP 请求处理耗时（秒）", ("method", "route")
+)
+http_requests_in_flight = registry.gauge(
+    "http_requests_in_flight", "正在处理的 HTTP 请求数", ("method", "route")
+)
+http_request_db_statements = registry.histogram(
+    "http_request_db_statements",
+    "单个请求执行的 SQL 语句数",
+    ("method", "route"),
+    STATEMENT_BUCKETS,
+)
+http_request_db_seconds = registry.histogram(
+    "http_request_db_seconds",
+    "单个请求的 SQL 执行耗时（秒）",
+    ("method", "route"),
+    DB_TIME_BUCKETS,
+)
+db_statements_total = registry.counter(
+    "db_statements_total", "执行的 SQL 语句数", ("engine",)
+)
+db_statement_seconds_total = registry.counter(
+    "db_statement_seconds_total", "SQL 执行总耗时（秒）", ("engine",)
+)
+db_pool_wait_seconds = registry.histogram(
+    "db_pool_wait_seconds",
+    "从连接池获取连接的等待时间（秒）",
+    ("engine",),
+    DB_TIME_BUCKETS,
+)
+
+
+def _route() -> str:
+    # 使用路由模板而不是实际路径，避免用户 ID 等造成标签基数膨胀
+    return request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+
+
+def instrument_engine(engine: AsyncEngine, name: str) -> None:
+    """统计引擎执行的语句数和耗时，并计入当前请求"""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(
+        conn, cursor, statement, parameters, context, executemany
+    ):
+        conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["metrics_query_start"].pop()
+        db_statements_total.inc(name)
+        db_statement_seconds_total.inc(name, amount=elapsed)
+        stats = current_request_stats.get()
+        if stats is not None:
+            stats.statements += 1
+            stats.db_time += elapsed
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(context):
+        # 执行失败时不会触发 after_cursor_execute，丢弃对应的开始时间
+        if context.connection is None:
+            return
+        starts = context.connection.info.get("metrics_query_start")
+        if starts:
+            starts.pop()
+
+
+def init_metrics(app: Flask) -> None:
+    """注册请求钩子和 ``/metrics`` 端点
+
+    应在其他 after_request 钩子之前调用，这样记录的耗时包含压缩等后续处理。
+    流式响应只计到视图返回为止，不含发送响应体的时间。
+    """
+
+    @app.before_request
+    def start_request_metrics():
+        registry.ensure_flusher()
+        labels = (request.method, _route())
+        request.environ["metrics.start"] = (time.perf_counter(), labels)
+        current_request_stats.set(RequestStats())
+        http_requests_in_flight.inc(*labels)
+
+    @app.after_request
+    def record_request_metrics(response):
+        started = request.environ.get("metrics.start")
+        if started is None:
+            return response
+        start, labels = started
+        http_requests_total.inc(*labels, response.status_code)
+        http_request_duration_seconds.observe(time.perf_counter() - start, *labels)
+        stats = current_request_stats.get()
+        if stats is not None:
+            http_request_db_statements.observe(stats.statements, *labels)
+            http_request_db_seconds.observe(stats.db_time, *labels)
+        return response
+
+    @app.teardown_request
+    def finish_request_metrics(exception=None):
+        started = request.environ.pop("metrics.start", None)
+        if started is None:
+            return
+        http_requests_in_flight.dec(*started[1])
+        current_request_stats.set(None)
+
+    @app.route("/metrics")
+    def metrics():
+        """Prometheus 抓取端点"""
+        return Response(registry.render(), content_type=CONTENT_TYPE)
+
+
+runner.on_shutdown(registry.stop)
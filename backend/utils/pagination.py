@@ -0,0 +1,43 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Sequence, Tuple
+
+
+def encode_cursor(order_by: str, values: Sequence[Any]) -> str:
+    """编码键集分页游标
+
+    Args:
+        order_by: 排序方式
+        values: 上一页最后一行的排序键值
+
+    Returns:
+        str: URL 安全的不透明游标
+    """
+    payload = json.dumps(
+        [order_by, [v.isoformat() if isinstance(v, datetime) else v for v in values]],
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(payload.encode()).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[str, List[Any]]:
+    """解码键集分页游标
+
+    Args:
+        cursor: encode_cursor 生成的游标
+
+    Returns:
+        Tuple[str, List[Any]]: 排序方式和排序键值（日期为 ISO 字符串）
+
+    Raises:
+        ValueError: 游标格式无效
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        order_by, values = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError("无效的分页游标") from e
+    if not isinstance(order_by, str) or not isinstance(values, list):
+        raise ValueError("无效的分页游标")
+    return order_by, values
@@ -0,0 +1,258 @@
+import cProfile
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from flask import Flask, request
+
+from utils.auth import admin_required, token_required
+from utils.loop import runner
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_QUERY_PARAM = "_profile"
+FORMATS = {"pstats": ".prof", "collapsed": ".folded"}
+# 捕获文件名：时间戳-方法-路径-耗时，只允许这些字符，下载时据此校验
+CAPTURE_NAME = re.compile(r"^[\w.-]+\.(prof|folded)$")
+
+
+@token_required
+@admin_required
+async def _authorize() -> bool:
+    # 复用 token_required + admin_required：超级用户返回 True，否则返回错误响应
+    return True
+
+
+class CProfileSession:
+    """cProfile 捕获
+
+    Python 3.12 起 cProfile 基于 ``sys.monitoring``，一个分析器覆盖所有线程；
+    更早的版本只分析启用它的线程，因此另外在事件循环线程中启用一个分析器。
+    两种情况下，事件循环同时处理的其他请求的调用也会计入。
+    """
+
+    extension = FORMATS["pstats"]
+
+    def __init__(self):
+        self._profilers: List[cProfile.Profile] = [cProfile.Profile()]
+        self._loop_profiler: Optional[cProfile.Profile] = None
+
+    def start(self) -> None:
+        self._profilers[0].enable()
+        if sys.version_info < (3, 12):
+            self._loop_profiler = cProfile.Profile()
+            self._profilers.append(self._loop_profiler)
+            runner.loop.call_soon_threadsafe(self._loop_profiler.enable)
+
+    def stop(self) -> None:
+        self._profilers[0].disable()
+        if self._loop_profiler is not None:
+            done = threading.Event()
+
+            def _disable() -> None:
+                self._loop_profiler.disable()
+                done.set()
+
+            runner.loop.call_soon_threadsafe(_disable)
+            done.wait(5.0)
+
+    def write(self, path: str) -> None:
+        stats = pstats.Stats(self._profilers[0])
+        for profiler in self._profilers[1:]:
+            stats.add(profiler)
+        stats.dump_stats(path)
+
+
+class StackSampler:
+    """采样调用栈，输出火焰图工具（flamegraph.pl、speedscope）可读的折叠栈格式
+
+    后台线程每隔 ``interval`` 秒记录一次请求线程和事件循环线程的调用栈。
+    """
+
+    extension = FORMATS["collapsed"]
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._threads: Dict[int, str] = {}
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._threads = {
+            threading.get_ident(): "request",
+            runner.thread_ident(): "loop",
+        }
+        self._thread = threading.Thread(
+            target=self._run, name="stack-sampler", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            frames = sys._current_frames()
+            for ident, label in self._threads.items():
+                frame = frames.get(ident)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    filename = os.path.basename(code.co_filename)
+                    stack.append(f"{code.co_name} ({filename}:{frame.f_lineno})")
+                    frame = frame.f_back
+                if stack:
+                    stack.append(label)
+                    self.samples[";".join(reversed(stack))] += 1
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def write(self, path: str) -> None:
+        with open(path, "w") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class Profiler:
+    """按需或按比例采样的请求性能分析
+
+    - 超级用户在请求中加上 ``X-Profile: 1``（或查询参数 ``_profile=1``）时分析该请求，
+      认证沿用 ``token_required`` + ``admin_required``；头的值也可以是
+      ``pstats`` 或 ``collapsed``，指定输出格式；
+    - ``PROFILING_SAMPLE_RATE`` 大于 0 时，按该比例随机分析任意请求。
+
+    同一时间只分析一个请求，其余请求照常处理。结果写入 ``PROFILING_DIR``，
+    最多保留 ``PROFILING_MAX_FILES`` 个，超出时删除最旧的；响应头
+    ``X-Profile-Id`` 给出文件名。``PROFILING_ENABLED`` 为假时不注册任何钩子，
+    没有额外开销。
+    """
+
+    def __init__(self, app: Optional[Flask] = None):
+        self.enabled = False
+        self.directory = "/tmp/ai-demo-profiles"
+        self.max_files = 50
+        self.sample_rate = 0.0
+        self.default_format = "pstats"
+        self.sample_interval = 0.001
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        """读取配置，启用时注册请求钩子"""
+        self.enabled = app.config.get("PROFILING_ENABLED", self.enabled)
+        self.directory = app.config.get("PROFILING_DIR", self.directory)
+        self.max_files = app.config.get("PROFILING_MAX_FILES", self.max_files)
+        self.sample_rate = app.config.get("PROFILING_SAMPLE_RATE", self.sample_rate)
+        self.default_format = app.config.get("PROFILING_FORMAT", self.default_format)
+        self.sample_interval = app.config.get(
+            "PROFILING_SAMPLE_INTERVAL", self.sample_interval
+        )
+        if self.default_format not in FORMATS:
+            raise ValueError(f"不支持的分析格式：{self.default_format}")
+        if not self.enabled:
+            return
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.teardown_request(self._teardown)
+
+    def _requested_format(self) -> Optional[str]:
+        """请求要求的分析格式；未要求或无权限时返回 None"""
+        flag = (
+            request.headers.get(PROFILE_HEADER)
+            or request.args.get(PROFILE_QUERY_PARAM)
+        )
+        if flag:
+            if _authorize() is not True:
+                return None
+            return flag if flag in FORMATS else self.default_format
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return self.default_format
+        return None
+
+    def _start(self) -> None:
+        profile_format = self._requested_format()
+        if profile_format is None or not self._lock.acquire(blocking=False):
+            return
+        if profile_format == "collapsed":
+            session = StackSampler(self.sample_interval)
+        else:
+            session = CProfileSession()
+        try:
+            session.start()
+        except ValueError:
+            # 进程中已有其他分析器在运行（cProfile 同时只能启用一个）
+            self._lock.release()
+            return
+        request.environ["profiling.session"] = (session, time.perf_counter())
+
+    def _stop(self) -> Optional[str]:
+        started = request.environ.pop("profiling.session", None)
+        if started is None:
+            return None
+        session, start = started
+        try:
+            session.stop()
+            elapsed = time.perf_counter() - start
+            slug = re.sub(r"[^\w]+", "_", request.path).strip("_") or "root"
+            name = (
+                f"{datetime.now():%Y%m%d-%H%M%S-%f}-{request.method}-{slug}"
+                f"-{elapsed * 1000:.0f}ms{session.extension}"
+            )
+            os.makedirs(self.directory, exist_ok=True)
+            session.write(os.path.join(self.directory, name))
+            self._trim()
+            return name
+        finally:
+            self._lock.release()
+
+    def _finish(self, response):
+        name = self._stop()
+        if name is not None:
+            response.headers["X-Profile-Id"] = name
+        return response
+
+    def _teardown(self, exception=None) -> None:
+        # after_request 未执行（如未处理的异常）时也要停止分析并释放锁
+        self._stop()
+
+    def _trim(self) -> None:
+        captures = self.list()
+        for capture in captures[self.max_files:]:
+            try:
+                os.remove(os.path.join(self.directory, capture["name"]))
+            except OSError:
+                pass
+
+    def list(self) -> List[Dict[str, Any]]:
+        """已保存的捕获，最新的在前"""
+        if not os.path.isdir(self.directory):
+            return []
+        captures = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and CAPTURE_NAME.match(entry.name):
+                stat = entry.stat()
+                captures.append({
+                    "name": entry.name,
+                    "size": stat.st_size,
+                    "created_at": datetime.fromtimestamp(stat.st_mtime).isoformat(),
+                })
+        captures.sort(key=lambda capture: capture["name"], reverse=True)
+        return captures
+
+    def path(self, name: str) -> Optional[str]:
+        """捕获文件的路径，名称无效或不存在时返回 None"""
+        if not CAPTURE_NAME.match(name):
+            return None
+        path = os.path.join(self.directory, name)
+        return path if os.path.isfile(path) else None
+
+
+profiler = Profiler()
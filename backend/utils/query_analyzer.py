@@ -0,0 +1,325 @@
+import contextvars
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from flask import Flask, current_app, request
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from utils.cache import TTLCache
+from utils.loop import runner
+
+# 各数据库的执行计划语句（只生成计划，不执行原语句）
+EXPLAIN_PREFIX = {
+    "postgresql": "EXPLAIN ",
+    "sqlite": "EXPLAIN QUERY PLAN ",
+}
+EXPLAINABLE = ("SELECT", "WITH", "UPDATE", "DELETE", "INSERT")
+
+_WHITESPACE = re.compile(r"\s+")
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+# 占位符列表，如 IN (?, ?, ?) 或 IN (%(id_1_1)s, %(id_1_2)s)
+_PLACEHOLDER_LIST = re.compile(
+    r"\(\s*(?:\?|%s|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%s|%\(\w+\)s|:\w+))*\s*\)"
+)
+# 展开的 IN 参数名带序号（id_1_1、id_1_2 ...），不同长度的列表应视为同一形状
+_EXPANDED_PARAM = re.compile(r"%\((\w+?)_\d+\)s|:(\w+?)_\d+\b")
+
+
+def fingerprint(statement: str) -> str:
+    """语句的形状：去掉字面量、合并占位符列表和空白
+
+    参数不同但形状相同的语句（典型的 N+1 查询）得到相同的结果。
+    """
+    normalized = _WHITESPACE.sub(" ", statement).strip()
+    normalized = _STRING_LITERAL.sub("?", normalized)
+    normalized = _NUMBER_LITERAL.sub("?", normalized)
+    normalized = _EXPANDED_PARAM.sub("?", normalized)
+    return _PLACEHOLDER_LIST.sub("(?)", normalized)
+
+
+def redact(parameters: Any) -> Any:
+    """隐藏绑定参数的值，只保留参数名和类型"""
+    if isinstance(parameters, dict):
+        return {key: f"<{type(value).__name__}>" for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            # executemany
+            return f"<{len(parameters)} 组参数>"
+        return [f"<{type(value).__name__}>" for value in parameters]
+    return parameters
+
+
+class QueryBudgetExceededError(AssertionError):
+    """请求执行的语句数超过预算（``QUERY_BUDGET_STRICT`` 为真时抛出）"""
+
+
+class QueryRecord:
+    """一条已执行的语句"""
+
+    __slots__ = ("statement", "fingerprint", "params_key", "elapsed")
+
+    def __init__(self, statement: str, params_key: str, elapsed: float):
+        self.statement = statement
+        self.fingerprint = fingerprint(statement)
+        self.params_key = params_key
+        self.elapsed = elapsed
+
+
+class QueryLog:
+    """当前请求执行的语句"""
+
+    def __init__(self):
+        self.records: List[QueryRecord] = []
+
+    def add(self, record: QueryRecord) -> None:
+        self.records.append(record)
+
+    @property
+    def total_time(self) -> float:
+        return sum(record.elapsed for record in self.records)
+
+    def duplicates(self) -> List[Tuple[str, int]]:
+        """语句和参数都相同、执行了不止一次的语句及次数"""
+        counts = Counter(
+            (record.fingerprint, record.statement, record.params_key)
+            for record in self.records
+        )
+        return [
+            (statement, count)
+            for (_, statement, _), count in counts.items()
+            if count > 1
+        ]
+
+    def repeated_shapes(self, threshold: int) -> List[Tuple[str, int]]:
+        """同一形状、参数不同的语句执行次数达到阈值的（疑似 N+1）"""
+        shapes: Dict[str, set] = {}
+        for record in self.records:
+            shapes.setdefault(record.fingerprint, set()).add(record.params_key)
+        return [
+            (shape, len(params))
+            for shape, params in shapes.items()
+            if len(params) >= threshold
+        ]
+
+
+# 请求开始时设置；事件循环中的协程和 SQLAlchemy 的 greenlet 继承调用方的 contextvars
+current_query_log: ContextVar[Optional[QueryLog]] = ContextVar(
+    "current_query_log", default=None
+)
+
+
+def query_budget(limit: int) -> Callable:
+    """声明视图函数最多执行的语句数
+
+    超出时记录警告；``QUERY_BUDGET_STRICT`` 为真（测试中）时请求失败，
+    抛出 ``QueryBudgetExceededError``。
+
+    Args:
+        limit: 语句数上限
+    """
+
+    def decorator(func: Callable) -> Callable:
+        func.query_budget = limit
+        return func
+
+    return decorator
+
+
+class QueryAnalyzer:
+    """慢查询日志和重复查询检测
+
+    - 执行时间超过 ``SLOW_QUERY_THRESHOLD`` 秒的语句记录到日志
+      （绑定参数只保留类型），并在后台用另一个连接获取执行计划
+      （同一形状的语句在 ``explain_ttl`` 秒内只获取一次）；
+    - 请求结束时输出摘要：语句数、总耗时、完全相同的重复语句以及
+      形状相同、参数不同的语句
+      （执行次数达到 ``QUERY_N_PLUS_ONE_THRESHOLD``，疑似 N+1）；
+    - 检查 ``query_budget`` 声明的（或 ``QUERY_BUDGET_DEFAULT``）语句预算。
+
+    默认关闭，通过 ``QUERY_ANALYZER_ENABLED`` 开启。
+    """
+
+    def __init__(self, app: Optional[Flask] = None, explain_ttl: float = 300.0):
+        self.enabled = False
+        self.slow_threshold = 0.2
+        self.explain = True
+        self.n_plus_one_threshold = 3
+        self.default_budget: Optional[int] = None
+        self.strict = False
+        self.logger = None
+        self._engines: List[Tuple[AsyncEngine, str]] = []
+        self._explained = TTLCache(maxsize=1000, ttl=explain_ttl)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        """读取配置，注册请求钩子，并给已登记的引擎挂上监听器"""
+        self.enabled = app.config.get("QUERY_ANALYZER_ENABLED", self.enabled)
+        self.slow_threshold = app.config.get(
+            "SLOW_QUERY_THRESHOLD", self.slow_threshold
+        )
+        self.explain = app.config.get("SLOW_QUERY_EXPLAIN", self.explain)
+        self.n_plus_one_threshold = app.config.get(
+            "QUERY_N_PLUS_ONE_THRESHOLD", self.n_plus_one_threshold
+        )
+        self.default_budget = app.config.get(
+            "QUERY_BUDGET_DEFAULT", self.default_budget
+        )
+        self.strict = app.config.get("QUERY_BUDGET_STRICT", self.strict)
+        self.logger = app.logger
+        if not self.enabled:
+            return
+        app.extensions["db_engines"].add_listener(self.instrument)
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        app.teardown_request(self._teardown_request)
+
+    def instrument(self, engine: AsyncEngine, name: str) -> None:
+        """记录引擎执行的每条语句（同一引擎只挂一次）"""
+        if any(existing is engine for existing, _ in self._engines):
+            return
+        self._engines.append((engine, name))
+        sync_engine = engine.sync_engine
+
+        @event.listens_for(sync_engine, "before_cursor_execute")
+        def before_cursor_execute(
+            conn, cursor, statement, parameters, context, executemany
+        ):
+            conn.info.setdefault("analyzer_query_start", []).append(time.perf_counter())
+
+        @event.listens_for(sync_engine, "after_cursor_execute")
+        def after_cursor_execute(
+            conn, cursor, statement, parameters, context, executemany
+        ):
+            elapsed = time.perf_counter() - conn.info["analyzer_query_start"].pop()
+            if (
+                context is not None
+                and context.execution_options.get("query_analyzer") is False
+            ):
+                return
+            log = current_query_log.get()
+            if log is not None:
+                log.add(QueryRecord(statement, repr(parameters), elapsed))
+            if elapsed >= self.slow_threshold:
+                self._report_slow(
+                    engine, name, statement, parameters, elapsed, executemany
+                )
+
+        @event.listens_for(sync_engine, "handle_error")
+        def handle_error(context):
+            starts = (
+                context.connection.info.get("analyzer_query_start")
+                if context.connection is not None
+                else None
+            )
+            if starts:
+                starts.pop()
+
+    def _report_slow(
+        self,
+        engine: AsyncEngine,
+        name: str,
+        statement: str,
+        parameters: Any,
+        elapsed: float,
+        executemany: bool,
+    ) -> None:
+        route = (
+            f"{request.method} {request.path}"
+            if current_query_log.get() is not None
+            else "-"
+        )
+        sql = _WHITESPACE.sub(" ", statement).strip()
+        self.logger.warning(
+            f"慢查询 {elapsed * 1000:.1f}ms [{name}] {route}：{sql} "
+            f"参数：{redact(parameters)}"
+        )
+        prefix = EXPLAIN_PREFIX.get(engine.dialect.name)
+        shape = fingerprint(statement)
+        if (
+            not self.explain
+            or executemany
+            or prefix is None
+            or not statement.lstrip().upper().startswith(EXPLAINABLE)
+            or self._explained.get(shape) is not None
+        ):
+            return
+        self._explained.set(shape, True)
+        # 在空的上下文中提交，EXPLAIN 不计入当前请求的语句和指标
+        contextvars.Context().run(
+            runner.submit, self._explain(engine, name, prefix + statement, parameters)
+        )
+
+    async def _explain(
+        self, engine: AsyncEngine, name: str, statement: str, parameters: Any
+    ) -> None:
+        try:
+            async with engine.connect() as conn:
+                # EXPLAIN 本身不再记录和分析
+                result = await conn.exec_driver_sql(
+                    statement, parameters, execution_options={"query_analyzer": False}
+                )
+                plan = "\n".join(
+                    " | ".join(str(value) for value in row) for row in result
+                )
+            if plan:
+                self.logger.warning(f"慢查询执行计划 [{name}]：\n{plan}")
+        except Exception as e:
+            self.logger.warning(f"获取慢查询执行计划失败 [{name}]：{e}")
+
+    def _budget(self) -> Optional[int]:
+        view = (
+            current_app.view_functions.get(request.endpoint)
+            if request.endpoint
+            else None
+        )
+        view_class = getattr(view, "view_class", None)
+        if view_class is not None:
+            view = getattr(view_class, request.method.lower(), view)
+        return getattr(view, "query_budget", self.default_budget)
+
+    def _start_request(self) -> None:
+        current_query_log.set(QueryLog())
+
+    def _finish_request(self, response):
+        log = current_query_log.get()
+        if log is None:
+            return response
+        rule = request.url_rule.rule if request.url_rule else request.path
+        route = f"{request.method} {rule}"
+        duplicates = log.duplicates()
+        shapes = log.repeated_shapes(self.n_plus_one_threshold)
+        budget = self._budget()
+        over_budget = budget is not None and len(log.records) > budget
+
+        summary = f"{route}：{len(log.records)} 条语句，{log.total_time * 1000:.1f}ms"
+        if budget is not None:
+            summary += f"，预算 {budget}"
+        if duplicates or shapes or over_budget:
+            details = [summary]
+            details += [
+                f"  重复 {count} 次：{statement}" for statement, count in duplicates
+            ]
+            details += [
+                f"  疑似 N+1，{count} 组不同参数：{shape}" for shape, count in shapes
+            ]
+            self.logger.warning("\n".join(details))
+        else:
+            self.logger.debug(summary)
+
+        if over_budget and self.strict:
+            raise QueryBudgetExceededError(
+                f"{route} 执行了 {len(log.records)} 条语句，超过预算 {budget}"
+            )
+        return response
+
+    def _teardown_request(self, exception=None) -> None:
+        current_query_log.set(None)
+
+
+query_analyzer = QueryAnalyzer()
@@ -0,0 +1,232 @@
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from functools import wraps
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+from flask import current_app, request
+
+from config.settings import settings
+
+PERIODS = {"second": 1.0, "minute": 60.0, "hour": 3600.0, "day": 86400.0}
+
+# 令牌桶状态：(剩余令牌, 上次更新时间)
+Bucket = Tuple[float, float]
+
+
+def parse_rate(spec: str) -> Optional[Tuple[int, float]]:
+    """解析限流速率
+
+    格式为 ``次数/周期``，周期可以是 second、minute、hour、day 或秒数，
+    如 ``"10/minute"``、``"5/30s"``。令牌桶容量等于次数，
+    每个周期补满一次。
+
+    Args:
+        spec: 速率字符串，为空表示不限流
+
+    Returns:
+        Optional[Tuple[int, float]]: (容量, 周期秒数)，不限流时为 None
+
+    Raises:
+        ValueError: 格式错误
+    """
+    if not spec:
+        return None
+    count, _, period = spec.partition("/")
+    period = period.strip().lower()
+    unit = period.rstrip("s")
+    seconds = PERIODS[unit] if unit in PERIODS else float(unit)
+    capacity = int(count)
+    if capacity <= 0 or seconds <= 0:
+        raise ValueError(f"无效的限流速率：{spec}")
+    return capacity, seconds
+
+
+class TokenBucketStore(ABC):
+    """令牌桶存储
+
+    跨 worker 的实现（如 Redis 上的 Lua 脚本）只需继承本类并实现 ``consume``，
+    所有 worker 共享同一组令牌桶。
+    """
+
+    @abstractmethod
+    def consume(
+        self, key: Hashable, capacity: int, period: float, cost: float = 1.0
+    ) -> float:
+        """从令牌桶中取出令牌
+
+        Args:
+            key: 令牌桶键
+            capacity: 桶容量
+            period: 从空桶补满所需的秒数
+            cost: 本次消耗的令牌数
+
+        Returns:
+            float: 0 表示允许；否则为令牌足够前需要等待的秒数（本次不消耗令牌）
+        """
+
+
+class LocalTokenBucketStore(TokenBucketStore):
+    """分片的进程内令牌桶存储，只在当前 worker 内生效
+
+    令牌桶按键的哈希分布到 ``shards`` 个分片，每个分片有各自的锁，
+    并发请求很少争用同一把锁。每个分片最多保存 ``maxsize / shards`` 个桶，
+    超出时淘汰最久未使用的桶（相当于把它重新补满）。
+    """
+
+    def __init__(
+        self,
+        shards: int = 16,
+        maxsize: int = 100000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._clock = clock
+        self._shard_size = max(maxsize // shards, 1)
+        # 每个分片：(锁, 键 -> (剩余令牌, 上次更新时间))
+        self._shards: List[Tuple[threading.Lock, "OrderedDict[Hashable, Bucket]"]] = [
+            (threading.Lock(), OrderedDict()) for _ in range(shards)
+        ]
+
+    def consume(
+        self, key: Hashable, capacity: int, period: float, cost: float = 1.0
+    ) -> float:
+        rate = capacity / period
+        lock, buckets = self._shards[hash(key) % len(self._shards)]
+        with lock:
+            now = self._clock()
+            tokens, updated_at = buckets.get(key, (float(capacity), now))
+            tokens = min(float(capacity), tokens + (now - updated_at) * rate)
+            if tokens < cost:
+                buckets[key] = (tokens, now)
+                buckets.move_to_end(key)
+                return (cost - tokens) / rate
+            buckets[key] = (tokens - cost, now)
+            buckets.move_to_end(key)
+            while len(buckets) > self._shard_size:
+                buckets.popitem(last=False)
+            return 0.0
+
+    def __len__(self) -> int:
+        return sum(len(buckets) for _, buckets in self._shards)
+
+
+def client_ip() -> Optional[str]:
+    """客户端 IP
+
+    部署在反向代理之后时需要设置 ``PROXY_FIX_X_FOR``，
+    否则所有请求的地址都是代理的地址。
+    """
+    return request.remote_addr
+
+
+def submitted_username() -> Optional[str]:
+    """请求体中的用户名（或邮箱），不区分大小写"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return None
+    username = data.get("username") or data.get("email")
+    if not isinstance(username, str) or not username.strip():
+        return None
+    return username.strip().lower()
+
+
+class RateLimiter:
+    """按多条规则限流的装饰器
+
+    每条规则为 (名称, 速率, 键函数)；键函数返回 None 时跳过该规则。
+    规则按顺序检查，任意一条超限即返回 429 和 ``Retry-After``，
+    后面的规则不再消耗令牌，因此应把针对单个来源的规则放在全局规则之前。
+    检查在视图函数之前完成，被拒绝的请求不会查询数据库，也不会计算密码哈希。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rules: List[Tuple[str, str, Callable[[], Optional[str]]]],
+        store: Optional[TokenBucketStore] = None,
+        enabled: bool = True,
+    ):
+        self.name = name
+        self.store = store if store is not None else rate_limit_store
+        self.enabled = enabled
+        # 速率为空的规则不生效
+        self.rules = []
+        for rule, spec, key_func in rules:
+            limit = parse_rate(spec)
+            if limit is not None:
+                self.rules.append((rule, limit, key_func))
+        self.rejected: Dict[str, int] = {rule: 0 for rule, _, _ in self.rules}
+
+    def check(self) -> Tuple[Optional[str], float]:
+        """检查当前请求
+
+        Returns:
+            Tuple[Optional[str], float]: 超限的规则名和需要等待的秒数；
+            允许时为 (None, 0)
+        """
+        for rule, (capacity, period), key_func in self.rules:
+            key = key_func()
+            if key is None:
+                continue
+            wait = self.store.consume((self.name, rule, key), capacity, period)
+            if wait > 0:
+                self.rejected[rule] += 1
+                return rule, wait
+        return None, 0.0
+
+    def limit(self, func: Callable) -> Callable:
+        """装饰视图函数（应放在 marshal_with 之外，429 响应不经过 marshal）
+
+        ``enabled`` 在每个请求时检查，测试和压测可以在运行时关闭限流。
+        """
+        if not self.rules:
+            return func
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not self.enabled:
+                return func(*args, **kwargs)
+            rule, wait = self.check()
+            if rule is not None:
+                current_app.logger.warning(
+                    f"{self.name} 请求超过限流规则 {rule}：{client_ip()}"
+                )
+                headers = {'Retry-After': str(math.ceil(wait))}
+                return {'message': '请求过于频繁，请稍后重试'}, 429, headers
+            return func(*args, **kwargs)
+
+        return wrapper
+
+    def stats(self) -> Dict[str, int]:
+        """各规则的拒绝次数"""
+        return dict(self.rejected)
+
+
+# 默认只在当前 worker 内限流；多 worker 部署时每个 worker 各自计数，
+# 实际上限约为配置值乘以 worker 数，需要严格上限时换成共享存储
+rate_limit_store: TokenBucketStore = LocalTokenBucketStore(
+    shards=settings.RATE_LIMIT_STORE_SHARDS,
+    maxsize=settings.RATE_LIMIT_STORE_SIZE,
+)
+
+login_limiter = RateLimiter(
+    "login",
+    [
+        ("ip", settings.RATE_LIMIT_LOGIN_PER_IP, client_ip),
+        ("username", settings.RATE_LIMIT_LOGIN_PER_USERNAME, submitted_username),
+        ("global", settings.RATE_LIMIT_LOGIN_GLOBAL, lambda: "*"),
+    ],
+    enabled=settings.RATE_LIMIT_ENABLED,
+)
+
+register_limiter = RateLimiter(
+    "register",
+    [
+        ("ip", settings.RATE_LIMIT_REGISTER_PER_IP, client_ip),
+        ("username", settings.RATE_LIMIT_REGISTER_PER_USERNAME, submitted_username),
+        ("global", settings.RATE_LIMIT_REGISTER_GLOBAL, lambda: "*"),
+    ],
+    enabled=settings.RATE_LIMIT_ENABLED,
+)
@@ -0,0 +1,74 @@
+import json
+from datetime import date, datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖，未安装时使用标准库 json
+    orjson = None
+
+
+def to_utc(value: Any) -> Any:
+    """把带时区的 datetime 转换为 UTC，其他值原样返回
+
+    PostgreSQL 驱动按会话时区返回 timestamptz，输出前统一转换为 UTC，
+    接口返回的时间与服务器时区无关。不带时区的值按 UTC 存储，不做转换。
+    """
+    if isinstance(value, datetime) and value.utcoffset():
+        return value.astimezone(timezone.utc)
+    return value
+
+
+def isoformat_utc(value: Optional[datetime]) -> Optional[str]:
+    """UTC 的 ISO 8601 字符串（与 ``dumps`` 对 datetime 的输出一致）"""
+    return to_utc(value).isoformat() if value is not None else None
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return to_utc(value).isoformat()
+    raise TypeError(f"无法序列化 {type(value).__name__}")
+
+
+def dumps(obj: Any) -> bytes:
+    """把对象编码为 JSON 字节串
+
+    安装了 orjson 时使用 orjson（原生编码 datetime，输出与 ``isoformat`` 一致），
+    否则退回标准库 json（带时区的 datetime 转换为 UTC）。
+    orjson 不转换时区，需要 UTC 输出的值应先经过 ``to_utc``。
+
+    Args:
+        obj: 待编码的对象
+
+    Returns:
+        bytes: UTF-8 编码的 JSON
+    """
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(
+        obj, ensure_ascii=False, separators=(",", ":"), default=_default
+    ).encode()
+
+
+class RowEncoder:
+    """预先确定列名的行编码器
+
+    把按固定列顺序选出的行（元组）直接转换为 JSON 对象，
+    不构建 ORM 对象，不逐个调用 ``isoformat``，也不经过 flask-restx 的 marshal。
+    """
+
+    def __init__(self, columns: Sequence[str]):
+        self.columns = tuple(columns)
+
+    def to_dicts(self, rows: Iterable[Sequence[Any]]) -> List[Dict[str, Any]]:
+        """把行转换为字典列表
+
+        datetime 转换为 UTC 后保持为对象，由 ``dumps`` 编码，
+        输出与 ``User.to_dict`` 的 ``isoformat_utc`` 相同。
+        """
+        columns = self.columns
+        return [dict(zip(columns, map(to_utc, row))) for row in rows]
+
+    def encode(self, rows: Iterable[Sequence[Any]]) -> bytes:
+        """把行编码为 JSON 数组"""
+        return dumps(self.to_dicts(rows))